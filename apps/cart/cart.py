@@ -1,26 +1,67 @@
+import hashlib
+import json
+import uuid
 from decimal import Decimal
 from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Case, DecimalField, F, OuterRef, Subquery, Sum, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from apps.catalog.models import ProductVariant
 from .models import Cart, CartItem
 
 
+SUMMARY_CACHE_TIMEOUT = 60 * 60
+PRICE_VERSION_KEY = 'cart:prices:version'
+
+
+def get_price_version():
+    return cache.get_or_set(PRICE_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def invalidate_cart_prices():
+    """Make every stored cart subtotal stale, e.g. after a price change."""
+    cache.set(PRICE_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def summary_cache_key(user_id):
+    return f'cart:summary:{user_id}'
+
+
+def effective_price_expression(prefix='variant__price__'):
+    """SQL equivalent of Price.effective_price (NULL when there is no price)."""
+    return Case(
+        When(**{f'{prefix}sale_price__gt': 0}, then=F(f'{prefix}sale_price')),
+        default=F(f'{prefix}list_price'),
+    )
+
+
 class SessionCart:
     """
     A unified cart interface that handles both session-based (guest) 
     and database-backed (authenticated user) carts.
+
+    The item count and subtotal are kept as a summary that add/remove/clear
+    update: in the session for guests, on the Cart row (and in the cache) for
+    users. len() and get_total_price() read the summary instead of the items;
+    the subtotal is recomputed when prices have changed since it was stored.
+
+    Database cart lines are changed with single UPDATE (F() increment) or
+    upsert statements, so concurrent requests don't lose each other's updates.
     """
     
-    def __init__(self, request):
-        """Initialize the cart."""
+    def __init__(self, request, user=None):
+        """Initialize the cart (for `user` instead of request.user when given)."""
+        self.request = request
         self.session = request.session
-        self.user = request.user
-        cart_session = self.session.get(settings.CART_SESSION_ID)
-        
-        if not cart_session:
-            # Save an empty cart in the session
-            cart_session = self.session[settings.CART_SESSION_ID] = {}
-        
-        self.cart_session = cart_session
+        self.user = user if user is not None else request.user
+        # An empty cart is only written to the session once something is added,
+        # so merely rendering the cart doesn't force a session save
+        self.cart_session = self.session.get(settings.CART_SESSION_ID) or {}
+        self.summary_session_id = f'{settings.CART_SESSION_ID}_summary'
+        self._summary = None
+        self._fingerprint = None
 
     def add(self, variant, quantity=1, override_quantity=False):
         """Add a product variant to the cart or update its quantity."""
@@ -28,14 +69,7 @@ class SessionCart:
         
         if self.user.is_authenticated:
             # Database cart
-            cart, created = Cart.objects.get_or_create(user=self.user)
-            item, created = CartItem.objects.get_or_create(cart=cart, variant=variant)
-            
-            if override_quantity:
-                item.quantity = quantity
-            else:
-                item.quantity += quantity
-            item.save()
+            self._add_item(self.get_cart_id(), variant, quantity, override_quantity)
         else:
             # Session cart
             if variant_id not in self.cart_session:
@@ -47,6 +81,7 @@ class SessionCart:
                 self.cart_session[variant_id]['quantity'] += quantity
             
             self.save()
+        self.refresh_summary()
 
     def remove(self, variant):
         """Remove a product variant from the cart."""
@@ -54,12 +89,84 @@ class SessionCart:
         
         if self.user.is_authenticated:
             # Database cart
-            CartItem.objects.filter(cart__user=self.user, variant=variant).delete()
+            cart_id = self.get_cart_id(create=False)
+            if cart_id is not None:
+                CartItem.objects.filter(cart_id=cart_id, variant=variant).delete()
         else:
             # Session cart
             if variant_id in self.cart_session:
                 del self.cart_session[variant_id]
                 self.save()
+        self.refresh_summary()
+
+    def get_cart_id(self, create=True):
+        """Id of the user's Cart row, looked up once per request."""
+        cart_id = getattr(self.request, '_cart_id', None)
+        if cart_id is None:
+            if create:
+                cart_id = Cart.objects.get_or_create(user=self.user)[0].pk
+            else:
+                cart_id = Cart.objects.filter(user=self.user).values_list('pk', flat=True).first()
+            self.request._cart_id = cart_id
+        return cart_id
+
+    def get_quantities(self, for_update=False):
+        """
+        Current {variant_id: quantity} of the cart lines. With `for_update`
+        the user's cart row is locked until the end of the transaction.
+        """
+        if not self.user.is_authenticated:
+            return {int(variant_id): item['quantity'] for variant_id, item in self.cart_session.items()}
+        cart_id = self.get_cart_id()
+        if for_update:
+            list(Cart.objects.select_for_update().filter(pk=cart_id).values_list('pk', flat=True))
+        return dict(CartItem.objects.filter(cart_id=cart_id).values_list('variant_id', 'quantity'))
+
+    def set_quantities(self, quantities):
+        """Set several lines at once from {variant_id: quantity}; 0 removes the line."""
+        removed = [variant_id for variant_id, quantity in quantities.items() if quantity <= 0]
+        kept = {variant_id: quantity for variant_id, quantity in quantities.items() if quantity > 0}
+        
+        if self.user.is_authenticated:
+            cart_id = self.get_cart_id()
+            if removed:
+                CartItem.objects.filter(cart_id=cart_id, variant_id__in=removed).delete()
+            if kept:
+                CartItem.objects.bulk_create(
+                    [CartItem(cart_id=cart_id, variant_id=variant_id, quantity=quantity)
+                     for variant_id, quantity in kept.items()],
+                    update_conflicts=True,
+                    unique_fields=['cart', 'variant'],
+                    update_fields=['quantity', 'updated_at'],
+                )
+        else:
+            for variant_id in removed:
+                self.cart_session.pop(str(variant_id), None)
+            for variant_id, quantity in kept.items():
+                self.cart_session[str(variant_id)] = {'quantity': quantity}
+            self.save()
+        self.refresh_summary()
+
+    def _add_item(self, cart_id, variant, quantity, override_quantity):
+        if override_quantity:
+            CartItem.objects.bulk_create(
+                [CartItem(cart_id=cart_id, variant=variant, quantity=quantity)],
+                update_conflicts=True,
+                unique_fields=['cart', 'variant'],
+                update_fields=['quantity', 'updated_at'],
+            )
+            return
+        
+        lines = CartItem.objects.filter(cart_id=cart_id, variant=variant)
+        increment = {'quantity': F('quantity') + quantity, 'updated_at': timezone.now()}
+        if lines.update(**increment):
+            return
+        try:
+            with transaction.atomic():
+                CartItem.objects.create(cart_id=cart_id, variant=variant, quantity=quantity)
+        except IntegrityError:
+            # Another request created the line in the meantime
+            lines.update(**increment)
 
     def __iter__(self):
         """Iterate over the items in the cart and get the products from the database."""
@@ -67,8 +174,9 @@ class SessionCart:
         
         if self.user.is_authenticated:
             # For authenticated users, we use the database items
-            cart, _ = Cart.objects.get_or_create(user=self.user)
-            items = cart.items.all().select_related('variant', 'variant__product', 'variant__price')
+            items = CartItem.objects.filter(
+                cart_id=self.get_cart_id(create=False)
+            ).select_related('variant', 'variant__product__listing', 'variant__price')
             
             for item in items:
                 yield {
@@ -80,11 +188,11 @@ class SessionCart:
                 }
         else:
             # For guests, we use session items
-            variants = ProductVariant.objects.filter(id__in=variant_ids).select_related('product', 'price')
+            variants = ProductVariant.objects.filter(id__in=variant_ids).select_related('product__listing', 'price')
             cart_data = self.cart_session.copy()
             
             for variant in variants:
-                item = cart_data[str(variant.id)]
+                item = dict(cart_data[str(variant.id)])
                 item['variant'] = variant
                 item['unit_price'] = variant.price.effective_price if hasattr(variant, 'price') else Decimal('0')
                 item['total_price'] = item['unit_price'] * item['quantity']
@@ -92,18 +200,68 @@ class SessionCart:
 
     def __len__(self):
         """Count all items in the cart."""
-        if self.user.is_authenticated:
-            cart, _ = Cart.objects.get_or_create(user=self.user)
-            return sum(item.quantity for item in cart.items.all())
-        return sum(item['quantity'] for item in self.cart_session.values())
+        # The count doesn't depend on prices, so a stored summary is always current
+        summary = self._summary or self._load_summary() or self.refresh_summary()
+        return summary['count']
 
     def get_total_price(self):
         """Calculate total cost of items in the cart."""
+        return self.get_summary()['subtotal']
+
+    def get_summary(self):
+        """The cart's {'count', 'subtotal', 'version'}, recomputed only when stale."""
+        summary = self._summary or self._load_summary()
+        if summary is None or summary['version'] != get_price_version():
+            summary = self.refresh_summary()
+        return summary
+
+    def get_fingerprint(self):
+        """
+        Hash of the cart lines with their current prices and tax rates, which
+        changes whenever the cart's contents or the pricing of its own
+        variants do (price changes elsewhere in the catalog leave it alone).
+        """
+        if self._fingerprint is None:
+            quantities = self.get_quantities()
+            pricing = ProductVariant.objects.filter(id__in=quantities).annotate(
+                unit_price=effective_price_expression('price__'),
+                tax_rate=F('price__tax_class__rate_percent'),
+            ).order_by('pk').values_list('pk', 'unit_price', 'tax_rate')
+            lines = [[pk, quantities[pk], str(unit_price), str(tax_rate)] for pk, unit_price, tax_rate in pricing]
+            self._fingerprint = hashlib.md5(json.dumps(lines).encode()).hexdigest()
+        return self._fingerprint
+
+    def refresh_summary(self):
+        """Recompute the count and subtotal from the items and store them."""
+        self._fingerprint = None
+        version = get_price_version()
         if self.user.is_authenticated:
-            cart, _ = Cart.objects.get_or_create(user=self.user)
-            return sum(item.total_price for item in cart.items.all())
-        
+            cart_id = self.get_cart_id(create=False)
+            count, subtotal = 0, Decimal('0')
+            if cart_id is not None:
+                totals = CartItem.objects.filter(cart_id=cart_id).aggregate(
+                    count=Coalesce(Sum('quantity'), 0),
+                    subtotal=Coalesce(
+                        Sum(F('quantity') * effective_price_expression(),
+                            output_field=DecimalField(max_digits=12, decimal_places=2)),
+                        Decimal('0'),
+                    ),
+                )
+                count, subtotal = totals['count'], totals['subtotal']
+                Cart.objects.filter(pk=cart_id).update(
+                    item_count=count, subtotal=subtotal, summary_version=version, updated_at=timezone.now()
+                )
+        else:
+            count = sum(item['quantity'] for item in self.cart_session.values())
+            subtotal = self._session_subtotal()
+        subtotal = Decimal(subtotal).quantize(Decimal('0.01'))
+        self._store_summary({'count': count, 'subtotal': subtotal, 'version': version})
+        return self._summary
+
+    def _session_subtotal(self):
         total = Decimal('0')
+        if not self.cart_session:
+            return total
         variants = ProductVariant.objects.filter(id__in=self.cart_session.keys()).select_related('price')
         prices = {str(v.id): (v.price.effective_price if hasattr(v, 'price') else Decimal('0')) for v in variants}
         
@@ -111,40 +269,84 @@ class SessionCart:
             total += prices.get(variant_id, Decimal('0')) * item['quantity']
         return total
 
+    def _load_summary(self):
+        """The stored summary, or None when there is none."""
+        if self.user.is_authenticated:
+            stored = cache.get(summary_cache_key(self.user.pk))
+            if stored is None:
+                row = Cart.objects.filter(user=self.user).values('item_count', 'subtotal', 'summary_version').first()
+                if row is None:
+                    stored = {'count': 0, 'subtotal': '0', 'version': get_price_version()}
+                elif row['summary_version']:
+                    stored = {'count': row['item_count'], 'subtotal': str(row['subtotal']), 'version': row['summary_version']}
+                else:
+                    return None
+                cache.set(summary_cache_key(self.user.pk), stored, SUMMARY_CACHE_TIMEOUT)
+        elif not self.cart_session:
+            stored = {'count': 0, 'subtotal': '0', 'version': get_price_version()}
+        else:
+            stored = self.session.get(self.summary_session_id)
+            if stored is None:
+                return None
+        self._summary = {'count': stored['count'], 'subtotal': Decimal(stored['subtotal']), 'version': stored['version']}
+        return self._summary
+
+    def _store_summary(self, summary):
+        self._summary = summary
+        # Subtotals are stored as strings so the summary stays JSON serializable
+        stored = dict(summary, subtotal=str(summary['subtotal']))
+        if self.user.is_authenticated:
+            cache.set(summary_cache_key(self.user.pk), stored, SUMMARY_CACHE_TIMEOUT)
+        elif self.cart_session:
+            self.session[self.summary_session_id] = stored
+            self.session.modified = True
+        elif self.summary_session_id in self.session:
+            del self.session[self.summary_session_id]
+
     def clear(self):
         """Remove cart from session and database."""
         if self.user.is_authenticated:
-            CartItem.objects.filter(cart__user=self.user).delete()
+            cart_id = self.get_cart_id(create=False)
+            if cart_id is not None:
+                CartItem.objects.filter(cart_id=cart_id).delete()
         
-        if settings.CART_SESSION_ID in self.session:
-            del self.session[settings.CART_SESSION_ID]
-            self.save()
+        self._drop_session_cart()
+        self.refresh_summary()
 
     def save(self):
-        """Mark the session as modified to ensure it gets saved."""
+        """Store the cart in the session and mark it as modified."""
+        self.session[settings.CART_SESSION_ID] = self.cart_session
         self.session.modified = True
 
+    def _drop_session_cart(self):
+        self.cart_session = {}
+        for key in (settings.CART_SESSION_ID, self.summary_session_id):
+            if key in self.session:
+                del self.session[key]
+
     def merge_with_user_cart(self):
         """Move session items to the user's database cart."""
         if not self.user.is_authenticated or not self.cart_session:
             return
-            
-        cart, created = Cart.objects.get_or_create(user=self.user)
-        variant_ids = self.cart_session.keys()
-        variants = ProductVariant.objects.filter(id__in=variant_ids)
         
-        for variant in variants:
-            session_qty = self.cart_session[str(variant.id)]['quantity']
-            item, created = CartItem.objects.get_or_create(cart=cart, variant=variant)
-            
-            if created:
-                item.quantity = session_qty
-            else:
-                # If item already exists in DB, we could either override or add. 
-                # Adding is usually more user-friendly.
-                item.quantity += session_qty
-            item.save()
+        with transaction.atomic():
+            cart_id = self.get_cart_id()
+            list(Cart.objects.select_for_update().filter(pk=cart_id).values_list('pk', flat=True))
+            # One query drops variants that are gone or inactive and reads the
+            # quantities already in the user's cart
+            existing = CartItem.objects.filter(cart_id=cart_id, variant=OuterRef('pk')).values('quantity')
+            rows = ProductVariant.objects.filter(
+                id__in=[int(variant_id) for variant_id in self.cart_session],
+                is_active=True,
+                product__is_active=True,
+            ).annotate(cart_quantity=Subquery(existing)).values_list('id', 'cart_quantity')
             
+            # If an item already exists in the DB cart, the session quantity is
+            # added to it; adding is usually more user-friendly than overriding
+            self.set_quantities({
+                variant_id: (cart_quantity or 0) + self.cart_session[str(variant_id)]['quantity']
+                for variant_id, cart_quantity in rows
+            })
+        
         # Clear the session cart after merging
-        del self.session[settings.CART_SESSION_ID]
-        self.save()
+        self._drop_session_cart()
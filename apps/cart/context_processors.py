@@ -1,6 +1,7 @@
+from django.utils.functional import SimpleLazyObject
 from .cart import SessionCart
 
 
 def cart(request):
-    """Context processor to make the cart available in all templates."""
-    return {'cart': SessionCart(request)}
+    """Context processor to make the cart available in all templates (built on first use)."""
+    return {'cart': SimpleLazyObject(lambda: SessionCart(request))}
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.14 on 2026-10-17 00:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='item count'),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='subtotal'),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='summary_version',
+            field=models.CharField(blank=True, max_length=32, verbose_name='summary price version'),
+        ),
+    ]
@@ -12,6 +12,12 @@ class Cart(models.Model):
         related_name='cart',
         verbose_name='user'
     )
+    
+    # Denormalized summary maintained by SessionCart
+    item_count = models.PositiveIntegerField('item count', default=0)
+    subtotal = models.DecimalField('subtotal', max_digits=12, decimal_places=2, default=0)
+    summary_version = models.CharField('summary price version', max_length=32, blank=True)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
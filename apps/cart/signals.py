@@ -1,10 +1,22 @@
 from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from .cart import SessionCart
+from .cart import SessionCart, invalidate_cart_prices
 
 
 @receiver(user_logged_in)
 def merge_cart_on_login(sender, request, user, **kwargs):
     """Signal receiver to merge session cart into database cart when user logs in."""
-    cart = SessionCart(request)
+    # Requests built outside the middleware (e.g. by the test client's
+    # login) have no request.user, so the user is passed in explicitly
+    cart = SessionCart(request, user=user)
     cart.merge_with_user_cart()
+
+
+@receiver([post_save, post_delete], sender='pricing.Price')
+@receiver([post_save, post_delete], sender='pricing.TaxClass')
+def invalidate_cart_prices_on_price_change(sender, **kwargs):
+    """Stored cart subtotals and checkout totals are recomputed on next use after a price or tax change."""
+    # After the commit, so a concurrent request can't store a subtotal of the old prices under the new version
+    transaction.on_commit(invalidate_cart_prices)
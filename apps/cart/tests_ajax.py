@@ -21,8 +21,8 @@ class CartAjaxTests(TestCase):
         )
         # Assuming price is a related model or handled via signals/defaults
         # For this test, let's assume the variant needs a price object if the model expects it
-        from apps.pricing.models import ProductPrice
-        ProductPrice.objects.create(
+        from apps.pricing.models import Price
+        Price.objects.create(
             variant=self.variant,
             list_price=Decimal('100.00')
         )
@@ -0,0 +1,98 @@
+import threading
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from apps.catalog.models import Category, Product, ProductVariant
+from apps.core.testing import ConcurrentWritesMixin
+from apps.pricing.models import Price
+from .cart import SessionCart
+from .models import CartItem
+
+
+def make_request(user):
+    request = RequestFactory().get('/')
+    request.session = SessionStore()
+    request.user = user
+    return request
+
+
+def create_variant(sku, list_price, sale_price=None):
+    category, _ = Category.objects.get_or_create(name="Laptops", slug="laptops")
+    product, _ = Product.objects.get_or_create(name="Laptop", slug="laptop", category=category)
+    variant = ProductVariant.objects.create(product=product, sku=sku)
+    Price.objects.create(variant=variant, list_price=Decimal(list_price), sale_price=sale_price)
+    return variant
+
+
+class AtomicCartTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.variant = create_variant("LAP-1", '100.00', Decimal('90.00'))
+        self.other = create_variant("LAP-2", '250.00')
+        self.user = get_user_model().objects.create_user(email='buyer@example.com', password='secret')
+
+    def test_add_increments_and_overrides(self):
+        request = make_request(self.user)
+        cart = SessionCart(request)
+        cart.add(self.variant, quantity=2)
+        cart.add(self.variant, quantity=3)
+        self.assertEqual(CartItem.objects.get(variant=self.variant).quantity, 5)
+        cart.add(self.variant, quantity=1, override_quantity=True)
+        self.assertEqual(CartItem.objects.get(variant=self.variant).quantity, 1)
+        cart.add(self.other, quantity=4, override_quantity=True)
+        self.assertEqual(len(cart), 5)
+        self.assertEqual(cart.get_total_price(), Decimal('1090.00'))
+
+    def test_add_to_existing_line_is_single_round_trip(self):
+        request = make_request(self.user)
+        SessionCart(request).add(self.variant)
+        cart = SessionCart(request)
+        # UPDATE the line, aggregate the totals, UPDATE the cart row
+        with self.assertNumQueries(3):
+            cart.add(self.variant)
+            self.assertEqual(len(cart), 2)
+            self.assertEqual(cart.get_total_price(), Decimal('180.00'))
+
+    def test_remove_and_clear_without_cart_create_nothing(self):
+        cart = SessionCart(make_request(self.user))
+        cart.remove(self.variant)
+        cart.clear()
+        self.assertFalse(self.user.__class__.objects.filter(cart__isnull=False).exists())
+
+
+class ConcurrentCartTests(ConcurrentWritesMixin, TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.variant = create_variant("LAP-1", '100.00')
+        self.user = get_user_model().objects.create_user(email='buyer@example.com', password='secret')
+        # Create the cart and its line up front so the threads race on the UPDATE
+        SessionCart(make_request(self.user)).add(self.variant)
+
+    def test_parallel_adds_are_not_lost(self):
+        threads, adds = 8, 5
+        barrier = threading.Barrier(threads)
+        errors = []
+
+        def worker():
+            try:
+                barrier.wait()
+                for _ in range(adds):
+                    SessionCart(make_request(self.user)).add(self.variant)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(CartItem.objects.get(variant=self.variant).quantity, 1 + threads * adds)
+        cache.clear()
+        self.assertEqual(len(SessionCart(make_request(self.user))), 1 + threads * adds)
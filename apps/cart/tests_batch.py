@@ -0,0 +1,83 @@
+import json
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from apps.catalog.models import Category, Product, ProductVariant, VariantInventory
+from apps.pricing.models import Price
+from .models import CartItem
+
+
+class CartBatchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        category = Category.objects.create(name="Laptops", slug="laptops")
+        product = Product.objects.create(name="Laptop", slug="laptop", category=category)
+        self.variants = []
+        for index in range(6):
+            variant = ProductVariant.objects.create(product=product, sku=f"LAP-{index}")
+            Price.objects.create(variant=variant, list_price=Decimal('100.00') * (index + 1))
+            VariantInventory.objects.create(variant=variant, stock_qty=10)
+            self.variants.append(variant)
+        self.user = get_user_model().objects.create_user(email='buyer@example.com', password='secret')
+
+    def post_batch(self, operations):
+        response = self.client.post(
+            reverse('cart:cart_batch'), json.dumps({'operations': operations}),
+            content_type='application/json', HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        )
+        return response, json.loads(response.content)
+
+    def test_applies_operations_and_returns_totals(self):
+        first, second = self.variants[0], self.variants[1]
+        response, data = self.post_batch([
+            {'variant_id': first.id, 'quantity': 2},
+            {'variant_id': second.id, 'quantity': 3, 'op': 'set'},
+            {'variant_id': first.id, 'quantity': 1},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['cart_count'], 6)
+        self.assertEqual(data['cart_total'], 900.0)
+        self.assertEqual(
+            [(line['variant_id'], line['quantity'], line['item_total']) for line in data['lines']],
+            [(first.id, 3, 300.0), (second.id, 3, 600.0)]
+        )
+
+        response, data = self.post_batch([{'variant_id': first.id, 'op': 'remove'}])
+        self.assertEqual(data['cart_count'], 3)
+
+    def test_rejects_whole_batch_when_any_line_fails(self):
+        self.client.force_login(self.user)
+        response, data = self.post_batch([
+            {'variant_id': self.variants[0].id, 'quantity': 2},
+            {'variant_id': self.variants[1].id, 'quantity': 11},
+            {'variant_id': 9999, 'quantity': 1},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['variant_id'] for error in data['errors']], [self.variants[1].id, 9999])
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_rejects_malformed_operations(self):
+        for operations in ([], [{'quantity': 1}], [{'variant_id': 1, 'op': 'explode'}], [{'variant_id': 1, 'quantity': -1}]):
+            response, data = self.post_batch(operations)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(data['status'], 'error')
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        self.client.force_login(self.user)
+        self.post_batch([{'variant_id': self.variants[0].id}])
+
+        def count_queries(variants):
+            with CaptureQueriesContext(connection) as ctx:
+                response, data = self.post_batch([{'variant_id': v.id, 'quantity': 2, 'op': 'set'} for v in variants])
+            self.assertEqual(response.status_code, 200)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(count_queries(self.variants[:2]), count_queries(self.variants))
+        self.assertEqual(
+            sorted(CartItem.objects.values_list('quantity', flat=True)), [2] * len(self.variants)
+        )
@@ -0,0 +1,67 @@
+from decimal import Decimal
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from apps.catalog.models import Category, Product, ProductVariant
+from apps.pricing.models import Price
+from .cart import SessionCart
+from .models import Cart, CartItem
+
+
+class CartMergeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name="Laptops", slug="laptops")
+        self.product = Product.objects.create(name="Laptop", slug="laptop", category=category)
+        self.variants = []
+        for index in range(50):
+            variant = ProductVariant.objects.create(product=self.product, sku=f"LAP-{index}")
+            Price.objects.create(variant=variant, list_price=Decimal('10.00'))
+            self.variants.append(variant)
+        self.user = get_user_model().objects.create_user(email='buyer@example.com', password='secret')
+
+    def login_request(self, session_items):
+        """A just-logged-in request whose session holds `session_items` {variant: quantity}."""
+        request = RequestFactory().get('/')
+        request.session = SessionStore()
+        request.session[settings.CART_SESSION_ID] = {
+            str(variant.id): {'quantity': quantity} for variant, quantity in session_items.items()
+        }
+        request.user = self.user
+        return request
+
+    def test_merge_adds_to_existing_lines_and_skips_unavailable_variants(self):
+        existing, new, inactive = self.variants[:3]
+        SessionCart(self.login_request({})).add(existing, quantity=2)
+        inactive.is_active = False
+        inactive.save()
+
+        request = self.login_request({existing: 3, new: 1, inactive: 4})
+        request.session[settings.CART_SESSION_ID]['9999'] = {'quantity': 1}
+        cart = SessionCart(request)
+        cart.merge_with_user_cart()
+
+        self.assertEqual(
+            dict(CartItem.objects.values_list('variant_id', 'quantity')), {existing.id: 5, new.id: 1}
+        )
+        self.assertNotIn(settings.CART_SESSION_ID, request.session)
+        self.assertEqual(len(cart), 6)
+        self.assertEqual(cart.get_total_price(), Decimal('60.00'))
+
+    def test_merge_cost_does_not_grow_with_cart_size(self):
+        """Benchmark: merging 50 items takes as many queries as merging one."""
+        Cart.objects.create(user=self.user)
+
+        def merge_queries(variants):
+            CartItem.objects.all().delete()
+            cart = SessionCart(self.login_request({variant: 1 for variant in variants}))
+            with CaptureQueriesContext(connection) as ctx:
+                cart.merge_with_user_cart()
+            self.assertEqual(CartItem.objects.count(), len(variants))
+            return len(ctx.captured_queries)
+
+        self.assertEqual(merge_queries(self.variants[:1]), merge_queries(self.variants))
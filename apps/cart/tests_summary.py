@@ -0,0 +1,92 @@
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from apps.catalog.models import Category, Product, ProductVariant
+from apps.pricing.models import Price
+from .cart import SessionCart, get_price_version
+from .models import Cart
+
+
+class CartSummaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name="Laptops", slug="laptops")
+        product = Product.objects.create(name="Laptop", slug="laptop", category=category)
+        self.variant = ProductVariant.objects.create(product=product, sku="LAP-1")
+        self.price = Price.objects.create(variant=self.variant, list_price=Decimal('100.00'))
+        self.other = ProductVariant.objects.create(product=product, sku="LAP-2")
+        Price.objects.create(variant=self.other, list_price=Decimal('250.00'))
+        self.user = get_user_model().objects.create_user(email='buyer@example.com', password='secret')
+
+    def make_request(self, user=None):
+        request = RequestFactory().get('/')
+        request.session = SessionStore()
+        request.user = user or AnonymousUser()
+        return request
+
+    def assert_summary_is_free(self, request, count, subtotal):
+        """A fresh SessionCart answers from the stored summary without queries."""
+        with self.assertNumQueries(0):
+            cart = SessionCart(request)
+            self.assertEqual(len(cart), count)
+            self.assertEqual(cart.get_total_price(), Decimal(subtotal))
+
+    def test_guest_summary_kept_in_session(self):
+        request = self.make_request()
+        cart = SessionCart(request)
+        cart.add(self.variant, quantity=2)
+        cart.add(self.other)
+        self.assert_summary_is_free(request, 3, '450.00')
+
+        SessionCart(request).remove(self.other)
+        self.assert_summary_is_free(request, 2, '200.00')
+
+    def test_user_summary_kept_on_cart_row(self):
+        request = self.make_request(self.user)
+        cart = SessionCart(request)
+        cart.add(self.variant, quantity=2)
+        cart.add(self.other)
+        self.assert_summary_is_free(request, 3, '450.00')
+
+        row = Cart.objects.get(user=self.user)
+        self.assertEqual((row.item_count, row.subtotal), (3, Decimal('450.00')))
+
+        # With the cache gone the summary is read back from the Cart row
+        cache.delete(f'cart:summary:{self.user.pk}')
+        with self.assertNumQueries(1):
+            self.assertEqual(len(SessionCart(request)), 3)
+
+        SessionCart(request).clear()
+        self.assert_summary_is_free(request, 0, '0')
+
+    def test_price_change_refreshes_subtotal(self):
+        for request in (self.make_request(), self.make_request(self.user)):
+            SessionCart(request).add(self.variant, quantity=2)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.price.sale_price = Decimal('80.00')
+                self.price.save()
+            self.assertEqual(SessionCart(request).get_total_price(), Decimal('160.00'))
+            with self.captureOnCommitCallbacks(execute=True):
+                self.price.sale_price = None
+                self.price.save()
+
+    def test_price_version_changes_after_commit(self):
+        version = get_price_version()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.price.sale_price = Decimal('80.00')
+            self.price.save()
+            self.assertEqual(get_price_version(), version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_price_version(), version)
+
+    def test_empty_guest_cart_does_not_touch_session(self):
+        request = self.make_request()
+        with self.assertNumQueries(0):
+            cart = SessionCart(request)
+            self.assertEqual(len(cart), 0)
+            self.assertEqual(cart.get_total_price(), Decimal('0'))
+        self.assertFalse(request.session.modified)
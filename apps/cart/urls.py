@@ -9,4 +9,5 @@ urlpatterns = [
     path('remove/', views.cart_remove, name='cart_remove'),
     path('update/', views.cart_update, name='cart_update'),
     path('clear/', views.cart_clear, name='cart_clear'),
+    path('batch/', views.cart_batch, name='cart_batch'),
 ]
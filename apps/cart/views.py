@@ -1,4 +1,5 @@
 import json
+from django.db import transaction
 from django.shortcuts import render, get_object_or_404
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
@@ -7,6 +8,41 @@ from apps.catalog.models import ProductVariant
 from .cart import SessionCart
 
 
+BATCH_OPERATIONS = ('add', 'set', 'remove')
+MAX_BATCH_OPERATIONS = 100
+
+
+def parse_batch_operations(body):
+    """
+    Parse a batch request body into a list of (variant_id, quantity, op).
+    Raises ValueError with a user-facing message for malformed input.
+    """
+    try:
+        data = json.loads(body)
+    except (TypeError, ValueError):
+        raise ValueError('Request body must be JSON.')
+    operations = data.get('operations') if isinstance(data, dict) else None
+    if not isinstance(operations, list) or not operations:
+        raise ValueError('Provide a non-empty "operations" list.')
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        raise ValueError(f'At most {MAX_BATCH_OPERATIONS} operations are allowed per request.')
+    
+    parsed = []
+    for index, operation in enumerate(operations):
+        try:
+            op = operation.get('op', 'add')
+            variant_id = int(operation['variant_id'])
+            quantity = int(operation.get('quantity', 0 if op == 'remove' else 1))
+        except (AttributeError, KeyError, TypeError, ValueError):
+            raise ValueError(f'Operation {index} needs an integer variant_id and quantity.')
+        if op not in BATCH_OPERATIONS:
+            raise ValueError(f'Operation {index} has an unknown op "{op}".')
+        if quantity < 0 or (op == 'add' and quantity == 0):
+            raise ValueError(f'Operation {index} has an invalid quantity.')
+        parsed.append((variant_id, quantity, op))
+    return parsed
+
+
 @require_POST
 def cart_add(request):
     """Add a product variant to the cart via AJAX."""
@@ -24,12 +60,13 @@ def cart_add(request):
         }, status=400)
     
     cart.add(variant=variant, quantity=quantity)
+    summary = cart.get_summary()
     
     return JsonResponse({
         'status': 'success',
         'message': f'Added {variant.product.name} to cart.',
-        'cart_count': len(cart),
-        'cart_total': float(cart.get_total_price())
+        'cart_count': summary['count'],
+        'cart_total': float(summary['subtotal'])
     })
 
 
@@ -41,12 +78,13 @@ def cart_remove(request):
     variant = get_object_or_404(ProductVariant, id=variant_id)
     
     cart.remove(variant)
+    summary = cart.get_summary()
     
     return JsonResponse({
         'status': 'success',
         'message': 'Item removed from cart.',
-        'cart_count': len(cart),
-        'cart_total': float(cart.get_total_price())
+        'cart_count': summary['count'],
+        'cart_total': float(summary['subtotal'])
     })
 
 
@@ -67,6 +105,7 @@ def cart_update(request):
         }, status=400)
     
     cart.add(variant=variant, quantity=quantity, override_quantity=True)
+    summary = cart.get_summary()
     
     # Calculate item total for front-end update
     unit_price = variant.price.effective_price if hasattr(variant, 'price') else 0
@@ -75,12 +114,84 @@ def cart_update(request):
     return JsonResponse({
         'status': 'success',
         'message': 'Cart updated.',
-        'cart_count': len(cart),
-        'cart_total': float(cart.get_total_price()),
+        'cart_count': summary['count'],
+        'cart_total': float(summary['subtotal']),
         'item_total': item_total
     })
 
 
+@require_POST
+def cart_batch(request):
+    """
+    Apply several cart changes in one request.
+    
+    Expects a JSON body {"operations": [{"variant_id": 1, "quantity": 2, "op": "add"}, ...]}
+    where op is "add" (default), "set" or "remove". Stock is checked for all
+    lines before anything changes; either every operation is applied or none.
+    """
+    try:
+        operations = parse_batch_operations(request.body)
+    except ValueError as exc:
+        return JsonResponse({'status': 'error', 'message': str(exc)}, status=400)
+    
+    cart = SessionCart(request)
+    variant_ids = {variant_id for variant_id, quantity, op in operations}
+    
+    with transaction.atomic():
+        current = cart.get_quantities(for_update=True)
+        variants = ProductVariant.objects.filter(
+            id__in=variant_ids, is_active=True
+        ).select_related('product', 'price', 'inventory').in_bulk()
+        
+        quantities = {}
+        for variant_id, quantity, op in operations:
+            if op == 'add':
+                quantity += quantities.get(variant_id, current.get(variant_id, 0))
+            elif op == 'remove':
+                quantity = 0
+            quantities[variant_id] = quantity
+        
+        errors = []
+        for variant_id, quantity in quantities.items():
+            variant = variants.get(variant_id)
+            if variant is None:
+                if quantity:
+                    errors.append({'variant_id': variant_id, 'message': 'Product variant not found.'})
+            elif quantity and hasattr(variant, 'inventory') and variant.inventory.available_qty < quantity:
+                errors.append({
+                    'variant_id': variant_id,
+                    'message': f'Only {variant.inventory.available_qty} items available in stock.'
+                })
+        if errors:
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Some items could not be updated.',
+                'errors': errors
+            }, status=400)
+        
+        cart.set_quantities(quantities)
+    
+    lines = []
+    for variant_id, quantity in quantities.items():
+        variant = variants.get(variant_id)
+        unit_price = variant.price.effective_price if variant and hasattr(variant, 'price') else 0
+        lines.append({
+            'variant_id': variant_id,
+            'quantity': quantity,
+            'unit_price': float(unit_price),
+            'item_total': float(unit_price * quantity)
+        })
+    summary = cart.get_summary()
+    
+    return JsonResponse({
+        'status': 'success',
+        'message': 'Cart updated.',
+        'lines': lines,
+        'cart_count': summary['count'],
+        'cart_total': float(summary['subtotal'])
+    })
+
+
 def cart_detail(request):
     """Display the cart summary page."""
     cart = SessionCart(request)
@@ -0,0 +1,77 @@
+"""
+Attribute filters for product listings, served by the VariantAttributeValue index.
+
+Query parameters:
+
+- attr_<slug>=<value>, repeatable; a product matches if any value matches.
+- attr_<slug>_min / attr_<slug>_max, inclusive bounds for int and decimal attributes.
+
+Filters on different attributes are combined with AND and must all hold for
+the same variant. Unknown attributes and values that don't parse for the
+attribute's data type are ignored.
+"""
+from .models import ProductAttribute, VariantAttributeValue
+
+
+PARAM_PREFIX = 'attr_'
+
+
+def get_attribute_filters(params):
+    """
+    Parse attr_* parameters from a QueryDict into a list of
+    (attribute, values, minimum, maximum) tuples. Costs one query when any
+    attribute parameter is present.
+    """
+    requested = {}
+    for name in params:
+        if not name.startswith(PARAM_PREFIX):
+            continue
+        slug, bound = name[len(PARAM_PREFIX):], None
+        for suffix in ('_min', '_max'):
+            if slug.endswith(suffix):
+                slug, bound = slug[:-len(suffix)], suffix[1:]
+        values = [value for value in params.getlist(name) if value.strip()]
+        if slug and values:
+            requested.setdefault(slug, {})[bound] = values
+
+    if not requested:
+        return []
+
+    filters = []
+    attributes = ProductAttribute.objects.in_bulk(list(requested), field_name='slug')
+    for slug, spec in requested.items():
+        attribute = attributes.get(slug)
+        if attribute is None:
+            continue
+        values = [v for v in (attribute.to_python(raw) for raw in spec.get(None, [])) if v is not None]
+        minimum = maximum = None
+        if attribute.is_numeric:
+            minimum = attribute.to_python(spec['min'][-1]) if 'min' in spec else None
+            maximum = attribute.to_python(spec['max'][-1]) if 'max' in spec else None
+        if values or minimum is not None or maximum is not None:
+            filters.append((attribute, values, minimum, maximum))
+    return filters
+
+
+def filter_by_attributes(queryset, attribute_filters):
+    """
+    Narrow a Product queryset with filters from get_attribute_filters().
+    A single variant must satisfy every attribute filter.
+    """
+    variants = None
+    for attribute, values, minimum, maximum in attribute_filters:
+        column = attribute.value_column
+        matches = VariantAttributeValue.objects.filter(attribute=attribute)
+        if values:
+            matches = matches.filter(**{f'{column}__in': values})
+        if minimum is not None:
+            matches = matches.filter(**{f'{column}__gte': minimum})
+        if maximum is not None:
+            matches = matches.filter(**{f'{column}__lte': maximum})
+        if variants is None:
+            variants = matches
+        else:
+            variants = variants.filter(variant_id__in=matches.values('variant_id'))
+    if variants is None:
+        return queryset
+    return queryset.filter(pk__in=variants.values('product_id'))
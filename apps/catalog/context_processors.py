@@ -1,10 +1,26 @@
+from django.utils.functional import SimpleLazyObject
+from apps.core import site_cache
 from .models import Category
 
+
+def get_nav_categories():
+    """Active root categories with their children prefetched, cached until a category changes."""
+    return site_cache.get_or_build('catalog', 'nav_categories', lambda: list(
+        Category.objects.filter(parent=None, is_active=True).prefetch_related('children')
+    ))
+
+
+def get_all_categories():
+    return site_cache.get_or_build('catalog', 'all_categories', lambda: list(
+        Category.objects.filter(is_active=True)
+    ))
+
+
 def catalog_context(request):
     """
     Context processor to provide common catalog data to all templates.
     """
     return {
-        'nav_categories': Category.objects.filter(parent=None, is_active=True).prefetch_related('children'),
-        'all_categories': Category.objects.filter(is_active=True),
+        'nav_categories': SimpleLazyObject(get_nav_categories),
+        'all_categories': SimpleLazyObject(get_all_categories),
     }
@@ -0,0 +1,172 @@
+"""
+Faceted filter counts for the catalog sidebar.
+
+Each facet is computed with one grouped/aggregate query over the products
+matching the current filters. A facet ignores its own filter (the brand facet
+is computed without the brand filter, and so on) so the sidebar keeps
+offering the alternatives.
+
+Results are cached per normalized filter set under a version key that the
+catalog signal receivers bump whenever products, variants, brands,
+attributes or listing snapshots change. Attribute counts come from the
+VariantAttributeValue index rather than the variants' JSON.
+"""
+import hashlib
+import json
+import uuid
+from decimal import Decimal
+from django.core.cache import cache
+from django.db.models import Count, Max, Min, Q
+from .models import VariantAttributeValue
+
+
+FACET_CACHE_TIMEOUT = 60 * 10
+FACET_VERSION_KEY = 'catalog:facets:version'
+
+# Request parameters that change the filtered product set
+FILTER_PARAMS = ('category', 'brand', 'q', 'min_price', 'max_price', 'featured', 'flash_sale', 'in_stock')
+
+# Lower bounds of the price histogram buckets (BDT)
+PRICE_BUCKETS = (0, 10000, 25000, 50000, 100000, 200000)
+
+
+def get_facet_version():
+    return cache.get_or_set(FACET_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def invalidate_facets():
+    """Make every cached facet result stale."""
+    cache.set(FACET_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def build_filter_key(params):
+    """Stable hash of the filter parameters that affect facet counts."""
+    normalized = []
+    for name in params:
+        if name not in FILTER_PARAMS and not name.startswith('attr_'):
+            continue
+        values = params.getlist(name) if hasattr(params, 'getlist') else [params[name]]
+        values = sorted(str(value).strip() for value in values if str(value).strip())
+        if values:
+            normalized.append((name, values))
+    return hashlib.md5(json.dumps(sorted(normalized)).encode()).hexdigest()
+
+
+def brand_facet(queryset):
+    rows = queryset.filter(brand__is_active=True).values(
+        'brand__name', 'brand__slug'
+    ).annotate(
+        product_count=Count('pk', distinct=True)
+    ).order_by('brand__name')
+    return [
+        {'name': row['brand__name'], 'slug': row['brand__slug'], 'product_count': row['product_count']}
+        for row in rows
+    ]
+
+
+def price_aggregates():
+    aggregates = {
+        'min': Min('listing__min_effective_price'),
+        'max': Max('listing__max_effective_price'),
+    }
+    bounds = list(PRICE_BUCKETS) + [None]
+    for index, lower in enumerate(PRICE_BUCKETS):
+        condition = Q(listing__min_effective_price__gte=lower)
+        if bounds[index + 1] is not None:
+            condition &= Q(listing__min_effective_price__lt=bounds[index + 1])
+        aggregates[f'bucket_{index}'] = Count('pk', filter=condition, distinct=True)
+    return aggregates
+
+
+def price_facet(result):
+    """Price range and histogram of lowest effective prices from the price_aggregates() result."""
+    bounds = list(PRICE_BUCKETS) + [None]
+    buckets = [
+        {'min': Decimal(lower), 'max': bounds[index + 1], 'count': result[f'bucket_{index}']}
+        for index, lower in enumerate(PRICE_BUCKETS)
+        if result[f'bucket_{index}']
+    ]
+    return {'min': result['min'], 'max': result['max'], 'buckets': buckets}
+
+
+def stock_aggregates():
+    return {
+        'total': Count('pk', distinct=True),
+        'in_stock': Count('pk', filter=Q(listing__in_stock=True), distinct=True),
+    }
+
+
+def stock_facet(result):
+    return {'total': result['total'], 'in_stock': result['in_stock']}
+
+
+def attribute_facets(queryset):
+    """Value counts for every filterable attribute, from one grouped query over the index."""
+    rows = VariantAttributeValue.objects.filter(
+        attribute__is_filterable=True, product_id__in=queryset.values('pk')
+    ).values(
+        'attribute__slug', 'attribute__name', 'attribute__unit', 'value_text'
+    ).annotate(
+        product_count=Count('product_id', distinct=True)
+    ).order_by(
+        'attribute__sort_order', 'attribute__name', 'attribute__slug', 'value_int', 'value_decimal', 'value_bool', 'value_text'
+    )
+    facets = []
+    for row in rows:
+        if not facets or facets[-1]['slug'] != row['attribute__slug']:
+            facets.append({
+                'slug': row['attribute__slug'],
+                'name': row['attribute__name'],
+                'unit': row['attribute__unit'],
+                'values': [],
+            })
+        facets[-1]['values'].append({'value': row['value_text'], 'product_count': row['product_count']})
+    return facets
+
+
+def get_active_filters(params):
+    """Names of the filters (as understood by `skip`) that the parameters switch on."""
+    active = {name for name in ('category', 'brand', 'q', 'featured', 'in_stock') if params.get(name)}
+    if params.get('min_price') or params.get('max_price'):
+        active.add('price')
+    if params.get('flash_sale') == 'true':
+        active.add('flash_sale')
+    if any(name.startswith('attr_') and params.get(name) for name in params):
+        active.add('attributes')
+    return active
+
+
+def compute_facets(filter_queryset, active=()):
+    """
+    Compute all facets. `filter_queryset(skip=...)` must return the filtered
+    product queryset, leaving out the named filters; `active` names the
+    filters currently applied.
+    """
+    active = set(active)
+    price_skip = tuple(active & {'price'})
+    stock_skip = tuple(active & {'in_stock'})
+    if price_skip == stock_skip:
+        # Neither filter is applied, so both facets share one aggregate query
+        result = filter_queryset(skip=price_skip).aggregate(**price_aggregates(), **stock_aggregates())
+        price, availability = price_facet(result), stock_facet(result)
+    else:
+        price = price_facet(filter_queryset(skip=price_skip).aggregate(**price_aggregates()))
+        availability = stock_facet(filter_queryset(skip=stock_skip).aggregate(**stock_aggregates()))
+    return {
+        'brands': brand_facet(filter_queryset(skip=('brand',))),
+        'price': price,
+        'availability': availability,
+        # Attribute values are counted without any attribute filter so the
+        # sidebar keeps offering the alternatives
+        'attributes': attribute_facets(filter_queryset(skip=('attributes',))),
+    }
+
+
+def get_facets(filter_queryset, params):
+    """Cached compute_facets() for the given filter parameters."""
+    key = f'catalog:facets:{get_facet_version()}:{build_filter_key(params)}'
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(filter_queryset, get_active_filters(params))
+        cache.set(key, facets, FACET_CACHE_TIMEOUT)
+    return facets
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from apps.catalog.models import VariantAttributeValue
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the variant attribute index from ProductVariant.attributes.'
+
+    def handle(self, *args, **options):
+        count = VariantAttributeValue.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} variant attribute values.'))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from apps.catalog.models import CategoryClosure
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the category closure table from Category.parent links.'
+
+    def handle(self, *args, **options):
+        count = CategoryClosure.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt category closure with {count} rows.'))
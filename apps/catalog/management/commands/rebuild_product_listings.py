@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from apps.catalog.models import Product, ProductListing
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized listing snapshot for every product.'
+
+    def handle(self, *args, **options):
+        count = 0
+        for product_id in Product.objects.values_list('pk', flat=True).iterator():
+            ProductListing.refresh(product_id)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} product listings.'))
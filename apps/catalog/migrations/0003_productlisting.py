@@ -0,0 +1,68 @@
+# Generated by Django 5.0.14 on 2026-10-17 00:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_listings(apps, schema_editor):
+    Product = apps.get_model('catalog', 'Product')
+    ProductListing = apps.get_model('catalog', 'ProductListing')
+    Price = apps.get_model('pricing', 'Price')
+    VariantInventory = apps.get_model('catalog', 'VariantInventory')
+    listings = []
+    for product in Product.objects.iterator():
+        variants = list(product.variants.filter(is_active=True))
+        prices = {price.variant_id: price for price in Price.objects.filter(variant__in=variants)}
+        stock = VariantInventory.objects.filter(variant__in=variants)
+        images = list(product.images.all())
+        primary = next((image for image in images if image.is_primary), images[0] if images else None)
+        listing = ProductListing(
+            product=product,
+            default_variant=variants[0] if variants else None,
+            primary_image_url=primary.image.url if primary else '',
+            in_stock=any(inventory.stock_qty > inventory.reserved_qty for inventory in stock),
+        )
+        price = prices.get(variants[0].pk) if variants else None
+        if price is not None:
+            on_sale = price.sale_price is not None and price.sale_price < price.list_price
+            listing.price = price.sale_price or price.list_price
+            listing.list_price = price.list_price
+            listing.is_on_sale = on_sale
+            if on_sale:
+                listing.discount_amount = price.list_price - price.sale_price
+                listing.discount_percent = int((price.list_price - price.sale_price) / price.list_price * 100)
+        listings.append(listing)
+    ProductListing.objects.bulk_create(listings, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0002_initial'),
+        ('pricing', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductListing',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='listing', serialize=False, to='catalog.product', verbose_name='product')),
+                ('price', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True, verbose_name='effective price')),
+                ('list_price', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True, verbose_name='list price')),
+                ('discount_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='discount amount')),
+                ('discount_percent', models.PositiveIntegerField(default=0, verbose_name='discount percent')),
+                ('is_on_sale', models.BooleanField(default=False, verbose_name='on sale')),
+                ('primary_image_url', models.CharField(blank=True, max_length=500, verbose_name='primary image URL')),
+                ('in_stock', models.BooleanField(default=False, verbose_name='in stock')),
+                ('average_rating', models.DecimalField(blank=True, decimal_places=2, max_digits=3, null=True, verbose_name='average rating')),
+                ('review_count', models.PositiveIntegerField(default=0, verbose_name='review count')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('default_variant', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='catalog.productvariant', verbose_name='default variant')),
+            ],
+            options={
+                'verbose_name': 'product listing',
+                'verbose_name_plural': 'product listings',
+            },
+        ),
+        migrations.RunPython(build_listings, migrations.RunPython.noop),
+    ]
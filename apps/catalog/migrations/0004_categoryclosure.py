@@ -0,0 +1,45 @@
+# Generated by Django 5.0.14 on 2026-10-17 00:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_closure(apps, schema_editor):
+    Category = apps.get_model('catalog', 'Category')
+    CategoryClosure = apps.get_model('catalog', 'CategoryClosure')
+    parents = dict(Category.objects.values_list('pk', 'parent_id'))
+    rows = []
+    for category_id in parents:
+        node, depth, visited = category_id, 0, set()
+        while node is not None and node not in visited:
+            rows.append(CategoryClosure(ancestor_id=node, descendant_id=category_id, depth=depth))
+            visited.add(node)
+            node = parents.get(node)
+            depth += 1
+    CategoryClosure.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0003_productlisting'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveIntegerField(verbose_name='depth')),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='catalog.category', verbose_name='ancestor')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='catalog.category', verbose_name='descendant')),
+            ],
+            options={
+                'verbose_name': 'category closure',
+                'verbose_name_plural': 'category closures',
+                'indexes': [models.Index(fields=['descendant', 'depth'], name='catalog_cat_descend_324f15_idx')],
+                'unique_together': {('ancestor', 'descendant')},
+            },
+        ),
+        migrations.RunPython(build_closure, migrations.RunPython.noop),
+    ]
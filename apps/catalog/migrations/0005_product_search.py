@@ -0,0 +1,58 @@
+# Generated by Django 5.0.14 on 2026-10-17 00:05
+
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS catalog_product_fts "
+            "USING fts5(name, short_description, description, tokenize='porter unicode61')"
+        )
+        schema_editor.execute(
+            "INSERT INTO catalog_product_fts (rowid, name, short_description, description) "
+            "SELECT id, name, short_description, description FROM catalog_product"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE INDEX catalog_productsearchvector_gin "
+            "ON catalog_productsearchvector USING gin (vector)"
+        )
+        schema_editor.execute(
+            "INSERT INTO catalog_productsearchvector (product_id, vector) "
+            "SELECT id, "
+            "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(short_description, '')), 'B') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'C') "
+            "FROM catalog_product"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS catalog_product_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0004_categoryclosure'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchVector',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_vector', serialize=False, to='catalog.product', verbose_name='product')),
+                ('vector', django.contrib.postgres.search.SearchVectorField(null=True)),
+            ],
+            options={
+                'verbose_name': 'product search vector',
+                'verbose_name_plural': 'product search vectors',
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.14 on 2026-10-17 00:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_product_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VariantAttributeValue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value_text', models.CharField(max_length=255, verbose_name='value')),
+                ('value_int', models.BigIntegerField(blank=True, null=True, verbose_name='integer value')),
+                ('value_decimal', models.DecimalField(blank=True, decimal_places=4, max_digits=16, null=True, verbose_name='decimal value')),
+                ('value_bool', models.BooleanField(blank=True, null=True, verbose_name='boolean value')),
+                ('attribute', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='variant_values', to='catalog.productattribute', verbose_name='attribute')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='catalog.product', verbose_name='product')),
+                ('variant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attribute_values', to='catalog.productvariant', verbose_name='variant')),
+            ],
+            options={
+                'verbose_name': 'variant attribute value',
+                'verbose_name_plural': 'variant attribute values',
+                'indexes': [models.Index(fields=['attribute', 'value_text', 'variant'], name='catalog_var_attribu_1dfdb6_idx'), models.Index(fields=['attribute', 'value_int', 'variant'], name='catalog_var_attribu_ca4618_idx'), models.Index(fields=['attribute', 'value_decimal', 'variant'], name='catalog_var_attribu_06af24_idx'), models.Index(fields=['attribute', 'value_bool', 'variant'], name='catalog_var_attribu_733a4c_idx')],
+                'unique_together': {('variant', 'attribute', 'value_text')},
+            },
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.0.14 on 2026-10-17 00:17
+
+from django.db import migrations, models
+
+
+def backfill_price_range(apps, schema_editor):
+    ProductListing = apps.get_model('catalog', 'ProductListing')
+    Price = apps.get_model('pricing', 'Price')
+    ranges = {}
+    rows = Price.objects.filter(variant__is_active=True).values_list(
+        'variant__product_id', 'list_price', 'sale_price'
+    )
+    for product_id, list_price, sale_price in rows.iterator():
+        effective = sale_price or list_price
+        low, high, on_sale = ranges.get(product_id, (effective, effective, False))
+        ranges[product_id] = (
+            min(low, effective),
+            max(high, effective),
+            on_sale or (sale_price is not None and sale_price < list_price),
+        )
+    listings = list(ProductListing.objects.filter(product_id__in=ranges))
+    for listing in listings:
+        listing.min_effective_price, listing.max_effective_price, listing.has_sale_variant = ranges[listing.product_id]
+    ProductListing.objects.bulk_update(
+        listings, ['min_effective_price', 'max_effective_price', 'has_sale_variant'], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0007_keyset_indexes'),
+        ('pricing', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='productlisting',
+            name='catalog_pro_price_357b50_idx',
+        ),
+        migrations.AddField(
+            model_name='productlisting',
+            name='has_sale_variant',
+            field=models.BooleanField(default=False, verbose_name='any variant on sale'),
+        ),
+        migrations.AddField(
+            model_name='productlisting',
+            name='max_effective_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True, verbose_name='highest price'),
+        ),
+        migrations.AddField(
+            model_name='productlisting',
+            name='min_effective_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True, verbose_name='lowest price'),
+        ),
+        migrations.AddIndex(
+            model_name='productlisting',
+            index=models.Index(fields=['min_effective_price', 'product'], name='catalog_pro_min_eff_5ac592_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productlisting',
+            index=models.Index(fields=['max_effective_price', 'product'], name='catalog_pro_max_eff_05f8e9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productlisting',
+            index=models.Index(fields=['has_sale_variant', 'product'], name='catalog_pro_has_sal_b05078_idx'),
+        ),
+        migrations.RunPython(backfill_price_range, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,12 @@
-from django.db import models
+import re
+from decimal import Decimal
+from django.db import models, transaction
 from django.urls import reverse
 from django.utils.text import slugify
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
+from django.core.exceptions import ObjectDoesNotExist
+from django.utils.functional import cached_property
 
 
 class Category(models.Model):
@@ -50,49 +55,154 @@ class Category(models.Model):
         from django.core.exceptions import ValidationError
         if self.parent == self:
             raise ValidationError("A category cannot be its own parent.")
-        if self.parent:
+        if self.parent and self.pk:
             # Check if parent is a descendant of self
-            ancestors = self.parent.get_ancestors()
-            if self in ancestors or self == self.parent:
+            if CategoryClosure.objects.filter(ancestor_id=self.pk, descendant_id=self.parent_id).exists():
                 raise ValidationError("Circular dependency detected.")
 
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
         self.full_clean()
-        super().save(*args, **kwargs)
+        created = self.pk is None
+        old_parent_id = None
+        if not created:
+            if hasattr(self, '_loaded_parent_id'):
+                old_parent_id = self._loaded_parent_id
+            else:
+                old_parent_id = Category.objects.filter(pk=self.pk).values_list('parent_id', flat=True).first()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if created or old_parent_id != self.parent_id:
+                CategoryClosure.move_subtree(self, created=created)
+        self._loaded_parent_id = self.parent_id
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The stored parent, so save() can tell a move without querying for it
+        if 'parent_id' in instance.__dict__:
+            instance._loaded_parent_id = instance.parent_id
+        return instance
     
     def get_absolute_url(self):
         return f"{reverse('catalog:product_list')}?category={self.slug}"
     
     def get_ancestors(self):
-        """Get all ancestor categories."""
-        ancestors = []
-        parent = self.parent
-        visited = {self.id}
-        while parent:
-            if parent.id in visited:
-                break
-            ancestors.insert(0, parent)
-            visited.add(parent.id)
-            parent = parent.parent
-        return ancestors
-    
-    def get_all_children(self, visited=None):
-        """Get all descendant categories."""
-        if visited is None:
-            visited = set()
-        
-        if self.id in visited:
-            return []
-            
-        visited.add(self.id)
-        children = list(self.children.filter(is_active=True))
-        all_descendants = children.copy()
+        """Get all ancestor categories, root first, in one query."""
+        links = CategoryClosure.objects.filter(
+            descendant_id=self.pk, depth__gt=0
+        ).select_related('ancestor').order_by('-depth')
+        return [link.ancestor for link in links]
+    
+    def _active_descendant_links(self):
+        # Descendants reachable through active categories only: anything below an
+        # inactive category in this subtree is hidden along with it.
+        inactive_in_subtree = CategoryClosure.objects.filter(
+            ancestor_id=self.pk, depth__gt=0, descendant__is_active=False
+        ).values('descendant_id')
+        hidden = CategoryClosure.objects.filter(
+            ancestor_id__in=inactive_in_subtree
+        ).values('descendant_id')
+        return CategoryClosure.objects.filter(
+            ancestor_id=self.pk, depth__gt=0
+        ).exclude(descendant_id__in=hidden)
+    
+    def get_all_children(self):
+        """Get all active descendant categories in one query."""
+        links = self._active_descendant_links().select_related('descendant').order_by(
+            'depth', 'descendant__sort_order', 'descendant__name'
+        )
+        return [link.descendant for link in links]
+    
+    def get_descendant_ids(self, include_self=True):
+        """Get ids of all active descendants (and this category) in one query."""
+        ids = list(self._active_descendant_links().values_list('descendant_id', flat=True))
+        if include_self:
+            ids.insert(0, self.pk)
+        return ids
+
+
+class CategoryClosure(models.Model):
+    """
+    Transitive closure of the category tree.
+    
+    Holds one row per (ancestor, descendant) pair, including a depth-0 row
+    linking every category to itself. Maintained by Category.save; deleting a
+    category cascades to its rows.
+    """
+    
+    ancestor = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        related_name='descendant_links',
+        verbose_name='ancestor'
+    )
+    descendant = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        related_name='ancestor_links',
+        verbose_name='descendant'
+    )
+    depth = models.PositiveIntegerField('depth')
+    
+    class Meta:
+        verbose_name = 'category closure'
+        verbose_name_plural = 'category closures'
+        unique_together = ('ancestor', 'descendant')
+        indexes = [
+            models.Index(fields=['descendant', 'depth']),
+        ]
+    
+    def __str__(self):
+        return f"{self.ancestor_id} -> {self.descendant_id} ({self.depth})"
+    
+    @classmethod
+    def move_subtree(cls, category, created=False):
+        """Attach `category` and its subtree under its current parent."""
+        if created:
+            subtree = [(category.pk, 0)]
+            rows = [cls(ancestor_id=category.pk, descendant_id=category.pk, depth=0)]
+        else:
+            subtree = list(
+                cls.objects.filter(ancestor_id=category.pk).values_list('descendant_id', 'depth')
+            )
+            subtree_ids = [descendant_id for descendant_id, _ in subtree]
+            # Detach the subtree from its old ancestors
+            cls.objects.filter(descendant_id__in=subtree_ids).exclude(
+                ancestor_id__in=subtree_ids
+            ).delete()
+            rows = []
         
-        for child in children:
-            all_descendants.extend(child.get_all_children(visited))
-        return all_descendants
+        if category.parent_id:
+            parent_links = cls.objects.filter(
+                descendant_id=category.parent_id
+            ).values_list('ancestor_id', 'depth')
+            for ancestor_id, ancestor_depth in parent_links:
+                for descendant_id, descendant_depth in subtree:
+                    rows.append(cls(
+                        ancestor_id=ancestor_id,
+                        descendant_id=descendant_id,
+                        depth=ancestor_depth + descendant_depth + 1,
+                    ))
+        cls.objects.bulk_create(rows)
+    
+    @classmethod
+    def rebuild(cls):
+        """Rebuild the whole closure table from Category.parent links."""
+        parents = dict(Category.objects.values_list('pk', 'parent_id'))
+        rows = []
+        for category_id in parents:
+            node, depth, visited = category_id, 0, set()
+            while node is not None and node not in visited:
+                rows.append(cls(ancestor_id=node, descendant_id=category_id, depth=depth))
+                visited.add(node)
+                node = parents.get(node)
+                depth += 1
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(rows, batch_size=1000)
+        return len(rows)
 
 
 class Brand(models.Model):
@@ -191,6 +301,8 @@ class Product(models.Model):
             models.Index(fields=['is_active', 'is_featured']),
             models.Index(fields=['category']),
             models.Index(fields=['brand']),
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['name', 'id']),
         ]
     
     def __str__(self):
@@ -204,14 +316,71 @@ class Product(models.Model):
     def get_absolute_url(self):
         return reverse('catalog:product_detail', kwargs={'slug': self.slug})
     
+    @property
+    def cached_listing(self):
+        """Listing snapshot if it was loaded with select_related('listing'), else None."""
+        return self._state.fields_cache.get('listing')
+    
+    def _get_prefetched(self, name):
+        """Return prefetched related objects for `name`, or None if not prefetched."""
+        cache = getattr(self, '_prefetched_objects_cache', None)
+        if cache and name in cache:
+            return list(cache[name])
+        return None
+    
+    @cached_property
+    def _active_variants(self):
+        variants = self._get_prefetched('variants')
+        if variants is not None:
+            return [v for v in variants if v.is_active]
+        return list(self.variants.filter(is_active=True).select_related('price', 'inventory'))
+    
+    @cached_property
+    def _image_list(self):
+        images = self._get_prefetched('images')
+        if images is not None:
+            return images
+        return list(self.images.all())
+    
+    def get_active_variants(self):
+        """
+        Active variants of this product.
+        
+        Reuses prefetched variants when available, otherwise runs a single
+        query; the result is memoized on the instance.
+        """
+        return self._active_variants
+    
     @property
     def primary_image(self):
         """Get the primary product image."""
-        return self.images.filter(is_primary=True).first() or self.images.first()
+        images = self._image_list
+        return next((image for image in images if image.is_primary), None) or (images[0] if images else None)
+    
+    @property
+    def primary_image_url(self):
+        """URL of the primary product image, or an empty string."""
+        listing = self.cached_listing
+        if listing is not None:
+            return listing.primary_image_url
+        image = self.primary_image
+        return image.image.url if image else ''
+    
+    @property
+    def default_variant_id(self):
+        """ID of the default variant, without loading it when a snapshot exists."""
+        listing = self.cached_listing
+        if listing is not None:
+            return listing.default_variant_id
+        variant = self.get_default_variant()
+        return variant.id if variant else None
     
     @property
     def price(self):
         """Get the effective price of the default variant."""
+        listing = self.cached_listing
+        if listing is not None:
+            return listing.price
         variant = self.get_default_variant()
         if variant and hasattr(variant, 'price'):
             return variant.price.effective_price
@@ -225,6 +394,9 @@ class Product(models.Model):
     @property
     def compare_at_price(self):
         """Get the list price of the default variant if on sale."""
+        listing = self.cached_listing
+        if listing is not None:
+            return listing.list_price if listing.is_on_sale else None
         variant = self.get_default_variant()
         if variant and hasattr(variant, 'price') and variant.price.is_on_sale:
             return variant.price.list_price
@@ -233,6 +405,9 @@ class Product(models.Model):
     @property
     def is_on_sale(self):
         """Check if the default variant is on sale."""
+        listing = self.cached_listing
+        if listing is not None:
+            return listing.is_on_sale
         variant = self.get_default_variant()
         if variant and hasattr(variant, 'price'):
             return variant.price.is_on_sale
@@ -241,6 +416,9 @@ class Product(models.Model):
     @property
     def discount_percent(self):
         """Get the discount percentage of the default variant."""
+        listing = self.cached_listing
+        if listing is not None:
+            return listing.discount_percent
         variant = self.get_default_variant()
         if variant and hasattr(variant, 'price'):
             return variant.price.discount_percent
@@ -249,25 +427,24 @@ class Product(models.Model):
     @property
     def discount_amount(self):
         """Calculate the discount amount."""
+        listing = self.cached_listing
+        if listing is not None:
+            return listing.discount_amount
         if self.compare_at_price and self.price:
             return self.compare_at_price - self.price
         return 0
     
     def get_default_variant(self):
         """Get the default (first active) variant."""
-        return self.variants.filter(is_active=True).first()
+        variants = self._active_variants
+        return variants[0] if variants else None
     
     def get_price_range(self):
         """Get min and max prices across all variants."""
-        variants = self.variants.filter(is_active=True)
-        if not variants.exists():
-            return None, None
-        
-        prices = []
-        for variant in variants:
-            if hasattr(variant, 'price'):
-                effective = variant.price.sale_price or variant.price.list_price
-                prices.append(effective)
+        prices = [
+            price for price in (v.get_effective_price() for v in self._active_variants)
+            if price is not None
+        ]
         
         if not prices:
             return None, None
@@ -275,14 +452,17 @@ class Product(models.Model):
     
     def is_in_stock(self):
         """Check if any variant is in stock."""
-        for variant in self.variants.filter(is_active=True):
-            if hasattr(variant, 'inventory') and variant.inventory.available_qty > 0:
-                return True
-        return False
+        listing = self.cached_listing
+        if listing is not None:
+            return listing.in_stock
+        return any(variant.is_in_stock() for variant in self._active_variants)
     
     @property
     def average_rating(self):
         """Calculate average rating from reviews."""
+        listing = self.cached_listing
+        if listing is not None:
+            return listing.average_rating
         if not hasattr(self, 'reviews'):
             return None
         reviews = self.reviews.filter(is_approved=True)
@@ -293,6 +473,9 @@ class Product(models.Model):
     @property
     def review_count(self):
         """Count approved reviews."""
+        listing = self.cached_listing
+        if listing is not None:
+            return listing.review_count
         if not hasattr(self, 'reviews'):
             return 0
         return self.reviews.filter(is_approved=True).count()
@@ -367,7 +550,52 @@ class ProductAttribute(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+        # Only the slug (which JSON keys match) and the data type change the indexed values
+        self.index_changed = getattr(self, '_loaded_index_key', None) != (self.slug, self.data_type)
         super().save(*args, **kwargs)
+        self._loaded_index_key = (self.slug, self.data_type)
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'slug' in instance.__dict__ and 'data_type' in instance.__dict__:
+            instance._loaded_index_key = (instance.slug, instance.data_type)
+        return instance
+    
+    @property
+    def value_column(self):
+        """VariantAttributeValue column holding this attribute's typed values."""
+        return {
+            'int': 'value_int',
+            'decimal': 'value_decimal',
+            'bool': 'value_bool',
+        }.get(self.data_type, 'value_text')
+    
+    @property
+    def is_numeric(self):
+        return self.data_type in ('int', 'decimal')
+    
+    def to_python(self, value):
+        """
+        Convert a raw attribute or query-string value to this attribute's type.
+        Numbers may carry the unit (e.g. "16GB"). Returns None if it doesn't parse.
+        """
+        if isinstance(value, bool) and self.data_type != 'bool':
+            value = int(value)
+        text = str(value).strip()
+        if self.data_type == 'bool':
+            if isinstance(value, bool):
+                return value
+            return {'true': True, 'yes': True, '1': True, 'false': False, 'no': False, '0': False}.get(text.lower())
+        if self.is_numeric:
+            match = re.match(r'^-?\d+(\.\d+)?', text.replace(',', ''))
+            if not match:
+                return None
+            number = Decimal(match.group(0))
+            if self.data_type == 'int':
+                return int(number)
+            return number
+        return text[:255] or None
 
 
 class ProductVariant(models.Model):
@@ -424,21 +652,37 @@ class ProductVariant(models.Model):
             return f"{self.product.name} - {self.variant_name}"
         return self.product.name
     
+    def _get_related_or_none(self, name):
+        # Reverse one-to-one access caches the row (or its absence) on the instance,
+        # so select_related()/prefetch_related() results are reused here.
+        try:
+            return getattr(self, name)
+        except ObjectDoesNotExist:
+            return None
+    
+    def get_price(self):
+        """Get the Price row, or None if the variant has not been priced."""
+        return self._get_related_or_none('price')
+    
+    def get_inventory(self):
+        """Get the VariantInventory row, or None if stock is not tracked."""
+        return self._get_related_or_none('inventory')
+    
     def get_image(self):
         """Get variant image or fall back to product primary image."""
         return self.product.primary_image
     
     def get_effective_price(self):
         """Get the effective selling price."""
-        if hasattr(self, 'price'):
-            return self.price.sale_price or self.price.list_price
+        price = self.get_price()
+        if price is not None:
+            return price.sale_price or price.list_price
         return None
     
     def is_in_stock(self):
         """Check if variant is in stock."""
-        if hasattr(self, 'inventory'):
-            return self.inventory.available_qty > 0
-        return False
+        inventory = self.get_inventory()
+        return inventory is not None and inventory.available_qty > 0
 
 
 class VariantInventory(models.Model):
@@ -480,6 +724,254 @@ class VariantInventory(models.Model):
         return self.available_qty == 0
 
 
+class ProductListing(models.Model):
+    """
+    Denormalized per-product snapshot used to render listing cards.
+    
+    Kept in sync by the signal receivers in apps.catalog.signals so that
+    product grids can render every card from a single joined row.
+    """
+    
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='listing',
+        verbose_name='product'
+    )
+    default_variant = models.ForeignKey(
+        ProductVariant,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='default variant'
+    )
+    
+    # Pricing of the default variant
+    price = models.DecimalField('effective price', max_digits=12, decimal_places=2, null=True, blank=True)
+    list_price = models.DecimalField('list price', max_digits=12, decimal_places=2, null=True, blank=True)
+    discount_amount = models.DecimalField('discount amount', max_digits=12, decimal_places=2, default=0)
+    discount_percent = models.PositiveIntegerField('discount percent', default=0)
+    is_on_sale = models.BooleanField('on sale', default=False)
+    
+    # Across all active variants; used for price sorting and filtering
+    min_effective_price = models.DecimalField('lowest price', max_digits=12, decimal_places=2, null=True, blank=True)
+    max_effective_price = models.DecimalField('highest price', max_digits=12, decimal_places=2, null=True, blank=True)
+    has_sale_variant = models.BooleanField('any variant on sale', default=False)
+    
+    primary_image_url = models.CharField('primary image URL', max_length=500, blank=True)
+    in_stock = models.BooleanField('in stock', default=False)
+    
+    average_rating = models.DecimalField('average rating', max_digits=3, decimal_places=2, null=True, blank=True)
+    review_count = models.PositiveIntegerField('review count', default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'product listing'
+        verbose_name_plural = 'product listings'
+        indexes = [
+            models.Index(fields=['min_effective_price', 'product']),
+            models.Index(fields=['max_effective_price', 'product']),
+            models.Index(fields=['has_sale_variant', 'product']),
+        ]
+    
+    def __str__(self):
+        return f"Listing for {self.product_id}"
+    
+    @classmethod
+    def refresh(cls, product_id):
+        """Recompute and store the snapshot for a product. Returns None if the product is gone."""
+        product = Product.objects.filter(pk=product_id).first()
+        if product is None:
+            return None
+        
+        variants = list(
+            product.variants.filter(is_active=True).select_related('price', 'inventory')
+        )
+        images = list(product.images.all())
+        default_variant = variants[0] if variants else None
+        prices = [v.price for v in variants if hasattr(v, 'price')]
+        effective_prices = [price.effective_price for price in prices]
+        primary = next((image for image in images if image.is_primary), None)
+        if primary is None and images:
+            primary = images[0]
+        
+        values = {
+            'default_variant': default_variant,
+            'price': None,
+            'list_price': None,
+            'discount_amount': 0,
+            'discount_percent': 0,
+            'is_on_sale': False,
+            'min_effective_price': min(effective_prices, default=None),
+            'max_effective_price': max(effective_prices, default=None),
+            'has_sale_variant': any(price.is_on_sale for price in prices),
+            'primary_image_url': primary.image.url if primary else '',
+            'in_stock': any(
+                hasattr(v, 'inventory') and v.inventory.available_qty > 0 for v in variants
+            ),
+            'average_rating': None,
+            'review_count': 0,
+        }
+        
+        if default_variant is not None and hasattr(default_variant, 'price'):
+            price = default_variant.price
+            values.update({
+                'price': price.effective_price,
+                'list_price': price.list_price,
+                'is_on_sale': price.is_on_sale,
+                'discount_percent': price.discount_percent,
+                'discount_amount': price.list_price - price.sale_price if price.is_on_sale else 0,
+            })
+        
+        if hasattr(product, 'reviews'):
+            reviews = product.reviews.filter(is_approved=True).aggregate(
+                avg=models.Avg('rating'), count=models.Count('id')
+            )
+            values['average_rating'] = reviews['avg']
+            values['review_count'] = reviews['count']
+        
+        listing, _ = cls.objects.update_or_create(product=product, defaults=values)
+        return listing
+
+
+class ProductSearchVector(models.Model):
+    """
+    Precomputed full-text document for the PostgreSQL search backend.
+    
+    Maintained by apps.catalog.search; the SQLite backend keeps its index in
+    an FTS5 virtual table instead and leaves this table empty.
+    """
+    
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='search_vector',
+        verbose_name='product'
+    )
+    vector = SearchVectorField(null=True)
+    
+    class Meta:
+        verbose_name = 'product search vector'
+        verbose_name_plural = 'product search vectors'
+    
+    def __str__(self):
+        return f"Search vector for {self.product_id}"
+
+
+class VariantAttributeValue(models.Model):
+    """
+    Typed, normalized copy of ProductVariant.attributes used for filtering.
+    
+    One row per (variant, attribute, value) for active variants; rebuilt from
+    the JSON whenever a variant is saved (see apps.catalog.signals). Keys of
+    the JSON are matched to ProductAttribute by slug.
+    """
+    
+    variant = models.ForeignKey(
+        ProductVariant,
+        on_delete=models.CASCADE,
+        related_name='attribute_values',
+        verbose_name='variant'
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='product'
+    )
+    attribute = models.ForeignKey(
+        ProductAttribute,
+        on_delete=models.CASCADE,
+        related_name='variant_values',
+        verbose_name='attribute'
+    )
+    
+    # Display value, and the typed value for the attribute's data type
+    value_text = models.CharField('value', max_length=255)
+    value_int = models.BigIntegerField('integer value', null=True, blank=True)
+    value_decimal = models.DecimalField('decimal value', max_digits=16, decimal_places=4, null=True, blank=True)
+    value_bool = models.BooleanField('boolean value', null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'variant attribute value'
+        verbose_name_plural = 'variant attribute values'
+        unique_together = ('variant', 'attribute', 'value_text')
+        indexes = [
+            models.Index(fields=['attribute', 'value_text', 'variant']),
+            models.Index(fields=['attribute', 'value_int', 'variant']),
+            models.Index(fields=['attribute', 'value_decimal', 'variant']),
+            models.Index(fields=['attribute', 'value_bool', 'variant']),
+        ]
+    
+    def __str__(self):
+        return f"{self.attribute}: {self.value_text}"
+    
+    @classmethod
+    def build_rows(cls, variant, attributes):
+        """Unsaved rows for `variant`, given ProductAttribute objects by slug."""
+        rows = []
+        if not variant.is_active or not isinstance(variant.attributes, dict):
+            return rows
+        # Keys such as "Color" and "color" resolve to the same attribute
+        seen = set()
+        for key, raw in variant.attributes.items():
+            attribute = attributes.get(slugify(key))
+            if attribute is None:
+                continue
+            for item in raw if isinstance(raw, list) else [raw]:
+                text = '' if item is None else str(item).strip()[:255]
+                typed = attribute.to_python(item) if text else None
+                if typed is None or (attribute.pk, text) in seen:
+                    continue
+                seen.add((attribute.pk, text))
+                row = cls(variant=variant, product_id=variant.product_id, attribute=attribute, value_text=text)
+                if attribute.value_column != 'value_text':
+                    setattr(row, attribute.value_column, typed)
+                rows.append(row)
+        return rows
+    
+    @classmethod
+    def index_variant(cls, variant):
+        """Replace the indexed values of one variant."""
+        keys = [slugify(key) for key in variant.attributes] if isinstance(variant.attributes, dict) else []
+        attributes = ProductAttribute.objects.in_bulk(keys, field_name='slug') if keys else {}
+        with transaction.atomic():
+            cls.objects.filter(variant=variant).delete()
+            cls.objects.bulk_create(cls.build_rows(variant, attributes))
+    
+    @classmethod
+    def rebuild(cls, attribute=None, batch_size=500):
+        """
+        Rebuild the index for all variants, or only the values of `attribute`.
+        Returns the number of rows written.
+        """
+        attributes = {a.slug: a for a in ProductAttribute.objects.all()}
+        if attribute is not None:
+            attributes = {attribute.slug: attribute} if attribute.slug in attributes else {}
+        count = 0
+        with transaction.atomic():
+            existing = cls.objects.all() if attribute is None else cls.objects.filter(attribute=attribute)
+            existing.delete()
+            if not attributes:
+                return 0
+            batch = []
+            variants = ProductVariant.objects.filter(is_active=True).exclude(attributes={})
+            for variant in variants.iterator(chunk_size=batch_size):
+                batch.extend(cls.build_rows(variant, attributes))
+                if len(batch) >= batch_size:
+                    cls.objects.bulk_create(batch)
+                    count += len(batch)
+                    batch = []
+            if batch:
+                cls.objects.bulk_create(batch)
+                count += len(batch)
+        return count
+
+
 class DigitalLicenseKey(models.Model):
     """License keys for digital products."""
     
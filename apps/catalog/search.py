@@ -0,0 +1,198 @@
+"""
+Pluggable full-text search for products.
+
+The active backend is chosen from settings.CATALOG_SEARCH_BACKEND (a dotted
+path) or, by default, from the database vendor:
+
+- PostgreSQL: weighted tsvectors stored in ProductSearchVector with a GIN index.
+- SQLite: an FTS5 virtual table (catalog_product_fts) ranked with bm25().
+- Anything else: plain icontains matching, without ranking.
+
+Every backend exposes the same API: index_product(), remove_product(),
+rebuild(), filter(queryset, query), which narrows the queryset to matching
+products, and search(queryset, query), which also annotates `search_rank`
+(higher is better).
+"""
+import re
+from django.conf import settings
+from django.db import connection, models
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+
+FTS_TABLE = 'catalog_product_fts'
+
+
+class BaseSearchBackend:
+    """Index-less fallback: icontains over the text fields, no relevance ranking."""
+
+    fields = ('name', 'short_description', 'description')
+    batch_size = 500
+
+    def index_product(self, product):
+        pass
+
+    def remove_product(self, product_id):
+        pass
+
+    def rebuild(self):
+        """Rebuild the whole index. Returns the number of products indexed."""
+        return 0
+
+    def filter(self, queryset, query):
+        condition = models.Q()
+        for field in self.fields:
+            condition |= models.Q(**{f'{field}__icontains': query})
+        return queryset.filter(condition)
+
+    def rank(self, queryset, query):
+        return queryset.annotate(search_rank=models.Value(0.0))
+
+    def search(self, queryset, query):
+        return self.rank(self.filter(queryset, query), query)
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """FTS5 virtual table keyed by product id (rowid)."""
+
+    # bm25() column weights for name, short_description, description
+    weights = (10.0, 4.0, 1.0)
+
+    @staticmethod
+    def build_match_query(query):
+        """Turn free text into a safe FTS5 query: every term must match, as a prefix."""
+        terms = re.findall(r'\w+', query)
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def index_product(self, product):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [product.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, short_description, description) '
+                'VALUES (%s, %s, %s, %s)',
+                [product.pk, product.name, product.short_description, product.description],
+            )
+
+    def remove_product(self, product_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [product_id])
+
+    def rebuild(self):
+        from .models import Product
+
+        count = 0
+        rows = Product.objects.values_list('pk', *self.fields).order_by('pk')
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            batch = []
+            for row in rows.iterator(chunk_size=self.batch_size):
+                batch.append(row)
+                if len(batch) >= self.batch_size:
+                    self._insert_batch(cursor, batch)
+                    count += len(batch)
+                    batch = []
+            if batch:
+                self._insert_batch(cursor, batch)
+                count += len(batch)
+        return count
+
+    def _insert_batch(self, cursor, batch):
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, short_description, description) '
+            'VALUES (%s, %s, %s, %s)',
+            batch,
+        )
+
+    def filter(self, queryset, query):
+        match = self.build_match_query(query)
+        if not match:
+            return queryset.none()
+        matches = RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+        return queryset.filter(pk__in=matches)
+
+    def rank(self, queryset, query):
+        match = self.build_match_query(query)
+        if not match:
+            return super().rank(queryset, query)
+        table = queryset.model._meta.db_table
+        weights = ', '.join(str(w) for w in self.weights)
+        # bm25() is lower-is-better, so negate it to get a conventional rank
+        return queryset.annotate(search_rank=RawSQL(
+            f'SELECT -bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = "{table}"."id"',
+            [match],
+            output_field=models.FloatField(),
+        ))
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """Weighted tsvectors in ProductSearchVector, served by a GIN index."""
+
+    config = 'english'
+    weights = (('name', 'A'), ('short_description', 'B'), ('description', 'C'))
+
+    def _vector(self):
+        """Subquery computing the weighted vector of the row's product."""
+        from django.contrib.postgres.search import SearchVector
+        from .models import Product
+
+        vector = None
+        for field, weight in self.weights:
+            part = SearchVector(field, weight=weight, config=self.config)
+            vector = part if vector is None else vector + part
+        return models.Subquery(
+            Product.objects.filter(pk=models.OuterRef('product_id')).annotate(
+                document=vector
+            ).values('document')[:1]
+        )
+
+    def index_product(self, product):
+        from .models import ProductSearchVector
+
+        ProductSearchVector.objects.get_or_create(product_id=product.pk)
+        ProductSearchVector.objects.filter(product_id=product.pk).update(vector=self._vector())
+
+    def remove_product(self, product_id):
+        from .models import ProductSearchVector
+
+        ProductSearchVector.objects.filter(product_id=product_id).delete()
+
+    def rebuild(self):
+        from .models import Product, ProductSearchVector
+
+        ProductSearchVector.objects.all().delete()
+        product_ids = Product.objects.values_list('pk', flat=True)
+        ProductSearchVector.objects.bulk_create(
+            (ProductSearchVector(product_id=pk) for pk in product_ids.iterator()),
+            batch_size=self.batch_size,
+        )
+        return ProductSearchVector.objects.update(vector=self._vector())
+
+    def _query(self, query):
+        from django.contrib.postgres.search import SearchQuery
+
+        return SearchQuery(query, search_type='websearch', config=self.config)
+
+    def filter(self, queryset, query):
+        return queryset.filter(search_vector__vector=self._query(query))
+
+    def rank(self, queryset, query):
+        from django.contrib.postgres.search import SearchRank
+
+        return queryset.annotate(
+            search_rank=SearchRank(models.F('search_vector__vector'), self._query(query))
+        )
+
+
+VENDOR_BACKENDS = {
+    'postgresql': PostgresSearchBackend,
+    'sqlite': SQLiteSearchBackend,
+}
+
+
+def get_search_backend():
+    """Return the configured search backend instance."""
+    path = getattr(settings, 'CATALOG_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    return VENDOR_BACKENDS.get(connection.vendor, BaseSearchBackend)()
@@ -0,0 +1,94 @@
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.core import site_cache
+from .facets import invalidate_facets
+from .models import (
+    Brand, Category, Product, ProductAttribute, ProductImage, ProductListing, ProductVariant,
+    VariantAttributeValue, VariantInventory
+)
+from .search import get_search_backend
+
+
+def schedule_listing_refresh(product_id):
+    """Refresh the listing snapshot once the surrounding transaction commits."""
+    if product_id:
+        transaction.on_commit(lambda: ProductListing.refresh(product_id))
+
+
+def _product_id_for_variant(variant_id):
+    return ProductVariant.objects.filter(pk=variant_id).values_list('product_id', flat=True).first()
+
+
+@receiver(post_save, sender=Product)
+def refresh_listing_on_product_save(sender, instance, **kwargs):
+    schedule_listing_refresh(instance.pk)
+
+
+@receiver(post_save, sender=Product)
+def update_search_index_on_product_save(sender, instance, **kwargs):
+    get_search_backend().index_product(instance)
+
+
+@receiver(post_delete, sender=Product)
+def update_search_index_on_product_delete(sender, instance, **kwargs):
+    get_search_backend().remove_product(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=ProductVariant)
+@receiver([post_save, post_delete], sender=ProductImage)
+def refresh_listing_on_product_child_change(sender, instance, **kwargs):
+    schedule_listing_refresh(instance.product_id)
+
+
+@receiver([post_save, post_delete], sender=VariantInventory)
+@receiver([post_save, post_delete], sender='pricing.Price')
+def refresh_listing_on_variant_child_change(sender, instance, **kwargs):
+    schedule_listing_refresh(_product_id_for_variant(instance.variant_id))
+
+
+def refresh_listing_on_review_change(sender, instance, **kwargs):
+    # Ratings in the snapshot count approved reviews only
+    schedule_listing_refresh(instance.product_id)
+
+
+# The reviews app may not define its model yet; ProductListing.refresh() skips ratings then too
+if apps.is_installed('apps.reviews'):
+    try:
+        Review = apps.get_model('reviews', 'Review')
+    except LookupError:
+        pass
+    else:
+        post_save.connect(refresh_listing_on_review_change, sender=Review, dispatch_uid='refresh_listing_on_review_save')
+        post_delete.connect(refresh_listing_on_review_change, sender=Review, dispatch_uid='refresh_listing_on_review_delete')
+
+
+@receiver(post_save, sender=ProductVariant)
+def update_attribute_index_on_variant_save(sender, instance, **kwargs):
+    VariantAttributeValue.index_variant(instance)
+
+
+@receiver(post_save, sender=ProductAttribute)
+def update_attribute_index_on_attribute_save(sender, instance, **kwargs):
+    # Picks up JSON keys that now match the slug, or a changed data type; other
+    # edits (name, unit, ordering) leave the index alone
+    if getattr(instance, 'index_changed', True):
+        transaction.on_commit(lambda: VariantAttributeValue.rebuild(attribute=instance))
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=ProductVariant)
+@receiver([post_save, post_delete], sender=ProductListing)
+@receiver([post_save, post_delete], sender=ProductAttribute)
+@receiver([post_save, post_delete], sender=Brand)
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_facets_on_catalog_change(sender, **kwargs):
+    # Price and stock changes arrive through the ProductListing refresh. Waiting
+    # for the commit keeps a concurrent request from caching the old rows anew.
+    transaction.on_commit(invalidate_facets)
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_navigation_on_category_change(sender, **kwargs):
+    transaction.on_commit(lambda: site_cache.bump('catalog'))
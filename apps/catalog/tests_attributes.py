@@ -0,0 +1,120 @@
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from apps.catalog.models import (
+    Category, Product, ProductAttribute, ProductVariant, VariantAttributeValue
+)
+
+
+class VariantAttributeIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name="Laptops", slug="laptops")
+        self.ram = ProductAttribute.objects.create(name="RAM", slug="ram", data_type='int', unit='GB', is_filterable=True)
+        self.weight = ProductAttribute.objects.create(name="Weight", slug="weight", data_type='decimal')
+        self.touch = ProductAttribute.objects.create(name="Touchscreen", slug="touchscreen", data_type='bool')
+        self.colour = ProductAttribute.objects.create(name="Colour", slug="colour", is_filterable=True)
+        self.counter = 0
+
+    def create_product(self, *variant_attributes):
+        self.counter += 1
+        product = Product.objects.create(name=f"P{self.counter}", slug=f"p{self.counter}", category=self.category)
+        for index, attributes in enumerate(variant_attributes):
+            ProductVariant.objects.create(product=product, sku=f"P{self.counter}-{index}", attributes=attributes)
+        return product
+
+    def list_slugs(self, query):
+        response = Client().get(reverse('catalog:product_list') + query)
+        self.assertEqual(response.status_code, 200)
+        return sorted(p.slug for p in response.context['products'])
+
+    def test_values_are_typed_on_variant_save(self):
+        product = self.create_product({'RAM': '16GB', 'weight': 1.25, 'touchscreen': 'yes', 'colour': ['Black', 'Silver'], 'other': 'x'})
+        rows = {
+            (row.attribute.slug, row.value_text): row
+            for row in VariantAttributeValue.objects.filter(product=product).select_related('attribute')
+        }
+        self.assertEqual(set(rows), {
+            ('ram', '16GB'), ('weight', '1.25'), ('touchscreen', 'yes'), ('colour', 'Black'), ('colour', 'Silver')
+        })
+        self.assertEqual(rows['ram', '16GB'].value_int, 16)
+        self.assertEqual(rows['weight', '1.25'].value_decimal, Decimal('1.25'))
+        self.assertIs(rows['touchscreen', 'yes'].value_bool, True)
+
+        variant = product.variants.get()
+        variant.attributes = {'ram': 'lots'}
+        variant.save()
+        self.assertFalse(VariantAttributeValue.objects.filter(product=product).exists())
+
+        variant.attributes = {'ram': 8}
+        variant.is_active = False
+        variant.save()
+        self.assertFalse(VariantAttributeValue.objects.filter(product=product).exists())
+
+    def test_new_attribute_indexes_existing_variants(self):
+        product = self.create_product({'storage': '512GB'})
+        with self.captureOnCommitCallbacks(execute=True):
+            storage = ProductAttribute.objects.create(name="Storage", slug="storage", data_type='int')
+        self.assertEqual(
+            list(VariantAttributeValue.objects.filter(product=product).values_list('value_int', flat=True)), [512]
+        )
+
+        storage = ProductAttribute.objects.get(pk=storage.pk)
+        storage.unit = 'GB'
+        with mock.patch.object(VariantAttributeValue, 'rebuild') as rebuild, \
+                self.captureOnCommitCallbacks(execute=True):
+            storage.save()
+        rebuild.assert_not_called()
+
+        storage.data_type = 'text'
+        with self.captureOnCommitCallbacks(execute=True):
+            storage.save()
+        self.assertEqual(
+            list(VariantAttributeValue.objects.filter(product=product).values_list('value_text', 'value_int')), [('512GB', None)]
+        )
+
+    def test_keys_resolving_to_one_attribute(self):
+        product = self.create_product({'Colour': 'Black', 'colour': ['Black', 'Red']})
+        self.assertEqual(
+            sorted(VariantAttributeValue.objects.filter(product=product).values_list('value_text', flat=True)), ['Black', 'Red']
+        )
+
+    def test_rebuild(self):
+        self.create_product({'ram': 8}, {'ram': 16})
+        VariantAttributeValue.objects.all().delete()
+        self.assertEqual(VariantAttributeValue.rebuild(), 2)
+
+    def test_list_filters(self):
+        self.create_product({'ram': 8, 'colour': 'Black'})
+        self.create_product({'ram': 16, 'colour': 'Silver'}, {'ram': 32, 'colour': 'Black'})
+        self.create_product({'ram': 32, 'colour': 'Silver', 'touchscreen': True})
+
+        self.assertEqual(self.list_slugs('?attr_ram=8'), ['p1'])
+        self.assertEqual(self.list_slugs('?attr_ram=8GB&attr_ram=16'), ['p1', 'p2'])
+        self.assertEqual(self.list_slugs('?attr_ram_min=16&attr_ram_max=31'), ['p2'])
+        self.assertEqual(self.list_slugs('?attr_ram_min=32&attr_colour=Silver'), ['p3'])
+        self.assertEqual(self.list_slugs('?attr_touchscreen=true'), ['p3'])
+        self.assertEqual(self.list_slugs('?attr_unknown=1'), ['p1', 'p2', 'p3'])
+
+    def test_filters_and_facets_use_the_index(self):
+        self.create_product({'ram': 8, 'colour': 'Black'})
+        with CaptureQueriesContext(connection) as ctx:
+            self.list_slugs('?attr_ram=8')
+        sql = ' '.join(query['sql'] for query in ctx.captured_queries)
+        self.assertIn('catalog_variantattributevalue', sql)
+        self.assertNotIn('JSON_EXTRACT', sql.upper())
+
+    def test_attribute_facets_are_marked_selected(self):
+        self.create_product({'ram': 8, 'colour': 'Black'})
+        self.create_product({'ram': 16, 'colour': 'Silver'})
+        response = Client().get(reverse('catalog:product_list'), {'attr_ram': '8'})
+        facets = {facet['slug']: facet for facet in response.context['attribute_facets']}
+        self.assertEqual(
+            [(v['value'], v['product_count'], v['selected']) for v in facets['ram']['values']],
+            [('8', 1, True), ('16', 1, False)]
+        )
+        self.assertNotIn('weight', facets)
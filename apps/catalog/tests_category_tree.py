@@ -0,0 +1,92 @@
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from apps.catalog.models import Category, CategoryClosure
+
+
+class CategoryClosureTests(TestCase):
+    def setUp(self):
+        self.root = Category.objects.create(name="Computers", slug="computers")
+        self.laptops = Category.objects.create(name="Laptops", slug="laptops", parent=self.root)
+        self.gaming = Category.objects.create(name="Gaming", slug="gaming", parent=self.laptops)
+        self.hidden = Category.objects.create(name="Hidden", slug="hidden", parent=self.root, is_active=False)
+        self.under_hidden = Category.objects.create(name="Under", slug="under", parent=self.hidden)
+
+    def test_ancestors_and_descendants(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.gaming.get_ancestors(), [self.root, self.laptops])
+        with self.assertNumQueries(1):
+            self.assertEqual(self.root.get_all_children(), [self.laptops, self.gaming])
+        with self.assertNumQueries(1):
+            self.assertEqual(self.root.get_descendant_ids(), [self.root.id, self.laptops.id, self.gaming.id])
+
+    def test_move_subtree(self):
+        other = Category.objects.create(name="Accessories", slug="accessories")
+        self.laptops.parent = other
+        self.laptops.save()
+        self.assertEqual(self.gaming.get_ancestors(), [other, self.laptops])
+        self.assertEqual(self.root.get_descendant_ids(), [self.root.id])
+        self.assertCountEqual(other.get_descendant_ids(), [other.id, self.laptops.id, self.gaming.id])
+
+    def test_save_without_move_leaves_the_closure_alone(self):
+        laptops = Category.objects.get(pk=self.laptops.pk)
+        laptops.name = "Notebooks"
+        with CaptureQueriesContext(connection) as queries:
+            laptops.save()
+        statements = [query['sql'] for query in queries]
+        self.assertFalse([sql for sql in statements if sql.startswith('SELECT "catalog_category"."parent_id"')])
+        self.assertFalse([sql for sql in statements if 'catalog_categoryclosure' in sql and not sql.startswith('SELECT')])
+
+    def test_cycle_is_rejected(self):
+        self.root.parent = self.gaming
+        with self.assertRaises(ValidationError):
+            self.root.save()
+
+    def test_delete_cascades(self):
+        self.laptops.delete()
+        self.assertFalse(CategoryClosure.objects.filter(descendant_id=self.gaming.id).exists())
+        self.assertEqual(self.root.get_descendant_ids(), [self.root.id])
+
+    def test_rebuild_matches_incremental(self):
+        expected = set(CategoryClosure.objects.values_list('ancestor_id', 'descendant_id', 'depth'))
+        CategoryClosure.rebuild()
+        self.assertEqual(set(CategoryClosure.objects.values_list('ancestor_id', 'descendant_id', 'depth')), expected)
+
+
+class CategoryTreeBenchmark(TestCase):
+    """Lookups on a synthetic 5,000-node tree stay at one query each."""
+
+    NODES = 5000
+    FANOUT = 8
+
+    @classmethod
+    def setUpTestData(cls):
+        # Build a balanced tree level by level, then materialize the closure in bulk
+        cls.root = Category.objects.create(name="Root", slug="root")
+        level, created = [cls.root], 1
+        while created < cls.NODES:
+            next_level = []
+            for parent in level:
+                batch = [
+                    Category(name=f"Node {created + i}", slug=f"node-{created + i}", parent=parent)
+                    for i in range(min(cls.FANOUT, cls.NODES - created))
+                ]
+                next_level.extend(Category.objects.bulk_create(batch))
+                created += len(batch)
+                if created >= cls.NODES:
+                    break
+            level = next_level
+        cls.leaf = level[-1]
+        CategoryClosure.rebuild()
+
+    def test_descendant_lookup(self):
+        with self.assertNumQueries(1):
+            ids = self.root.get_descendant_ids()
+        self.assertEqual(len(ids), self.NODES)
+
+    def test_breadcrumb_lookup(self):
+        with self.assertNumQueries(1):
+            ancestors = self.leaf.get_ancestors()
+        self.assertEqual(ancestors[0], self.root)
+        self.assertEqual(ancestors[-1].pk, self.leaf.parent_id)
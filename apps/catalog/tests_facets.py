@@ -0,0 +1,92 @@
+from decimal import Decimal
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+from apps.catalog.models import (
+    Brand, Category, Product, ProductAttribute, ProductVariant, VariantInventory
+)
+from apps.pricing.models import Price
+
+
+class CatalogFacetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.category = Category.objects.create(name="Laptops", slug="laptops")
+        self.other_category = Category.objects.create(name="Monitors", slug="monitors")
+        self.acme = Brand.objects.create(name="Acme", slug="acme")
+        self.zeta = Brand.objects.create(name="Zeta", slug="zeta")
+        ProductAttribute.objects.create(name="RAM", slug="ram", is_filterable=True)
+        ProductAttribute.objects.create(name="Colour", slug="colour")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_product("a1", self.acme, self.category, '5000.00', 2, {'ram': '8GB', 'colour': 'black'})
+            self.create_product("a2", self.acme, self.category, '30000.00', 0, {'ram': '16GB'})
+            self.create_product("z1", self.zeta, self.category, '30000.00', 1, {'ram': '16GB'})
+            self.create_product("m1", self.zeta, self.other_category, '12000.00', 1, {})
+
+    def create_product(self, slug, brand, category, price, stock, attributes):
+        product = Product.objects.create(name=slug, slug=slug, brand=brand, category=category)
+        variant = ProductVariant.objects.create(product=product, sku=slug, attributes=attributes)
+        Price.objects.create(variant=variant, list_price=Decimal(price))
+        VariantInventory.objects.create(variant=variant, stock_qty=stock)
+        return product
+
+    def get_facets(self, **params):
+        response = self.client.get(reverse('catalog:product_list'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.context['facets']
+
+    def test_facets_follow_current_filters(self):
+        facets = self.get_facets(category='laptops')
+        self.assertEqual(
+            [(b['slug'], b['product_count']) for b in facets['brands']],
+            [('acme', 2), ('zeta', 1)]
+        )
+        self.assertEqual(facets['availability'], {'total': 3, 'in_stock': 2})
+        self.assertEqual(facets['price']['min'], Decimal('5000.00'))
+        self.assertEqual(facets['price']['max'], Decimal('30000.00'))
+        self.assertEqual(
+            [(bucket['min'], bucket['count']) for bucket in facets['price']['buckets']],
+            [(Decimal(0), 1), (Decimal(25000), 2)]
+        )
+        self.assertEqual(len(facets['attributes']), 1)
+        self.assertEqual(
+            [(v['value'], v['product_count']) for v in facets['attributes'][0]['values']],
+            [('16GB', 2), ('8GB', 1)]
+        )
+
+    def test_facet_ignores_its_own_filter(self):
+        facets = self.get_facets(category='laptops', brand='acme')
+        self.assertEqual([b['slug'] for b in facets['brands']], ['acme', 'zeta'])
+        self.assertEqual(facets['availability']['total'], 2)
+
+        facets = self.get_facets(category='laptops', in_stock='1', min_price='20000')
+        self.assertEqual(facets['availability'], {'total': 2, 'in_stock': 1})
+        self.assertEqual(facets['price']['min'], Decimal('5000.00'))
+        self.assertEqual([b['product_count'] for b in facets['brands']], [1])
+
+    def test_facets_are_cached_until_catalog_changes(self):
+        self.get_facets(category='laptops')
+        with self.assertNumQueries(0):
+            from apps.catalog.facets import get_facets
+            get_facets(lambda skip=(): self.fail("facets recomputed"), {'category': 'laptops'})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_product("z2", self.zeta, self.category, '1000.00', 5, {})
+        facets = self.get_facets(category='laptops')
+        self.assertEqual(facets['availability'], {'total': 4, 'in_stock': 3})
+
+    def test_invalidation_waits_for_commit(self):
+        from apps.catalog.facets import get_facet_version
+        version = get_facet_version()
+        with self.captureOnCommitCallbacks() as callbacks:
+            Brand.objects.create(name="Omega", slug="omega")
+            self.assertEqual(get_facet_version(), version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_facet_version(), version)
+
+    def test_ajax_page_flip_skips_facets(self):
+        response = self.client.get(
+            reverse('catalog:product_list'), {'page': 1}, HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        )
+        self.assertNotIn('facets', response.context)
@@ -0,0 +1,64 @@
+from decimal import Decimal
+from django.core.cache import cache
+from django.test import TestCase
+from apps.catalog.models import (
+    Category, Product, ProductImage, ProductListing, ProductVariant, VariantInventory
+)
+from apps.pricing.models import Price
+
+
+class ProductListingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name="Laptops", slug="laptops")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product = Product.objects.create(name="Laptop", slug="laptop", category=category)
+            self.variant = ProductVariant.objects.create(product=self.product, sku="LAP-1", variant_name="A")
+            self.price = Price.objects.create(variant=self.variant, list_price=Decimal('100.00'), sale_price=Decimal('80.00'))
+            self.inventory = VariantInventory.objects.create(variant=self.variant, stock_qty=3)
+
+    def listing(self):
+        return ProductListing.objects.get(product=self.product)
+
+    def test_snapshot_of_the_default_variant(self):
+        listing = self.listing()
+        self.assertEqual(listing.default_variant, self.variant)
+        self.assertEqual(
+            (listing.price, listing.list_price, listing.discount_amount, listing.discount_percent, listing.is_on_sale, listing.in_stock),
+            (Decimal('80.00'), Decimal('100.00'), Decimal('20.00'), 20, True, True)
+        )
+        self.assertEqual((listing.average_rating, listing.review_count), (None, 0))
+
+    def test_price_and_stock_changes_refresh_the_snapshot(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.price.sale_price = None
+            self.price.save()
+        self.assertEqual((self.listing().price, self.listing().is_on_sale), (Decimal('100.00'), False))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.inventory.reserved_qty = 3
+            self.inventory.save()
+        self.assertFalse(self.listing().in_stock)
+
+    def test_variant_and_image_changes_refresh_the_snapshot(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductImage.objects.create(product=self.product, image='products/laptop.jpg', is_primary=True)
+            cheaper = ProductVariant.objects.create(product=self.product, sku="LAP-2", variant_name="B")
+            Price.objects.create(variant=cheaper, list_price=Decimal('50.00'))
+        listing = self.listing()
+        self.assertTrue(listing.primary_image_url.endswith('products/laptop.jpg'))
+        self.assertEqual((listing.min_effective_price, listing.max_effective_price), (Decimal('50.00'), Decimal('80.00')))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.variant.is_active = False
+            self.variant.save()
+        self.assertEqual((self.listing().default_variant, self.listing().price), (cheaper, Decimal('50.00')))
+
+    def test_refresh_is_not_run_before_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.price.sale_price = Decimal('60.00')
+            self.price.save()
+        self.assertEqual(self.listing().price, Decimal('80.00'))
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.listing().price, Decimal('60.00'))
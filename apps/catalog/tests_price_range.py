@@ -0,0 +1,72 @@
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from apps.catalog.models import Category, Product, ProductListing, ProductVariant
+from apps.pricing.models import Price
+
+
+class ListingPriceRangeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.category = Category.objects.create(name="Laptops", slug="laptops")
+
+    def create_product(self, slug, *prices):
+        """`prices` are (list_price, sale_price) pairs, one variant each."""
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(name=slug, slug=slug, category=self.category)
+            for index, (list_price, sale_price) in enumerate(prices):
+                variant = ProductVariant.objects.create(product=product, sku=f"{slug}-{index}")
+                Price.objects.create(
+                    variant=variant,
+                    list_price=Decimal(list_price),
+                    sale_price=Decimal(sale_price) if sale_price else None,
+                )
+        return product
+
+    def list_slugs(self, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('catalog:product_list'), params, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.status_code, 200)
+        product_queries = [q['sql'] for q in ctx.captured_queries if 'FROM "catalog_product"' in q['sql']]
+        for sql in product_queries:
+            self.assertNotIn('catalog_productvariant', sql)
+            self.assertNotIn('DISTINCT', sql)
+        return [p.slug for p in response.context['products']]
+
+    def test_price_columns_follow_price_saves(self):
+        product = self.create_product('multi', ('500', '400'), ('900', None), ('300', None))
+        listing = ProductListing.objects.get(product=product)
+        self.assertEqual(listing.min_effective_price, Decimal('300'))
+        self.assertEqual(listing.max_effective_price, Decimal('900'))
+        self.assertTrue(listing.has_sale_variant)
+
+        price = Price.objects.get(variant__sku='multi-0')
+        with self.captureOnCommitCallbacks(execute=True):
+            price.sale_price = None
+            price.save()
+        listing.refresh_from_db()
+        self.assertFalse(listing.has_sale_variant)
+
+    def test_sort_by_price_without_duplicates(self):
+        self.create_product('a', ('1000', '200'), ('5000', None))
+        self.create_product('b', ('300', None), ('400', None))
+        self.create_product('c', ('100', None))
+        # Lowest first by the cheapest variant, highest first by the dearest one
+        self.assertEqual(self.list_slugs(sort='price_low'), ['c', 'a', 'b'])
+        self.assertEqual(self.list_slugs(sort='price_high'), ['a', 'b', 'c'])
+
+    def test_price_filter_uses_effective_price(self):
+        self.create_product('sale', ('1000', '200'))
+        self.create_product('range', ('300', None), ('800', None))
+        self.create_product('dear', ('900', None))
+        self.assertEqual(sorted(self.list_slugs(max_price='250')), ['sale'])
+        self.assertEqual(sorted(self.list_slugs(min_price='700', max_price='850')), ['range'])
+
+    def test_flash_sale_filter(self):
+        self.create_product('one-on-sale', ('500', None), ('700', '650'))
+        self.create_product('full-price', ('500', None))
+        self.assertEqual(self.list_slugs(flash_sale='true'), ['one-on-sale'])
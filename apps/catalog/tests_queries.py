@@ -0,0 +1,125 @@
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Prefetch
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from apps.core import site_cache
+from apps.catalog.models import (
+    Brand, Category, Product, ProductImage, ProductVariant, VariantInventory
+)
+from apps.pricing.models import Price
+
+
+class CatalogQueryCountTests(TestCase):
+    """Page query counts must not grow with the number of products rendered."""
+
+    def setUp(self):
+        self.client = Client()
+        self.category = Category.objects.create(name="Laptops", slug="laptops")
+        self.brand = Brand.objects.create(name="Acme", slug="acme")
+        self.counter = 0
+
+    def create_products(self, count):
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(count):
+                self.counter += 1
+                product = Product.objects.create(
+                    name=f"Product {self.counter}",
+                    slug=f"product-{self.counter}",
+                    category=self.category,
+                    brand=self.brand,
+                    short_description="fast laptop",
+                    is_featured=True,
+                )
+                ProductImage.objects.create(product=product, image='products/p.jpg', is_primary=True)
+                for suffix in ('a', 'b'):
+                    variant = ProductVariant.objects.create(
+                        product=product, sku=f"SKU-{self.counter}-{suffix}"
+                    )
+                    Price.objects.create(
+                        variant=variant, list_price=Decimal('1000.00'), sale_price=Decimal('900.00')
+                    )
+                    VariantInventory.objects.create(variant=variant, stock_qty=5)
+
+    def count_queries(self, url, **extra):
+        # Measure with cold caches so both runs do the same work
+        cache.clear()
+        site_cache.clear_local()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, **extra)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def assertConstantQueries(self, url, max_queries, **extra):
+        self.create_products(2)
+        small = self.count_queries(url, **extra)
+        self.create_products(10)
+        large = self.count_queries(url, **extra)
+        self.assertEqual(small, large, f"{url} issues more queries as the catalog grows")
+        self.assertLessEqual(large, max_queries)
+
+    def test_product_list(self):
+        self.assertConstantQueries(reverse('catalog:product_list'), 12)
+
+    def test_product_list_ajax(self):
+        self.assertConstantQueries(
+            reverse('catalog:product_list'), 12, HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        )
+
+    def test_category_products(self):
+        self.assertConstantQueries(reverse('catalog:category_products', args=['laptops']), 14)
+
+    def test_search(self):
+        self.assertConstantQueries(reverse('catalog:search') + '?q=laptop', 12)
+
+    def test_brand_detail(self):
+        self.assertConstantQueries(reverse('catalog:brand_detail', args=['acme']), 10)
+
+    def test_home(self):
+        self.assertConstantQueries(reverse('core:home'), 12)
+
+    def test_product_detail(self):
+        self.create_products(1)
+        url = reverse('catalog:product_detail', args=['product-1'])
+        small = self.count_queries(url)
+        self.create_products(10)
+        self.assertEqual(small, self.count_queries(url))
+
+
+class ProductAccessorTests(TestCase):
+    """Product accessors reuse prefetched variants and images."""
+
+    def setUp(self):
+        self.product = Product.objects.create(name="Desk", slug="desk")
+        ProductImage.objects.create(product=self.product, image='products/a.jpg')
+        ProductImage.objects.create(product=self.product, image='products/b.jpg', is_primary=True)
+        for sku, list_price, stock in (('D-1', '200.00', 0), ('D-2', '100.00', 3)):
+            variant = ProductVariant.objects.create(product=self.product, sku=sku, variant_name=sku)
+            Price.objects.create(variant=variant, list_price=Decimal(list_price))
+            VariantInventory.objects.create(variant=variant, stock_qty=stock)
+        ProductVariant.objects.create(product=self.product, sku='D-3', is_active=False)
+
+    def test_prefetched_accessors_run_no_queries(self):
+        product = Product.objects.prefetch_related(
+            'images',
+            Prefetch('variants', queryset=ProductVariant.objects.select_related('price', 'inventory')),
+        ).get(pk=self.product.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(product.get_default_variant().sku, 'D-1')
+            self.assertEqual(product.primary_image.image.name, 'products/b.jpg')
+            self.assertEqual(product.get_price_range(), (Decimal('100.00'), Decimal('200.00')))
+            self.assertTrue(product.is_in_stock())
+            self.assertEqual(product.price, Decimal('200.00'))
+
+    def test_unprefetched_accessors_query_once(self):
+        product = Product.objects.get(pk=self.product.pk)
+        with self.assertNumQueries(1):
+            product.get_default_variant()
+            product.get_price_range()
+            product.is_in_stock()
+            product.get_active_variants()
+        with self.assertNumQueries(1):
+            product.primary_image
+            product.primary_image
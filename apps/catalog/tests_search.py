@@ -0,0 +1,55 @@
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, Client
+from django.urls import reverse
+from apps.catalog.models import Product
+from apps.catalog.search import get_search_backend
+
+
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.by_name = Product.objects.create(
+            name="Gaming Laptop", slug="gaming-laptop", description="Fast machine"
+        )
+        self.by_description = Product.objects.create(
+            name="Carry Bag", slug="carry-bag", description="Fits any laptop up to 15 inches"
+        )
+        Product.objects.create(name="Monitor", slug="monitor", description="27 inch display")
+
+    def search(self, query):
+        return list(get_search_backend().search(Product.objects.all(), query).order_by('-search_rank'))
+
+    def test_name_matches_rank_first(self):
+        self.assertEqual(self.search("laptop"), [self.by_name, self.by_description])
+
+    def test_prefix_and_multiple_terms(self):
+        self.assertEqual(self.search("gam lap"), [self.by_name])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.by_description.name = "Laptop Sleeve"
+        self.by_description.save()
+        self.assertEqual(self.search("sleeve"), [self.by_description])
+        self.by_name.delete()
+        self.assertEqual(self.search("gaming"), [])
+
+    def test_operators_are_treated_as_text(self):
+        self.assertEqual(self.search('laptop!! ("'), [self.by_name, self.by_description])
+        self.assertEqual(self.search('*** ""'), [])
+
+    def test_rebuild_command(self):
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('DELETE FROM catalog_product_fts')
+        self.assertEqual(self.search("monitor"), [])
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Indexed 3 products', out.getvalue())
+        self.assertEqual(len(self.search("monitor")), 1)
+
+    def test_search_view_orders_by_relevance(self):
+        response = self.client.get(reverse('catalog:search'), {'q': 'laptop'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['products']), [self.by_name, self.by_description])
+        self.assertNotIn('DISTINCT', str(response.context['page_obj'].object_list.query))
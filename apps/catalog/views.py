@@ -1,8 +1,14 @@
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
 from django.views.generic import ListView, DetailView
 from django.shortcuts import get_object_or_404
-from django.db import models
-from django.db.models import Q, Prefetch, F, Min, Max
+from django.db.models import Q, Prefetch, F
+from apps.core.pagination import CursorPage, CursorPaginator
+from .attributes import filter_by_attributes, get_attribute_filters
+from .context_processors import get_nav_categories
+from .facets import get_facets
 from .models import Category, Brand, Product, ProductVariant
+from .search import get_search_backend
 
 
 class ProductListView(ListView):
@@ -13,8 +19,21 @@ class ProductListView(ListView):
     context_object_name = 'products'
     paginate_by = 12
     
+    # Sort keys per `sort` parameter; each ends in a unique column so cursor pages are stable
+    sort_orderings = {
+        'featured': ('-is_featured', '-created_at', '-id'),
+        'price_low': ('listing__min_effective_price', 'id'),
+        'price_high': ('-listing__max_effective_price', '-id'),
+        'newest': ('-created_at', '-id'),
+        'name': ('name', 'id'),
+        '-name': ('-name', '-id'),
+    }
+    
+    def is_ajax(self):
+        return self.request.headers.get('x-requested-with') == 'XMLHttpRequest'
+    
     def get_template_names(self):
-        if self.request.headers.get('x-requested-with') == 'XMLHttpRequest':
+        if self.is_ajax():
             return ['catalog/partials/_product_grid.html']
         return [self.template_name]
 
@@ -22,29 +41,11 @@ class ProductListView(ListView):
         context = super().get_context_data(**kwargs)
         
         # Current category if filtered
-        category_slug = self.kwargs.get('category_slug') or self.request.GET.get('category')
-        if category_slug:
-            context['current_category'] = get_object_or_404(
-                Category, slug=category_slug, is_active=True
-            )
+        category = self.get_category()
+        if category:
+            context['current_category'] = category
             context['category'] = context['current_category'] # For template compatibility
         
-        # Filters data
-        context['brands'] = Brand.objects.filter(is_active=True).annotate(
-            product_count=models.Count('products', filter=models.Q(products__is_active=True))
-        ).filter(product_count__gt=0).order_by('name')
-        
-        context['nav_categories'] = Category.objects.filter(is_active=True, parent__isnull=True).prefetch_related('children')
-        context['categories'] = context['nav_categories'] # Alias if needed
-        
-        # Price range
-        price_agg = ProductVariant.objects.filter(is_active=True).aggregate(
-            min_price=Min('price__list_price'),
-            max_price=Max('price__list_price')
-        )
-        context['min_price_range'] = price_agg['min_price'] or 0
-        context['max_price_range'] = price_agg['max_price'] or 1000000
-        
         # Current filters state for UI
         context['current_filters'] = {
             'min_price': self.request.GET.get('min_price'),
@@ -56,91 +57,170 @@ class ProductListView(ListView):
             'q': self.request.GET.get('q', ''),
         }
         
+        # Cursor mode: link to the next page (followed by the grid's infinite scroll)
+        page = context.get('page_obj')
+        context['cursor_pagination'] = isinstance(page, CursorPage)
+        if context['cursor_pagination']:
+            context['next_page_url'] = page.next_url(self.request)
+        
+        # The AJAX grid partial has no sidebar, so skip the filter data
+        if self.is_ajax():
+            return context
+        
+        # Facet counts for the current filter set (cached, see apps.catalog.facets)
+        facets = get_facets(self.get_facet_queryset, self.get_filter_params())
+        context['facets'] = facets
+        context['brands'] = facets['brands']
+        
+        # Attribute facets, with the values currently selected marked
+        selected = {
+            (name[len('attr_'):], value)
+            for name in self.request.GET if name.startswith('attr_')
+            for value in self.request.GET.getlist(name)
+        }
+        context['attribute_facets'] = [
+            dict(facet, values=[
+                dict(value, selected=(facet['slug'], value['value']) in selected)
+                for value in facet['values']
+            ])
+            for facet in facets['attributes']
+        ]
+        
+        context['nav_categories'] = get_nav_categories()
+        context['categories'] = context['nav_categories'] # Alias if needed
+        
+        # Price range
+        context['min_price_range'] = facets['price']['min'] or 0
+        context['max_price_range'] = facets['price']['max'] or 1000000
+        
         return context
 
-    def get_queryset(self):
-        queryset = Product.objects.filter(is_active=True).select_related(
-            'category', 'brand'
-        ).prefetch_related(
-            'images',
-            Prefetch(
-                'variants',
-                queryset=ProductVariant.objects.filter(is_active=True).select_related('price', 'inventory')
-            )
-        )
+    def get_category(self):
+        """Get the filtered category (looked up once per request)."""
+        if not hasattr(self, '_category'):
+            category_slug = self.kwargs.get('category_slug') or self.request.GET.get('category')
+            self._category = None
+            if category_slug:
+                self._category = get_object_or_404(Category, slug=category_slug, is_active=True)
+        return self._category
+    
+    def get_category_ids(self):
+        """Ids of the filtered category and its active descendants (looked up once per request)."""
+        if not hasattr(self, '_category_ids'):
+            category = self.get_category()
+            self._category_ids = category.get_descendant_ids() if category else None
+        return self._category_ids
+    
+    def get_filter_params(self):
+        """Request filters, including a category taken from the URL."""
+        params = self.request.GET.copy()
+        if self.kwargs.get('category_slug'):
+            params['category'] = self.kwargs['category_slug']
+        return params
+    
+    def get_attribute_filters(self):
+        """Parsed attr_<slug> filters (looked up once per request)."""
+        if not hasattr(self, '_attribute_filters'):
+            self._attribute_filters = get_attribute_filters(self.request.GET)
+        return self._attribute_filters
+    
+    def get_search_query(self):
+        return self.request.GET.get('q', '').strip()
+    
+    def get_facet_queryset(self, skip=()):
+        return self.filter_queryset(Product.objects.filter(is_active=True), skip=skip)
+    
+    def filter_queryset(self, queryset, skip=()):
+        """Apply the request's filters to `queryset`, leaving out those named in `skip`."""
+        params = self.request.GET
         
         # Filter by category
-        category_slug = self.kwargs.get('category_slug') or self.request.GET.get('category')
-        if category_slug:
-            category = get_object_or_404(Category, slug=category_slug, is_active=True)
+        category_ids = self.get_category_ids()
+        if category_ids is not None and 'category' not in skip:
             # Include child categories
-            category_ids = [category.id] + [c.id for c in category.get_all_children()]
             queryset = queryset.filter(category_id__in=category_ids)
         
         # Filter by brand
-        brand_slug = self.request.GET.get('brand')
-        if brand_slug:
+        brand_slug = params.get('brand')
+        if brand_slug and 'brand' not in skip:
             queryset = queryset.filter(brand__slug=brand_slug)
         
-        # Search query
-        search_query = self.request.GET.get('q')
-        if search_query:
-            queryset = queryset.filter(
-                Q(name__icontains=search_query) |
-                Q(short_description__icontains=search_query) |
-                Q(description__icontains=search_query)
-            )
+        # Search query (full-text search; see apps.catalog.search)
+        search_query = self.get_search_query()
+        if search_query and 'q' not in skip:
+            queryset = get_search_backend().filter(queryset, search_query)
         
-        # Price filter
-        min_price = self.request.GET.get('min_price')
-        max_price = self.request.GET.get('max_price')
-        if min_price or max_price:
-            variant_filter = Q()
+        # Attribute filters (attr_<slug>=value, attr_<slug>_min/_max)
+        attribute_filters = self.get_attribute_filters()
+        if attribute_filters and 'attributes' not in skip:
+            queryset = filter_by_attributes(queryset, attribute_filters)
+        
+        # Price filter: the product's [cheapest, dearest] active variant price span
+        # overlaps the range (not necessarily with one variant inside it)
+        min_price = params.get('min_price')
+        max_price = params.get('max_price')
+        if (min_price or max_price) and 'price' not in skip:
+            price_filter = Q()
             if min_price:
                 try:
-                    variant_filter &= Q(variants__price__list_price__gte=float(min_price))
-                except ValueError: pass
+                    price_filter &= Q(listing__max_effective_price__gte=Decimal(min_price))
+                except InvalidOperation: pass
             if max_price:
                 try:
-                    variant_filter &= Q(variants__price__list_price__lte=float(max_price))
-                except ValueError: pass
-            queryset = queryset.filter(variant_filter).distinct()
+                    price_filter &= Q(listing__min_effective_price__lte=Decimal(max_price))
+                except InvalidOperation: pass
+            queryset = queryset.filter(price_filter)
         
         # Featured only
-        if self.request.GET.get('featured'):
+        if params.get('featured') and 'featured' not in skip:
             queryset = queryset.filter(is_featured=True)
             
         # Flash Sale / On Sale
-        if self.request.GET.get('flash_sale') == 'true':
-            queryset = queryset.filter(
-                variants__price__sale_price__isnull=False,
-                variants__price__sale_price__lt=F('variants__price__list_price')
-            ).distinct()
+        if params.get('flash_sale') == 'true' and 'flash_sale' not in skip:
+            queryset = queryset.filter(listing__has_sale_variant=True)
         
         # In stock only
-        if self.request.GET.get('in_stock'):
-            queryset = queryset.filter(
-                variants__is_active=True,
-                variants__inventory__stock_qty__gt=0
-            ).distinct()
+        if params.get('in_stock') and 'in_stock' not in skip:
+            queryset = queryset.filter(listing__in_stock=True)
         
-        # Sorting
-        sort_by = self.request.GET.get('sort', '-created_at')
-        valid_sorts = {
-            'featured': '-is_featured',
-            'price_low': 'variants__price__list_price',
-            'price_high': '-variants__price__list_price',
-            'newest': '-created_at',
-            'name': 'name',
-            '-name': '-name',
-        }
+        return queryset
+
+    def get_queryset(self):
+        # Cards render from the listing snapshot, so no per-product prefetching is needed
+        queryset = self.filter_queryset(
+            Product.objects.filter(is_active=True).select_related('category', 'brand', 'listing')
+        )
+        search_query = self.get_search_query()
+        if search_query and self.get_ordering_fields()[0] == '-search_rank':
+            queryset = get_search_backend().rank(queryset, search_query)
         
-        if sort_by in valid_sorts:
-            queryset = queryset.order_by(valid_sorts[sort_by])
-        else:
-            queryset = queryset.order_by('-created_at')
         
-        return queryset.distinct()
+        # Order in SQL only for OFFSET pages; cursor pages order themselves
+        if not self.use_cursor_pagination():
+            queryset = queryset.order_by(*[
+                F(field[1:]).desc(nulls_last=True) if field.startswith('-') else F(field).asc(nulls_last=True)
+                for field in self.get_ordering_fields()
+            ])
+        return queryset
+    
+    def get_ordering_fields(self):
+        """Sort keys for the requested sort, ending in a unique tie-breaker."""
+        sort_by = self.request.GET.get('sort', '-created_at')
+        if self.get_search_query() and sort_by in ('-created_at', 'default', 'relevance'):
+            # Searches default to relevance
+            return ('-search_rank', '-created_at', '-id')
+        return self.sort_orderings.get(sort_by, ('-created_at', '-id'))
+    
+    def use_cursor_pagination(self):
+        """Cursor (keyset) pages are opt-in: by setting, or by following a cursor link."""
+        return getattr(settings, 'CATALOG_CURSOR_PAGINATION', False) or 'cursor' in self.request.GET
+    
+    def paginate_queryset(self, queryset, page_size):
+        if not self.use_cursor_pagination():
+            return super().paginate_queryset(queryset, page_size)
+        paginator = CursorPaginator(queryset, self.get_ordering_fields(), page_size)
+        page = paginator.get_page(self.request.GET.get('cursor'))
+        return (paginator, page, page.object_list, page.has_other_pages())
 
 
 class ProductDetailView(DetailView):
@@ -166,10 +246,8 @@ class ProductDetailView(DetailView):
         context = super().get_context_data(**kwargs)
         product = self.object
         
-        # Get variants with pricing
-        context['variants'] = product.variants.filter(is_active=True).select_related(
-            'price', 'inventory'
-        )
+        # Get variants with pricing (served from the prefetch in get_queryset)
+        context['variants'] = product.get_active_variants()
         
         # Default variant
         context['default_variant'] = product.get_default_variant()
@@ -179,7 +257,7 @@ class ProductDetailView(DetailView):
             context['related_products'] = Product.objects.filter(
                 is_active=True,
                 category=product.category
-            ).exclude(id=product.id).prefetch_related('images', 'variants')[:4]
+            ).exclude(id=product.id).select_related('listing')[:4]
         
         # Breadcrumbs
         breadcrumbs = []
@@ -205,11 +283,11 @@ class ProductQuickView(DetailView):
     context_object_name = 'product'
     
     def get_queryset(self):
-        return Product.objects.filter(is_active=True).prefetch_related('images', 'variants')
+        return Product.objects.filter(is_active=True).select_related('category', 'listing')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['default_variant'] = self.object.get_default_variant()
+        context['default_variant_id'] = self.object.default_variant_id
         return context
 
 
@@ -256,7 +334,7 @@ class BrandDetailView(DetailView):
         context['products'] = Product.objects.filter(
             is_active=True,
             brand=self.object
-        ).prefetch_related('images', 'variants')[:12]
+        ).select_related('brand', 'listing')[:12]
         return context
 
 
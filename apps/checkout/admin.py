@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ShippingMethod, CheckoutSession
+from .models import ShippingMethod, CheckoutSession, StockReservation
 
 
 @admin.register(ShippingMethod)
@@ -17,3 +17,12 @@ class CheckoutSessionAdmin(admin.ModelAdmin):
     list_filter = ['current_step', 'created_at']
     search_fields = ['session_key', 'user__email', 'guest_email']
     readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ['variant', 'quantity', 'status', 'order', 'expires_at', 'created_at']
+    list_filter = ['status']
+    search_fields = ['variant__sku', 'order__order_number']
+    raw_id_fields = ['variant', 'checkout_session', 'order']
+    readonly_fields = ['created_at', 'updated_at']
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from apps.checkout.reservations import release_expired
+
+
+class Command(BaseCommand):
+    help = 'Release stock reservations of abandoned checkouts and unpaid orders past their expiry.'
+
+    def handle(self, *args, **options):
+        count = release_expired()
+        self.stdout.write(self.style.SUCCESS(f'Released reservations for {count} variants.'))
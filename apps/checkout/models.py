@@ -54,7 +54,13 @@ class ShippingMethod(models.Model):
 
 
 class CheckoutSession(models.Model):
-    """Temporary storage for checkout data."""
+    """
+    Temporary storage for checkout data.
+    
+    The steps form a simple state machine: a step can be entered once every
+    step before it is complete, and completing a step moves current_step on.
+    Completeness is decided from the stored ids, without loading related rows.
+    """
     
     CHECKOUT_STEP_CHOICES = [
         ('address', 'Address'),
@@ -127,7 +133,7 @@ class CheckoutSession(models.Model):
     # Payment
     payment_method = models.CharField('payment method', max_length=50, blank=True) # 'sslcommerz', 'cod'
     
-    # Cart data snapshot
+    # Cart data snapshot: fingerprint and summary of the cart last seen by checkout
     cart_data = models.JSONField('cart data', default=dict, blank=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
@@ -144,9 +150,99 @@ class CheckoutSession(models.Model):
             return f"Checkout for {self.user.email}"
         return f"Guest checkout {self.session_key[:8]}..."
     
+    STEPS = [step for step, label in CHECKOUT_STEP_CHOICES]
+    PAYMENT_METHODS = ['sslcommerz', 'cod']
+    
+    def is_step_complete(self, step):
+        """Whether the data collected by `step` is present. Review is never complete."""
+        if step == 'address':
+            return bool(self.shipping_address_id or self.guest_shipping_address)
+        if step == 'shipping':
+            return self.shipping_method_id is not None
+        if step == 'payment':
+            return self.payment_method in self.PAYMENT_METHODS
+        return False
+    
+    def get_next_step(self):
+        """The first step that still needs the customer."""
+        return next((step for step in self.STEPS if not self.is_step_complete(step)), self.STEPS[-1])
+    
+    def can_enter(self, step):
+        """A step can be entered once every step before it is complete."""
+        return all(self.is_step_complete(previous) for previous in self.STEPS[:self.STEPS.index(step)])
+    
+    def complete_step(self, step):
+        """Move current_step past `step`; the caller saves the session."""
+        self.current_step = self.get_next_step() if self.is_step_complete(step) else step
+    
     def is_complete(self):
         """Check if all checkout steps are complete."""
-        has_address = bool(self.shipping_address or self.guest_shipping_address)
-        has_shipping = bool(self.shipping_method)
-        has_payment = bool(self.payment_method)
-        return has_address and has_shipping and has_payment
+        return self.can_enter('review')
+    
+    def sync_cart(self, cart):
+        """
+        Record the cart's fingerprint and summary in cart_data. Returns True
+        (and saves) when the cart changed since checkout last saw it.
+        """
+        fingerprint = cart.get_fingerprint()
+        if self.cart_data.get('fingerprint') == fingerprint:
+            return False
+        summary = cart.get_summary()
+        self.cart_data = {
+            'fingerprint': fingerprint,
+            'count': summary['count'],
+            'subtotal': str(summary['subtotal']),
+        }
+        if self.pk:
+            self.save(update_fields=['cart_data', 'updated_at'])
+        return True
+
+
+class StockReservation(models.Model):
+    """Stock held for a checkout, or for a placed order until it is paid."""
+    
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('converted', 'Converted'),
+        ('released', 'Released'),
+    ]
+    
+    variant = models.ForeignKey(
+        'catalog.ProductVariant',
+        on_delete=models.CASCADE,
+        related_name='stock_reservations',
+        verbose_name='variant'
+    )
+    quantity = models.PositiveIntegerField('quantity')
+    checkout_session = models.ForeignKey(
+        CheckoutSession,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='stock_reservations',
+        verbose_name='checkout session'
+    )
+    order = models.ForeignKey(
+        'orders.Order',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='stock_reservations',
+        verbose_name='order'
+    )
+    status = models.CharField('status', max_length=20, choices=STATUS_CHOICES, default='active')
+    expires_at = models.DateTimeField('expires at')
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'stock reservation'
+        verbose_name_plural = 'stock reservations'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'expires_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.quantity} x {self.variant} ({self.status})"
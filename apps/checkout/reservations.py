@@ -0,0 +1,199 @@
+"""
+Stock reservations.
+
+Checkout review reserves the cart's quantities for CHECKOUT_RESERVATION_TTL
+minutes. Placing the order moves the reservation to the order; it becomes a
+stock decrement when the order is paid (or placed as COD) and is released on
+payment failure, cancellation or expiry.
+
+Every stock change is a conditional UPDATE (reserve only WHERE stock_qty -
+reserved_qty >= n), never a read-modify-write, so concurrent checkouts can't
+oversell. All lines of a cart or order are changed by one UPDATE with a
+per-variant CASE, so the query count doesn't grow with the number of lines.
+Variants without a VariantInventory row are not stock-tracked and are never
+reserved.
+"""
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+from django.utils import timezone
+from apps.catalog.models import VariantInventory
+from apps.catalog.signals import schedule_listing_refresh
+from apps.orders.models import Order
+from .models import StockReservation
+
+
+logger = logging.getLogger(__name__)
+
+
+class _Short(Exception):
+    pass
+
+
+class InsufficientStock(Exception):
+    """A reservation could not be made; `variant_ids` lists the short lines."""
+
+    def __init__(self, variant_ids):
+        self.variant_ids = list(variant_ids)
+        super().__init__(f'Insufficient stock for variants {self.variant_ids}')
+
+
+def get_expiry():
+    return timezone.now() + timedelta(minutes=settings.CHECKOUT_RESERVATION_TTL)
+
+
+def _refresh_listings(changes):
+    """
+    Refresh the listing snapshots of products whose availability crossed zero.
+    `changes` maps variant ids to the change in their available quantity.
+    """
+    rows = VariantInventory.objects.filter(variant_id__in=changes).values_list(
+        'variant_id', 'variant__product_id', 'stock_qty', 'reserved_qty'
+    )
+    for variant_id, product_id, stock_qty, reserved_qty in rows:
+        available = stock_qty - reserved_qty
+        if (available > 0) != (available - changes[variant_id] > 0):
+            schedule_listing_refresh(product_id)
+
+
+def _per_variant(quantities):
+    """CASE expression giving each variant's quantity from {variant_id: quantity}."""
+    return Case(
+        *[When(variant_id=variant_id, then=Value(quantity)) for variant_id, quantity in quantities.items()],
+        output_field=PositiveIntegerField(),
+    )
+
+
+def _reserve(quantities):
+    if not quantities:
+        return
+    needed = _per_variant(quantities)
+    lines = VariantInventory.objects.filter(variant_id__in=quantities)
+    try:
+        with transaction.atomic():
+            reserved = lines.filter(stock_qty__gte=F('reserved_qty') + needed).update(
+                reserved_qty=F('reserved_qty') + needed, updated_at=timezone.now()
+            )
+            if reserved < len(quantities):
+                raise _Short
+    except _Short:
+        # The partial update has been rolled back; report the lines that can't be covered
+        covered = set(lines.filter(stock_qty__gte=F('reserved_qty') + needed).values_list('variant_id', flat=True))
+        raise InsufficientStock(sorted(set(quantities) - covered))
+
+
+def _sum_by_variant(reservations):
+    totals = {}
+    for reservation in reservations:
+        totals[reservation.variant_id] = totals.get(reservation.variant_id, 0) + reservation.quantity
+    return totals
+
+
+def _release(reservations):
+    # Re-read the active rows under lock so concurrent callers can't release twice
+    reservations = list(StockReservation.objects.select_for_update().filter(
+        pk__in=[reservation.pk for reservation in reservations], status='active'
+    ))
+    if not reservations:
+        return 0
+    StockReservation.objects.filter(pk__in=[r.pk for r in reservations]).update(status='released')
+    changes = _sum_by_variant(reservations)
+    released = _per_variant(changes)
+    VariantInventory.objects.filter(variant_id__in=changes, reserved_qty__gte=released).update(
+        reserved_qty=F('reserved_qty') - released, updated_at=timezone.now()
+    )
+    _refresh_listings(changes)
+    return len(changes)
+
+
+def reserve_for_checkout(checkout_session, quantities):
+    """
+    Hold `quantities` ({variant_id: quantity}) for the checkout session,
+    replacing whatever it held before; an unchanged hold just gets a new
+    expiry. Raises InsufficientStock, keeping the previous hold, when any
+    line can't be covered.
+    """
+    with transaction.atomic():
+        held = list(StockReservation.objects.filter(checkout_session=checkout_session, status='active'))
+        tracked = set(VariantInventory.objects.filter(variant_id__in=quantities).values_list('variant_id', flat=True))
+        wanted = {variant_id: quantity for variant_id, quantity in quantities.items() if variant_id in tracked and quantity > 0}
+
+        if _sum_by_variant(held) == wanted:
+            StockReservation.objects.filter(pk__in=[r.pk for r in held]).update(expires_at=get_expiry())
+            return
+
+        _release(held)
+        _reserve(wanted)
+        expires_at = get_expiry()
+        StockReservation.objects.bulk_create([
+            StockReservation(
+                variant_id=variant_id, quantity=quantity, checkout_session=checkout_session, expires_at=expires_at
+            )
+            for variant_id, quantity in wanted.items()
+        ])
+        _refresh_listings({variant_id: -quantity for variant_id, quantity in wanted.items()})
+
+
+def attach_to_order(checkout_session, order):
+    """Move the checkout session's hold to the placed order, with a fresh expiry for payment."""
+    return StockReservation.objects.filter(checkout_session=checkout_session, status='active').update(
+        order=order, expires_at=get_expiry()
+    )
+
+
+def convert_for_order(order):
+    """
+    Turn the order's reservations into stock decrements, once the order is
+    paid or placed as COD. Lines whose reservation has expired are
+    decremented directly if the stock still allows it. Safe to call twice.
+    """
+    with transaction.atomic():
+        # Serializes concurrent conversions of the same order (e.g. success callback and IPN)
+        list(Order.objects.select_for_update().filter(pk=order.pk).values_list('pk', flat=True))
+        reservations = list(StockReservation.objects.filter(order=order).exclude(status='released'))
+
+        active = [reservation for reservation in reservations if reservation.status == 'active']
+        if active:
+            converted = _per_variant(_sum_by_variant(active))
+            VariantInventory.objects.filter(
+                variant_id__in={r.variant_id for r in active}, reserved_qty__gte=converted
+            ).update(
+                stock_qty=F('stock_qty') - converted,
+                reserved_qty=F('reserved_qty') - converted,
+                updated_at=timezone.now(),
+            )
+            StockReservation.objects.filter(pk__in=[r.pk for r in active]).update(status='converted')
+
+        handled = {reservation.variant_id for reservation in reservations}
+        lines = order.items.filter(variant__inventory__isnull=False).exclude(variant_id__in=handled)
+        late = []
+        changes = {}
+        for variant_id, quantity in lines.values_list('variant_id', 'quantity'):
+            decremented = VariantInventory.objects.filter(
+                variant_id=variant_id, stock_qty__gte=F('reserved_qty') + quantity
+            ).update(stock_qty=F('stock_qty') - quantity, updated_at=timezone.now())
+            if decremented:
+                changes[variant_id] = -quantity
+                late.append(StockReservation(
+                    variant_id=variant_id, quantity=quantity, order=order, status='converted', expires_at=timezone.now()
+                ))
+            else:
+                logger.warning(f"Order {order.order_number}: not enough stock left for variant {variant_id} after its reservation expired.")
+        StockReservation.objects.bulk_create(late)
+        if changes:
+            _refresh_listings(changes)
+
+
+def release_for_order(order):
+    """Release the order's active reservations (payment failed or order cancelled)."""
+    with transaction.atomic():
+        return _release(StockReservation.objects.filter(order=order, status='active'))
+
+
+def release_expired(now=None):
+    """Release every active reservation past its expiry. Returns the number of variants freed."""
+    expired = StockReservation.objects.filter(status='active', expires_at__lt=now or timezone.now())
+    with transaction.atomic():
+        return _release(list(expired))
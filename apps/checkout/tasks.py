@@ -0,0 +1,8 @@
+from celery import shared_task
+from .reservations import release_expired
+
+
+@shared_task(ignore_result=True)
+def release_expired_reservations():
+    """Return the stock held by abandoned checkouts and unpaid orders (for celery beat)."""
+    release_expired()
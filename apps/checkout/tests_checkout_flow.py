@@ -0,0 +1,118 @@
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from apps.accounts.models import Address
+from apps.catalog.models import Category, Product, ProductVariant
+from apps.orders.models import Order
+from apps.pricing.models import Price
+from .models import CheckoutSession, ShippingMethod
+
+
+class CheckoutStateMachineTests(TestCase):
+    def test_steps_open_in_order(self):
+        session = CheckoutSession(session_key='key')
+        self.assertEqual(session.get_next_step(), 'address')
+        self.assertTrue(session.can_enter('address'))
+        self.assertFalse(session.can_enter('shipping'))
+
+        session.guest_shipping_address = {'full_name': 'Buyer', 'address_line1': 'Road 1'}
+        session.complete_step('address')
+        self.assertEqual(session.current_step, 'shipping')
+        self.assertFalse(session.can_enter('payment'))
+
+        session.shipping_method = ShippingMethod.objects.create(name='Standard', price=Decimal('60.00'))
+        session.complete_step('shipping')
+        self.assertEqual(session.current_step, 'payment')
+
+        session.payment_method = 'bitcoin'
+        self.assertFalse(session.is_complete())
+        session.payment_method = 'cod'
+        session.complete_step('payment')
+        self.assertEqual(session.current_step, 'review')
+        self.assertTrue(session.is_complete())
+
+
+class CheckoutFlowTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name="Laptops", slug="laptops")
+        product = Product.objects.create(name="Laptop", slug="laptop", category=category)
+        self.variant = ProductVariant.objects.create(product=product, sku="LAP-1")
+        self.price = Price.objects.create(variant=self.variant, list_price=Decimal('100.00'))
+        self.user = get_user_model().objects.create_user(email='buyer@example.com', password='secret')
+        self.client.force_login(self.user)
+        self.client.post(reverse('cart:cart_add'), {'variant_id': self.variant.id, 'quantity': 2})
+        self.address = Address.objects.create(
+            user=self.user, full_name='Buyer', phone='01700000000', city='Dhaka', address_line1='Road 1'
+        )
+        self.shipping_method = ShippingMethod.objects.create(name='Standard', price=Decimal('60.00'))
+
+    def test_steps_redirect_to_first_incomplete_step(self):
+        self.assertRedirects(self.client.get(reverse('checkout:review')), reverse('checkout:address'), fetch_redirect_response=False)
+        response = self.client.post(reverse('checkout:address'), {'shipping_address': self.address.id, 'same_as_shipping': 'on'})
+        self.assertRedirects(response, reverse('checkout:shipping'), fetch_redirect_response=False)
+        self.assertRedirects(self.client.get(reverse('checkout:payment')), reverse('checkout:shipping'), fetch_redirect_response=False)
+        response = self.client.post(reverse('checkout:shipping'), {'shipping_method': self.shipping_method.id})
+        self.assertRedirects(response, reverse('checkout:payment'), fetch_redirect_response=False)
+        response = self.client.post(reverse('checkout:payment'), {'payment_method': 'cod'})
+        self.assertRedirects(response, reverse('checkout:review'), fetch_redirect_response=False)
+        self.assertRedirects(self.client.get(reverse('checkout:checkout')), reverse('checkout:review'), fetch_redirect_response=False)
+
+    def complete_steps(self):
+        return CheckoutSession.objects.create(
+            user=self.user, session_key='checkout', shipping_address=self.address, billing_address=self.address,
+            shipping_method=self.shipping_method, payment_method='cod', current_step='review',
+        )
+
+    def test_review_loads_session_once_with_related_rows(self):
+        self.complete_steps()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('checkout:review'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['subtotal'], Decimal('200.00'))
+        tables = ' '.join(q['sql'] for q in ctx.captured_queries if q['sql'].startswith('SELECT'))
+        self.assertEqual(tables.count('FROM "checkout_checkoutsession"'), 1)
+        self.assertNotIn('FROM "accounts_address"', tables)
+        self.assertNotIn('FROM "checkout_shippingmethod"', tables)
+
+    def test_cart_fingerprint_tracks_changes(self):
+        session = self.complete_steps()
+        self.client.get(reverse('checkout:review'))
+        fingerprint = CheckoutSession.objects.get(pk=session.pk).cart_data['fingerprint']
+        self.client.get(reverse('checkout:review'))
+        self.assertEqual(CheckoutSession.objects.get(pk=session.pk).cart_data['fingerprint'], fingerprint)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.price.sale_price = Decimal('90.00')
+            self.price.save()
+        self.client.get(reverse('checkout:review'))
+        session.refresh_from_db()
+        self.assertNotEqual(session.cart_data['fingerprint'], fingerprint)
+        self.assertEqual(session.cart_data['subtotal'], '180.00')
+
+    def test_unrelated_price_change_keeps_the_cart_fingerprint(self):
+        session = self.complete_steps()
+        self.client.get(reverse('checkout:review'))
+        fingerprint = CheckoutSession.objects.get(pk=session.pk).cart_data['fingerprint']
+
+        other = ProductVariant.objects.create(product=self.variant.product, sku="LAP-2")
+        with self.captureOnCommitCallbacks(execute=True):
+            Price.objects.create(variant=other, list_price=Decimal('50.00'))
+        self.client.get(reverse('checkout:review'))
+        self.assertEqual(CheckoutSession.objects.get(pk=session.pk).cart_data['fingerprint'], fingerprint)
+
+    def test_place_order_sends_changed_cart_back_to_review(self):
+        self.complete_steps()
+        self.client.get(reverse('checkout:review'))
+        self.client.post(reverse('cart:cart_add'), {'variant_id': self.variant.id, 'quantity': 1})
+        response = self.client.post(reverse('checkout:place_order'))
+        self.assertRedirects(response, reverse('checkout:review'), fetch_redirect_response=False)
+        self.assertFalse(Order.objects.exists())
+
+        self.client.get(reverse('checkout:review'))
+        self.client.post(reverse('checkout:place_order'))
+        self.assertEqual(Order.objects.get().subtotal, Decimal('300.00'))
@@ -0,0 +1,72 @@
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from apps.cart.cart import SessionCart
+from apps.catalog.models import Category, Product, ProductImage, ProductVariant, VariantInventory
+from apps.core import site_cache
+from apps.orders.models import Order
+from apps.pricing.models import Price
+from apps.promotions.engine import get_index
+from .models import CheckoutSession, ShippingMethod
+
+
+class PlaceOrderTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email='buyer@example.com', password='secret')
+        self.client.force_login(self.user)
+        self.shipping_method = ShippingMethod.objects.create(name='Standard', price=Decimal('60.00'))
+        category = Category.objects.create(name="Laptops", slug="laptops")
+        self.variants = []
+        with self.captureOnCommitCallbacks(execute=True):
+            for index in range(100):
+                product = Product.objects.create(name=f"Laptop {index}", slug=f"laptop-{index}", category=category)
+                ProductImage.objects.create(product=product, image=f'products/laptop-{index}.jpg', is_primary=True)
+                variant = ProductVariant.objects.create(product=product, sku=f"LAP-{index}")
+                Price.objects.create(variant=variant, list_price=Decimal('100.00'))
+                VariantInventory.objects.create(variant=variant, stock_qty=10)
+                self.variants.append(variant)
+        # The promotions index is compiled once per process, not per order
+        site_cache.clear_local()
+        get_index()
+
+    def place_order(self, line_count):
+        """
+        Place a COD order for `line_count` lines; returns (order, query count).
+        OrderItem INSERTs aren't counted: bulk_create splits them into batches
+        the backend accepts (SQLite allows 999 parameters per statement).
+        """
+        request = self.client.get('/').wsgi_request
+        SessionCart(request).set_quantities({variant.id: 2 for variant in self.variants[:line_count]})
+        CheckoutSession.objects.create(
+            user=self.user,
+            session_key='checkout',
+            guest_shipping_address={'full_name': 'Buyer', 'address_line1': 'Road 1', 'city': 'Dhaka'},
+            shipping_method=self.shipping_method,
+            payment_method='cod',
+        )
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse('checkout:place_order'))
+        order = Order.objects.latest('created_at')
+        self.assertRedirects(response, reverse('checkout:order_confirmation', args=[order.order_number]), fetch_redirect_response=False)
+        queries = [q for q in ctx.captured_queries if not q['sql'].startswith('INSERT INTO "orders_orderitem"')]
+        return order, len(queries)
+
+    def test_order_snapshots_lines(self):
+        order, queries = self.place_order(2)
+        items = list(order.items.order_by('sku'))
+        self.assertEqual([(i.sku, i.quantity, i.total_price) for i in items], [('LAP-0', 2, Decimal('200.00')), ('LAP-1', 2, Decimal('200.00'))])
+        self.assertEqual(items[0].product_image, '/media/products/laptop-0.jpg')
+        self.assertEqual((order.subtotal, order.total, order.payment_method), (Decimal('400.00'), Decimal('460.00'), 'cod'))
+        self.assertEqual(order.payments.get().amount, Decimal('460.00'))
+        self.assertEqual(VariantInventory.objects.get(variant=self.variants[0]).stock_qty, 8)
+
+    def test_placement_cost_does_not_grow_with_line_count(self):
+        """Benchmark: placing 1, 10 and 100-line orders takes the same number of queries."""
+        results = {lines: self.place_order(lines) for lines in (1, 10, 100)}
+        self.assertEqual([order.items.count() for order, queries in results.values()], [1, 10, 100])
+        self.assertEqual(len({queries for order, queries in results.values()}), 1, results)
@@ -0,0 +1,187 @@
+import threading
+from io import StringIO
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from apps.catalog.models import Category, Product, ProductListing, ProductVariant, VariantInventory
+from apps.core.testing import ConcurrentWritesMixin
+from apps.orders.models import Order, OrderItem
+from apps.pricing.models import Price
+from .models import CheckoutSession, ShippingMethod, StockReservation
+from .reservations import (
+    InsufficientStock, attach_to_order, convert_for_order, release_for_order, reserve_for_checkout
+)
+from .tasks import release_expired_reservations
+
+
+def create_variant(sku, stock_qty):
+    category, _ = Category.objects.get_or_create(name="Laptops", slug="laptops")
+    product = Product.objects.create(name=sku, slug=sku.lower(), category=category)
+    variant = ProductVariant.objects.create(product=product, sku=sku)
+    Price.objects.create(variant=variant, list_price=Decimal('100.00'))
+    VariantInventory.objects.create(variant=variant, stock_qty=stock_qty)
+    return variant
+
+
+def inventory(variant):
+    row = VariantInventory.objects.get(variant=variant)
+    return row.stock_qty, row.reserved_qty
+
+
+class ReservationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.variant = create_variant("LAP-1", 5)
+        self.other = create_variant("LAP-2", 2)
+        self.session = CheckoutSession.objects.create(session_key='first')
+
+    def test_reserve_replace_and_refresh(self):
+        reserve_for_checkout(self.session, {self.variant.id: 3, self.other.id: 1})
+        self.assertEqual(inventory(self.variant), (5, 3))
+        self.assertEqual(inventory(self.other), (2, 1))
+
+        # An unchanged cart only extends the hold
+        StockReservation.objects.update(expires_at=timezone.now())
+        reserve_for_checkout(self.session, {self.variant.id: 3, self.other.id: 1})
+        self.assertEqual(StockReservation.objects.filter(status='active').count(), 2)
+        self.assertTrue(StockReservation.objects.filter(expires_at__gt=timezone.now() + timedelta(minutes=1)).exists())
+
+        reserve_for_checkout(self.session, {self.variant.id: 1})
+        self.assertEqual(inventory(self.variant), (5, 1))
+        self.assertEqual(inventory(self.other), (2, 0))
+
+    def test_shortage_keeps_previous_hold(self):
+        reserve_for_checkout(self.session, {self.variant.id: 2})
+        other_session = CheckoutSession.objects.create(session_key='second')
+        with self.assertRaises(InsufficientStock) as raised:
+            reserve_for_checkout(other_session, {self.variant.id: 4, self.other.id: 1})
+        self.assertEqual(raised.exception.variant_ids, [self.variant.id])
+        self.assertEqual(inventory(self.variant), (5, 2))
+        self.assertEqual(inventory(self.other), (2, 0))
+
+        with self.assertRaises(InsufficientStock):
+            reserve_for_checkout(self.session, {self.variant.id: 6})
+        self.assertEqual(inventory(self.variant), (5, 2))
+
+    def test_untracked_variants_are_not_reserved(self):
+        untracked = create_variant("LAP-3", 0)
+        VariantInventory.objects.filter(variant=untracked).delete()
+        reserve_for_checkout(self.session, {untracked.id: 10})
+        self.assertFalse(StockReservation.objects.exists())
+
+    def create_order(self, lines):
+        order = Order.objects.create()
+        for variant, quantity in lines.items():
+            OrderItem.objects.create(order=order, variant=variant, product_name=variant.sku, quantity=quantity, unit_price=Decimal('100.00'))
+        return order
+
+    def test_convert_on_payment_is_idempotent(self):
+        reserve_for_checkout(self.session, {self.variant.id: 3})
+        order = self.create_order({self.variant: 3})
+        attach_to_order(self.session, order)
+        convert_for_order(order)
+        convert_for_order(order)
+        self.assertEqual(inventory(self.variant), (2, 0))
+        self.assertEqual(StockReservation.objects.get().status, 'converted')
+
+    def test_expired_reservation_is_released_then_converted_late(self):
+        reserve_for_checkout(self.session, {self.variant.id: 3})
+        order = self.create_order({self.variant: 3})
+        attach_to_order(self.session, order)
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        call_command('release_expired_reservations', stdout=StringIO())
+        self.assertEqual(inventory(self.variant), (5, 0))
+
+        convert_for_order(order)
+        convert_for_order(order)
+        self.assertEqual(inventory(self.variant), (2, 0))
+
+    def test_periodic_task_releases_only_expired_reservations(self):
+        reserve_for_checkout(self.session, {self.variant.id: 3, self.other.id: 1})
+        StockReservation.objects.filter(variant=self.variant).update(expires_at=timezone.now() - timedelta(seconds=1))
+        release_expired_reservations()
+        self.assertEqual(inventory(self.variant), (5, 0))
+        self.assertEqual(inventory(self.other), (2, 1))
+
+    def test_release_on_failure(self):
+        reserve_for_checkout(self.session, {self.variant.id: 3})
+        order = self.create_order({self.variant: 3})
+        attach_to_order(self.session, order)
+        release_for_order(order)
+        release_for_order(order)
+        self.assertEqual(inventory(self.variant), (5, 0))
+        convert_for_order(order)
+        self.assertEqual(inventory(self.variant), (2, 0))
+
+    def test_listing_follows_full_reservation(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            reserve_for_checkout(self.session, {self.other.id: 2})
+        self.assertFalse(ProductListing.objects.get(product=self.other.product).in_stock)
+        with self.captureOnCommitCallbacks(execute=True):
+            reserve_for_checkout(self.session, {})
+        self.assertTrue(ProductListing.objects.get(product=self.other.product).in_stock)
+
+
+class PlaceOrderReservationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.variant = create_variant("LAP-1", 3)
+        self.user = get_user_model().objects.create_user(email='buyer@example.com', password='secret')
+        self.client.force_login(self.user)
+        self.client.post(reverse('cart:cart_add'), {'variant_id': self.variant.id, 'quantity': 2})
+        CheckoutSession.objects.create(
+            user=self.user,
+            session_key='checkout',
+            guest_shipping_address={'full_name': 'Buyer', 'address_line1': 'Road 1', 'city': 'Dhaka'},
+            shipping_method=ShippingMethod.objects.create(name='Standard', price=Decimal('60.00')),
+            payment_method='cod',
+        )
+
+    def test_cod_order_decrements_stock(self):
+        self.client.get(reverse('checkout:review'))
+        self.assertEqual(inventory(self.variant), (3, 2))
+        response = self.client.post(reverse('checkout:place_order'))
+        order = Order.objects.get()
+        self.assertRedirects(response, reverse('checkout:order_confirmation', args=[order.order_number]), fetch_redirect_response=False)
+        self.assertEqual(inventory(self.variant), (1, 0))
+
+    def test_order_is_refused_when_stock_ran_out(self):
+        VariantInventory.objects.filter(variant=self.variant).update(reserved_qty=2)
+        response = self.client.post(reverse('checkout:place_order'))
+        self.assertRedirects(response, reverse('cart:cart_detail'), fetch_redirect_response=False)
+        self.assertFalse(Order.objects.exists())
+
+
+class OversellStressTests(ConcurrentWritesMixin, TransactionTestCase):
+    def test_parallel_checkouts_never_oversell(self):
+        stock, buyers = 5, 20
+        variant = create_variant("LAP-1", stock)
+        sessions = [CheckoutSession.objects.create(session_key=f'buyer-{index}') for index in range(buyers)]
+        barrier = threading.Barrier(buyers)
+        results = []
+
+        def buyer(session):
+            try:
+                barrier.wait()
+                reserve_for_checkout(session, {variant.id: 1})
+                results.append(True)
+            except InsufficientStock:
+                results.append(False)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=buyer, args=(session,)) for session in sessions]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        self.assertEqual(results.count(True), stock)
+        self.assertEqual(inventory(variant), (stock, stock))
+        self.assertEqual(StockReservation.objects.filter(status='active').count(), stock)
@@ -0,0 +1,106 @@
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from apps.cart.cart import SessionCart
+from apps.catalog.models import Category, Product, ProductVariant
+from apps.core import site_cache
+from apps.orders.models import Order
+from apps.pricing.models import Price, TaxClass
+from apps.promotions.engine import get_index
+from . import totals as checkout_totals
+from .models import CheckoutSession, ShippingMethod
+from .totals import calculate_totals, get_totals
+
+
+class CheckoutTotalsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        site_cache.clear_local()
+        category = Category.objects.create(name="Laptops", slug="laptops")
+        self.vat = TaxClass.objects.create(name='VAT', rate_percent=Decimal('15.00'))
+        self.reduced = TaxClass.objects.create(name='Reduced', rate_percent=Decimal('5.00'))
+        self.variants = []
+        for index, (list_price, sale_price, tax_class) in enumerate([
+            (Decimal('100.00'), None, self.vat),
+            (Decimal('50.00'), Decimal('40.00'), self.vat),
+            (Decimal('10.00'), None, self.reduced),
+            (Decimal('25.00'), None, None),
+        ]):
+            product = Product.objects.create(name=f"Item {index}", slug=f"item-{index}", category=category)
+            variant = ProductVariant.objects.create(product=product, sku=f"ITEM-{index}")
+            Price.objects.create(variant=variant, list_price=list_price, sale_price=sale_price, tax_class=tax_class)
+            self.variants.append(variant)
+        self.shipping_method = ShippingMethod.objects.create(
+            name='Standard', price=Decimal('60.00'), free_above=Decimal('1000.00')
+        )
+        self.user = get_user_model().objects.create_user(email='buyer@example.com', password='secret')
+        self.client.force_login(self.user)
+
+    def quantities(self, *counts):
+        return {variant.id: count for variant, count in zip(self.variants, counts) if count}
+
+    def test_lines_tax_and_shipping(self):
+        get_index()
+        with self.assertNumQueries(1):
+            totals = calculate_totals(self.quantities(1, 2, 3, 1), self.shipping_method)
+        self.assertEqual([line['line_total'] for line in totals['lines']], [Decimal('100.00'), Decimal('80.00'), Decimal('30.00'), Decimal('25.00')])
+        self.assertEqual(totals['subtotal'], Decimal('235.00'))
+        self.assertEqual(
+            [(tax['name'], tax['taxable'], tax['amount']) for tax in totals['taxes']],
+            [('VAT', Decimal('180.00'), Decimal('27.00')), ('Reduced', Decimal('30.00'), Decimal('1.50'))]
+        )
+        self.assertEqual((totals['tax'], totals['discount'], totals['shipping']), (Decimal('28.50'), Decimal('0.00'), Decimal('60.00')))
+        self.assertEqual(totals['total'], Decimal('323.50'))
+
+    def test_free_shipping_threshold(self):
+        totals = calculate_totals(self.quantities(10), self.shipping_method)
+        self.assertEqual(totals['shipping'], Decimal('0'))
+        self.assertEqual(totals['total'], Decimal('1150.00'))
+
+    def checkout(self, *counts):
+        request = self.client.get('/').wsgi_request
+        cart = SessionCart(request)
+        cart.set_quantities(self.quantities(*counts))
+        session = CheckoutSession.objects.create(
+            user=self.user,
+            session_key='checkout',
+            guest_shipping_address={'full_name': 'Buyer', 'address_line1': 'Road 1', 'city': 'Dhaka'},
+            shipping_method=self.shipping_method,
+            payment_method='cod',
+        )
+        return cart, session
+
+    def test_totals_are_memoized_until_the_cart_or_a_tax_rate_changes(self):
+        cart, session = self.checkout(1, 2)
+        with mock.patch.object(checkout_totals, 'calculate_totals', wraps=calculate_totals) as calculate:
+            first = get_totals(session, cart)
+            self.assertEqual(get_totals(CheckoutSession.objects.get(pk=session.pk), cart), first)
+            self.assertEqual(calculate.call_count, 1)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.vat.rate_percent = Decimal('10.00')
+                self.vat.save()
+            cart = SessionCart(self.client.get('/').wsgi_request)
+            self.assertEqual(get_totals(session, cart)['tax'], Decimal('18.00'))
+
+            cart.set_quantities({self.variants[1].id: 0})
+            self.assertEqual(get_totals(session, cart)['subtotal'], Decimal('100.00'))
+            self.assertEqual(calculate.call_count, 3)
+
+    def test_place_order_uses_the_reviewed_totals(self):
+        self.checkout(1, 2, 3)
+        response = self.client.get(reverse('checkout:review'))
+        reviewed = response.context['totals']
+        self.assertContains(response, 'VAT (15%)')
+
+        self.client.post(reverse('checkout:place_order'))
+        order = Order.objects.get()
+        self.assertEqual(
+            (order.subtotal, order.tax_amount, order.discount_amount, order.shipping_cost, order.total),
+            (reviewed['subtotal'], reviewed['tax'], reviewed['discount'], reviewed['shipping'], reviewed['total'])
+        )
+        self.assertEqual(order.total, Decimal('298.50'))
+        self.assertEqual(order.payments.get().amount, order.total)
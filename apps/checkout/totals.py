@@ -0,0 +1,111 @@
+"""
+Checkout totals.
+
+calculate_totals() prices a cart in one pass over variants loaded with a
+single query: line prices, promotion discounts, tax per TaxClass and
+shipping. get_totals() memoizes the result in the checkout session's
+cart_data, keyed by the cart fingerprint, shipping method, promo code and
+promotions version, so review and place_order use the very same numbers.
+Discounts come from apps.promotions.engine.
+
+Tax is exclusive, as in Price.get_tax_amount(): each line's TaxClass rate is
+applied to the line total after discounts and added on top.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+from apps.catalog.models import ProductVariant
+from apps.promotions import engine as promotions
+
+
+CENT = Decimal('0.01')
+
+# Keys of the totals dict (and its lines/taxes) that hold Decimals
+DECIMAL_KEYS = {'unit_price', 'line_total', 'discount', 'rate', 'taxable', 'amount', 'subtotal', 'tax', 'shipping', 'total'}
+
+
+def money(value):
+    return Decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def calculate_totals(quantities, shipping_method=None, promo_code=''):
+    """Totals for {variant_id: quantity} with the given shipping method and promo code."""
+    variants = ProductVariant.objects.filter(id__in=quantities).select_related(
+        'product', 'price__tax_class'
+    ).order_by('pk')
+
+    lines = []
+    for variant in variants:
+        price = variant.get_price()
+        unit_price = price.effective_price if price is not None else Decimal('0')
+        tax_class = price.tax_class if price is not None else None
+        lines.append({
+            'variant_id': variant.pk,
+            'product_id': variant.product_id,
+            'category_id': variant.product.category_id,
+            'brand_id': variant.product.brand_id,
+            'quantity': quantities[variant.pk],
+            'unit_price': unit_price,
+            'line_total': money(unit_price * quantities[variant.pk]),
+            'discount': Decimal('0'),
+            'tax_class': tax_class,
+        })
+    subtotal = sum((line['line_total'] for line in lines), Decimal('0'))
+
+    discount, free_shipping, applied = promotions.evaluate(lines, promo_code)
+    discount = money(discount)
+
+    taxes = {}
+    for line in lines:
+        tax_class = line.pop('tax_class')
+        if tax_class is None or not tax_class.rate_percent:
+            continue
+        entry = taxes.setdefault(tax_class.pk, {
+            'name': tax_class.name, 'rate': tax_class.rate_percent, 'taxable': Decimal('0'),
+        })
+        entry['taxable'] += line['line_total'] - line['discount']
+    for entry in taxes.values():
+        entry['amount'] = money(entry['taxable'] * entry['rate'] / 100)
+    tax = sum((entry['amount'] for entry in taxes.values()), Decimal('0'))
+
+    shipping = Decimal('0')
+    if shipping_method is not None and not free_shipping:
+        shipping = money(shipping_method.get_price_for_amount(subtotal - discount))
+
+    return {
+        'lines': lines,
+        'subtotal': subtotal,
+        'discount': discount,
+        'free_shipping': free_shipping,
+        'promotions': applied,
+        'taxes': list(taxes.values()),
+        'tax': tax,
+        'shipping': shipping,
+        'total': subtotal - discount + tax + shipping,
+    }
+
+
+def _convert(value, convert):
+    if isinstance(value, dict):
+        return {key: convert(item) if key in DECIMAL_KEYS else _convert(item, convert) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_convert(item, convert) for item in value]
+    return value
+
+
+def get_totals(checkout_session, cart):
+    """Totals for the session's cart, recalculated only when an input changed."""
+    checkout_session.sync_cart(cart)
+    shipping_method = checkout_session.shipping_method
+    key = ':'.join([
+        checkout_session.cart_data['fingerprint'],
+        f'{shipping_method.pk}@{shipping_method.updated_at.isoformat()}' if shipping_method else '',
+        checkout_session.promo_code,
+        promotions.get_version(),
+    ])
+    memo = checkout_session.cart_data.get('totals')
+    if memo and memo.get('key') == key:
+        return _convert(memo['value'], Decimal)
+
+    totals = calculate_totals(cart.get_quantities(), shipping_method, checkout_session.promo_code)
+    checkout_session.cart_data['totals'] = {'key': key, 'value': _convert(totals, str)}
+    checkout_session.save(update_fields=['cart_data', 'updated_at'])
+    return totals
@@ -9,6 +9,7 @@ urlpatterns = [
     path('shipping/', views.checkout_shipping, name='shipping'),
     path('payment/', views.checkout_payment, name='payment'),
     path('review/', views.checkout_review, name='review'),
+    path('promo/', views.apply_promo_code, name='apply_promo_code'),
     path('place-order/', views.place_order, name='place_order'),
     path('confirmation/<str:order_number>/', views.order_confirmation, name='order_confirmation'),
 ]
@@ -4,6 +4,7 @@ from django.contrib import messages
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 from django.db import transaction
+from django.db.models import prefetch_related_objects
 from decimal import Decimal
 import uuid
 
@@ -12,30 +13,65 @@ from apps.accounts.models import Address
 from apps.orders.models import Order, OrderItem
 from apps.payments.models import PaymentTransaction
 from apps.payments.utils import SSLCommerzProvider
+from apps.promotions.engine import (
+    PromotionUnavailable, find_code, normalize_code, redeem as redeem_promotions, release_for_order as release_promotions
+)
 from .models import ShippingMethod, CheckoutSession
+from .reservations import InsufficientStock, attach_to_order, convert_for_order, release_for_order, reserve_for_checkout
+from .totals import get_totals
+
+
+STEP_URLS = {
+    'address': 'checkout:address',
+    'shipping': 'checkout:shipping',
+    'payment': 'checkout:payment',
+    'review': 'checkout:review',
+}
 
 
 def get_or_create_checkout_session(request):
-    """Get or create a checkout session for the current user/guest."""
+    """
+    Get or create a checkout session for the current user/guest, with its
+    addresses and shipping method. Loaded once per request.
+    """
+    if hasattr(request, '_checkout_session'):
+        return request._checkout_session
+    
     session_key = request.session.session_key
     if not session_key:
         request.session.create()
         session_key = request.session.session_key
     
+    sessions = CheckoutSession.objects.select_related('shipping_address', 'billing_address', 'shipping_method')
     if request.user.is_authenticated:
-        session, created = CheckoutSession.objects.get_or_create(
-            user=request.user,
-            defaults={'session_key': session_key}
-        )
+        session = sessions.filter(user=request.user).first()
+        if session is None:
+            session = CheckoutSession.objects.create(user=request.user, session_key=session_key)
     else:
-        session, created = CheckoutSession.objects.get_or_create(
-            session_key=session_key,
-            user=None
-        )
+        session = sessions.filter(session_key=session_key, user=None).first()
+        if session is None:
+            session = CheckoutSession.objects.create(session_key=session_key)
     
+    request._checkout_session = session
     return session
 
 
+def load_checkout(request, step):
+    """
+    Load the cart and checkout session for a step view. Returns
+    (cart, session, response); response is a redirect when the cart is empty
+    or an earlier step still needs the customer.
+    """
+    cart = SessionCart(request)
+    if len(cart) == 0:
+        return cart, None, redirect('cart:cart_detail')
+    
+    session = get_or_create_checkout_session(request)
+    if not session.can_enter(step):
+        return cart, session, redirect(STEP_URLS[session.get_next_step()])
+    return cart, session, None
+
+
 def checkout(request):
     """Main checkout view - redirects to first incomplete step."""
     if not request.user.is_authenticated:
@@ -49,28 +85,16 @@ def checkout(request):
         return redirect('cart:cart_detail')
     
     session = get_or_create_checkout_session(request)
-    
-    # Determine next step
-    if not session.shipping_address and not session.guest_shipping_address:
-        return redirect('checkout:address')
-    elif not session.shipping_method:
-        return redirect('checkout:shipping')
-    elif not session.payment_method:
-        return redirect('checkout:payment')
-    else:
-        return redirect('checkout:review')
+    return redirect(STEP_URLS[session.get_next_step()])
 
 
 @login_required
 def checkout_address(request):
 
     """Step 1: Address selection/entry."""
-    cart = SessionCart(request)
-    
-    if len(cart) == 0:
-        return redirect('cart:cart_detail')
-    
-    session = get_or_create_checkout_session(request)
+    cart, session, response = load_checkout(request, 'address')
+    if response:
+        return response
     
     if request.method == 'POST':
         # 1. Try to get a saved address (only for authenticated users)
@@ -90,9 +114,9 @@ def checkout_address(request):
                     session.billing_address = get_object_or_404(Address, id=billing_id, user=request.user)
             
             session.guest_shipping_address = {} # Clear guest info if saved address used
-            session.current_step = 'shipping'
+            session.complete_step('address')
             session.save()
-            return redirect('checkout:shipping')
+            return redirect(STEP_URLS[session.current_step])
             
         # 2. Otherwise, handle manual address entry (Guest style)
         else:
@@ -134,9 +158,9 @@ def checkout_address(request):
                         'country': request.POST.get('billing_country', 'Bangladesh'),
                     }
                 
-                session.current_step = 'shipping'
+                session.complete_step('address')
                 session.save()
-                return redirect('checkout:shipping')
+                return redirect(STEP_URLS[session.current_step])
 
     
     # Get user's saved addresses
@@ -156,16 +180,9 @@ def checkout_address(request):
 @login_required
 def checkout_shipping(request):
     """Step 2: Shipping method selection."""
-    cart = SessionCart(request)
-    
-    if len(cart) == 0:
-        return redirect('cart:cart_detail')
-    
-    session = get_or_create_checkout_session(request)
-    
-    # Check prerequisite
-    if not session.shipping_address and not session.guest_shipping_address:
-        return redirect('checkout:address')
+    cart, session, response = load_checkout(request, 'shipping')
+    if response:
+        return response
     
     if request.method == 'POST':
         shipping_id = request.POST.get('shipping_method')
@@ -173,9 +190,9 @@ def checkout_shipping(request):
             shipping_method = get_object_or_404(ShippingMethod, id=shipping_id, is_active=True)
             session.shipping_method = shipping_method
             session.customer_note = request.POST.get('customer_note', '')
-            session.current_step = 'review'
+            session.complete_step('shipping')
             session.save()
-            return redirect('checkout:review')
+            return redirect(STEP_URLS[session.current_step])
     
     # Get shipping methods
     shipping_methods = ShippingMethod.objects.filter(is_active=True)
@@ -203,26 +220,17 @@ def checkout_shipping(request):
 @login_required
 def checkout_payment(request):
     """Step 3: Payment method selection."""
-    cart = SessionCart(request)
-    
-    if len(cart) == 0:
-        return redirect('cart:cart_detail')
-    
-    session = get_or_create_checkout_session(request)
-    
-    # Check prerequisites
-    if not session.shipping_address and not session.guest_shipping_address:
-        return redirect('checkout:address')
-    if not session.shipping_method:
-        return redirect('checkout:shipping')
+    cart, session, response = load_checkout(request, 'payment')
+    if response:
+        return response
     
     if request.method == 'POST':
         payment_method = request.POST.get('payment_method')
-        if payment_method in ['sslcommerz', 'cod']:
+        if payment_method in CheckoutSession.PAYMENT_METHODS:
             session.payment_method = payment_method
-            session.current_step = 'review'
+            session.complete_step('payment')
             session.save()
-            return redirect('checkout:review')
+            return redirect(STEP_URLS[session.current_step])
             
     context = {
         'cart': cart,
@@ -234,26 +242,21 @@ def checkout_payment(request):
 
 @login_required
 def checkout_review(request):
-    """Step 3: Review order and place it."""
-    cart = SessionCart(request)
-    
-    if len(cart) == 0:
+    """Step 4: Review order and place it."""
+    cart, session, response = load_checkout(request, 'review')
+    if response:
+        return response
+    
+    # Hold the stock while the customer reviews the order
+    session.sync_cart(cart)
+    try:
+        reserve_for_checkout(session, cart.get_quantities())
+    except InsufficientStock:
+        messages.error(request, 'Some items in your cart are no longer available in the requested quantity.')
         return redirect('cart:cart_detail')
     
-    session = get_or_create_checkout_session(request)
-    
-    # Check prerequisites
-    if not session.shipping_address and not session.guest_shipping_address:
-        return redirect('checkout:address')
-    if not session.shipping_method:
-        return redirect('checkout:shipping')
-    if not session.payment_method:
-        return redirect('checkout:payment')
-    
-    # Calculate totals
-    subtotal = cart.get_total_price()
-    shipping_cost = session.shipping_method.get_price_for_amount(subtotal)
-    total = subtotal + Decimal(str(shipping_cost))
+    # Calculate totals (memoized on the session; place_order reuses them)
+    totals = get_totals(session, cart)
     
     # Get address display
     if session.shipping_address:
@@ -277,14 +280,34 @@ def checkout_review(request):
         'cart': cart,
         'session': session,
         'shipping_display': shipping_display,
-        'subtotal': subtotal,
-        'shipping_cost': shipping_cost,
-        'total': total,
+        'totals': totals,
+        'subtotal': totals['subtotal'],
+        'shipping_cost': totals['shipping'],
+        'total': totals['total'],
         'step': 'review',
     }
     return render(request, 'checkout/checkout_review.html', context)
 
 
+@require_POST
+def apply_promo_code(request):
+    """Apply a promo code at review; an empty code removes the current one."""
+    session = get_or_create_checkout_session(request)
+    code = normalize_code(request.POST.get('promo_code'))
+    
+    if not code:
+        session.promo_code = ''
+        messages.info(request, 'Promo code removed.')
+    elif find_code(code) is None:
+        messages.error(request, 'This promo code is invalid or has expired.')
+        return redirect('checkout:review')
+    else:
+        session.promo_code = code
+        messages.success(request, f'Promo code {code} applied.')
+    session.save(update_fields=['promo_code', 'updated_at'])
+    return redirect('checkout:review')
+
+
 @require_POST
 def place_order(request):
     """Place the order and redirect to payment or confirmation."""
@@ -300,10 +323,25 @@ def place_order(request):
         messages.error(request, 'Please complete all checkout steps.')
         return redirect('checkout:checkout')
     
-    # Calculate totals
-    subtotal = cart.get_total_price()
-    shipping_cost = session.shipping_method.get_price_for_amount(subtotal)
-    total = subtotal + Decimal(str(shipping_cost))
+    # The customer must see the totals they pay for
+    reviewed = session.cart_data.get('fingerprint')
+    if session.sync_cart(cart) and reviewed:
+        messages.warning(request, 'Your cart has changed. Please review your order again.')
+        return redirect('checkout:review')
+    
+    # Refresh the hold made at review (or make it, if it has expired)
+    try:
+        reserve_for_checkout(session, cart.get_quantities())
+    except InsufficientStock:
+        messages.error(request, 'Some items in your cart are no longer available in the requested quantity.')
+        return redirect('cart:cart_detail')
+    
+    # The totals shown at review; promotions may have changed since
+    reviewed_total = session.cart_data.get('totals', {}).get('value', {}).get('total')
+    totals = get_totals(session, cart)
+    if reviewed_total is not None and Decimal(reviewed_total) != totals['total']:
+        messages.warning(request, 'Your order total has changed. Please review your order again.')
+        return redirect('checkout:review')
     
     # Prepare address data
     if session.shipping_address:
@@ -340,73 +378,101 @@ def place_order(request):
             shipping_address=shipping_data,
             billing_address=billing_data,
             shipping_method_name=session.shipping_method.name,
-            shipping_cost=shipping_cost,
+            shipping_cost=totals['shipping'],
             estimated_delivery=session.shipping_method.get_delivery_estimate(),
-            subtotal=subtotal,
-            total=total,
+            subtotal=totals['subtotal'],
+            tax_amount=totals['tax'],
+            discount_amount=totals['discount'],
+            total=totals['total'],
             customer_note=session.customer_note,
             promo_code=session.promo_code,
+            payment_method=session.payment_method,
         )
         
-        # Create order items from cart
-        for item in cart:
-            variant = item['variant']
-            OrderItem.objects.create(
+        # Create order items from cart in one INSERT. Image URLs come from the
+        # listing snapshots; products without one get their images in one query
+        lines = list(cart)
+        prefetch_related_objects(
+            [line['variant'].product for line in lines if line['variant'].product.cached_listing is None],
+            'images'
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(
                 order=order,
-                variant=variant,
-                product_name=variant.product.name,
-                variant_name=variant.variant_name or '',
-                sku=variant.sku,
-                product_image=variant.get_image().image.url if variant.get_image() else '',
-                quantity=item['quantity'],
-                unit_price=item['unit_price'],
-                total_price=item['total_price'],
-                is_digital=variant.product.product_type == 'digital',
+                variant=line['variant'],
+                product_name=line['variant'].product.name,
+                variant_name=line['variant'].variant_name or '',
+                sku=line['variant'].sku,
+                product_image=line['variant'].product.primary_image_url,
+                quantity=line['quantity'],
+                unit_price=line['unit_price'],
+                # bulk_create skips OrderItem.save(), which normally computes this
+                total_price=line['unit_price'] * line['quantity'],
+                is_digital=line['variant'].product.product_type == 'digital',
             )
+            for line in lines
+        ])
         
-        # Clear cart
-        cart.clear()
+        # Count the promotion uses; a promotion used up meanwhile cancels the placement
+        try:
+            redeem_promotions(order, totals['promotions'])
+        except PromotionUnavailable as e:
+            transaction.set_rollback(True)
+            messages.error(request, f"{', '.join(e.names)} is no longer available. Please review your order again.")
+            return redirect('checkout:review')
         
-        # Store order number in session for confirmation page
-        request.session['last_order_number'] = order.order_number
+        # The reserved stock now belongs to the order
+        attach_to_order(session, order)
         
         # Create PaymentTransaction
         transaction_id = f"{order.order_number}_{uuid.uuid4().hex[:8]}"
         pmt_transaction = PaymentTransaction.objects.create(
             transaction_id=transaction_id,
             order=order,
-            amount=total,
+            amount=totals['total'],
             payment_method=session.payment_method,
             status='pending'
         )
         
-        # SSLCommerz Logic
-        if session.payment_method == 'sslcommerz':
-            ssl = SSLCommerzProvider()
-            gateway_url, error_message = ssl.init_payment(order, transaction_id, request)
-            
-            if gateway_url:
-                # Delete checkout session after redirecting to payment
-                session.delete()
-                return redirect(gateway_url)
-            else:
-                messages.error(request, f'SSLCommerz Error: {error_message}')
-                # Rollback transaction (implicitly handled by atomic)
-                raise Exception(f"SSLCommerz initialization failed: {error_message}")
+        # COD orders take their stock right away
+        if session.payment_method == 'cod':
+            convert_for_order(order)
+    
+    # Store order number in session for confirmation page
+    request.session['last_order_number'] = order.order_number
+    
+    # SSLCommerz Logic. The gateway is called once the order is committed, so
+    # a slow gateway never holds the database transaction open
+    if session.payment_method == 'sslcommerz':
+        ssl = SSLCommerzProvider()
+        gateway_url, error_message = ssl.init_payment(order, transaction_id, request)
+        if not gateway_url:
+            abandon_order(order, pmt_transaction, error_message)
+            messages.error(request, f'SSLCommerz Error: {error_message}')
+            return redirect('checkout:review')
+    
+    # Clear cart and delete checkout session
+    cart.clear()
+    session.delete()
+    
+    if session.payment_method == 'sslcommerz':
+        return redirect(gateway_url)
+    
+    messages.success(request, f'Order {order.order_number} placed successfully!')
+    return redirect('checkout:order_confirmation', order_number=order.order_number)
 
-        # COD Logic
-        elif session.payment_method == 'cod':
-            order.payment_method = 'cod'
-            order.save()
-            
-            # Delete checkout session
-            session.delete()
-            
-            messages.success(request, f'Order {order.order_number} placed successfully!')
-            return redirect('checkout:order_confirmation', order_number=order.order_number)
-            
-    # Fallback
-    return redirect('checkout:review')
+
+def abandon_order(order, pmt_transaction, error_message):
+    """Cancel an order whose payment could not be started; its stock and promotions are freed."""
+    with transaction.atomic():
+        pmt_transaction.status = 'failed'
+        pmt_transaction.provider_response = {'error': error_message}
+        pmt_transaction.save(update_fields=['status', 'provider_response', 'updated_at'])
+        order.status = 'cancelled'
+        order.payment_status = 'failed'
+        order.save(update_fields=['status', 'payment_status', 'updated_at'])
+        release_for_order(order)
+        release_promotions(order)
 
 
 def order_confirmation(request, order_number):
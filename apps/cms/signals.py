@@ -0,0 +1,13 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.core import site_cache
+from .models import FooterLink, FooterSection, SiteSettings
+
+
+@receiver([post_save, post_delete], sender=SiteSettings)
+@receiver([post_save, post_delete], sender=FooterSection)
+@receiver([post_save, post_delete], sender=FooterLink)
+def invalidate_site_cache_on_cms_change(sender, **kwargs):
+    # After the commit, so a concurrent request can't cache the old rows anew
+    transaction.on_commit(lambda: site_cache.bump('site'))
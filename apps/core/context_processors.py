@@ -1,7 +1,72 @@
 """
 Context processors for core app.
+
+Values are lazy (evaluated only if a template uses them) and read through
+apps.core.site_cache, so a warm page renders the layout without queries.
 """
+from django.utils.functional import SimpleLazyObject
 from apps.catalog.models import Category
+from . import site_cache
+
+
+# Convenience variables and their fallbacks when no CMS settings exist
+SITE_FIELDS = {
+    'site_name': ('site_name', 'DCL Ecommerce'),
+    'site_tagline': ('tagline', 'Your Trusted IT Partner'),
+    'site_email': ('email', ''),
+    'site_phone': ('phone', ''),
+    'site_address': ('address', ''),
+    'site_logo': ('logo', None),
+    'site_favicon': ('favicon', None),
+    'seo_title': ('seo_title', ''),
+    'seo_description': ('seo_description', ''),
+    'seo_keywords': ('seo_keywords', ''),
+    'facebook_url': ('facebook_url', ''),
+    'instagram_url': ('instagram_url', ''),
+    'twitter_url': ('twitter_url', ''),
+    'youtube_url': ('youtube_url', ''),
+    'linkedin_url': ('linkedin_url', ''),
+    'footer_text': ('footer_text', ''),
+}
+
+
+def get_cms_settings():
+    """The CMS SiteSettings singleton (or None), cached."""
+    from apps.cms.models import SiteSettings
+
+    return site_cache.get_or_build('site', 'settings', SiteSettings.objects.first)
+
+
+def get_footer_sections():
+    """Active footer sections with their active links, cached."""
+    from django.db.models import Prefetch
+    from apps.cms.models import FooterLink, FooterSection
+
+    def build():
+        return list(FooterSection.objects.filter(is_active=True).prefetch_related(
+            Prefetch('links', queryset=FooterLink.objects.filter(is_active=True), to_attr='active_links')
+        ))
+    return site_cache.get_or_build('site', 'footer_sections', build)
+
+
+def get_main_categories():
+    """Top-level active categories for navigation, cached."""
+    return site_cache.get_or_build('catalog', 'main_categories', lambda: list(
+        Category.objects.filter(is_active=True, parent__isnull=True).order_by('sort_order', 'name')[:6]
+    ))
+
+
+def _site_value(name):
+    field, default = SITE_FIELDS[name]
+
+    def value():
+        cms_settings = get_cms_settings()
+        if cms_settings is None:
+            return default
+        if name in ('site_name', 'site_tagline'):
+            return getattr(cms_settings, field) or default
+        return getattr(cms_settings, field)
+    return value
 
 
 def site_settings(request):
@@ -9,65 +74,11 @@ def site_settings(request):
     Add site settings from CMS to template context.
     Makes SiteSettings globally available in all templates.
     """
-    from apps.cms.models import SiteSettings
-    
-    # Get main categories (no parent) for navigation
-    main_categories = Category.objects.filter(
-        is_active=True,
-        parent__isnull=True
-    ).order_by('sort_order', 'name')[:6]
-    
-    # Get CMS site settings (singleton)
-    try:
-        cms_settings = SiteSettings.objects.first()
-    except Exception:
-        cms_settings = None
-    
-    # Build context with CMS data or fallback defaults
     context = {
-        'nav_categories': main_categories,
-        'cms': cms_settings,  # Full settings object for template access
+        'nav_categories': SimpleLazyObject(get_main_categories),
+        'cms': SimpleLazyObject(get_cms_settings),  # Full settings object for template access
+        'footer_sections': SimpleLazyObject(get_footer_sections),
     }
-    
-    # Add convenience variables (fallback to defaults if no CMS settings)
-    if cms_settings:
-        context.update({
-            'site_name': cms_settings.site_name or 'DCL Ecommerce',
-            'site_tagline': cms_settings.tagline or 'Your Trusted IT Partner',
-            'site_email': cms_settings.email,
-            'site_phone': cms_settings.phone,
-            'site_address': cms_settings.address,
-            'site_logo': cms_settings.logo,
-            'site_favicon': cms_settings.favicon,
-            'seo_title': cms_settings.seo_title,
-            'seo_description': cms_settings.seo_description,
-            'seo_keywords': cms_settings.seo_keywords,
-            'facebook_url': cms_settings.facebook_url,
-            'instagram_url': cms_settings.instagram_url,
-            'twitter_url': cms_settings.twitter_url,
-            'youtube_url': cms_settings.youtube_url,
-            'linkedin_url': cms_settings.linkedin_url,
-            'footer_text': cms_settings.footer_text,
-        })
-    else:
-        # Fallback defaults when no CMS settings exist
-        context.update({
-            'site_name': 'DCL Ecommerce',
-            'site_tagline': 'Your Trusted IT Partner',
-            'site_email': '',
-            'site_phone': '',
-            'site_address': '',
-            'site_logo': None,
-            'site_favicon': None,
-            'seo_title': '',
-            'seo_description': '',
-            'seo_keywords': '',
-            'facebook_url': '',
-            'instagram_url': '',
-            'twitter_url': '',
-            'youtube_url': '',
-            'linkedin_url': '',
-            'footer_text': '',
-        })
-    
+    for name in SITE_FIELDS:
+        context[name] = SimpleLazyObject(_site_value(name))
     return context
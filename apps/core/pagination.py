@@ -0,0 +1,202 @@
+"""
+Keyset (cursor) pagination.
+
+Unlike Django's Paginator this never runs COUNT(*) or OFFSET: each page is
+fetched with a WHERE clause on the sort keys of the last row seen, so deep
+pages cost the same as the first one. Pages only know whether there is a
+next/previous page, not how many pages there are.
+
+Cursors are signed, opaque strings; a cursor that fails to decode yields the
+first page, like Paginator.get_page() does for a bad page number.
+"""
+from collections.abc import Sequence
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import F, Q
+
+
+class CursorPage(Sequence):
+    """One page of results plus the cursors of its neighbours."""
+
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self.object_list)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def link_to(self, request, cursor):
+        """URL of the current request with `cursor` swapped in."""
+        params = request.GET.copy()
+        params.pop('page', None)
+        params['cursor'] = cursor
+        return f'{request.path}?{params.urlencode()}'
+
+    def next_url(self, request):
+        return self.link_to(request, self.next_cursor) if self.has_next() else None
+
+    def previous_url(self, request):
+        return self.link_to(request, self.previous_cursor) if self.has_previous() else None
+
+
+class CursorPaginator:
+    """
+    Paginate `queryset` by the `ordering` fields, e.g. ('-created_at', '-id').
+
+    Orderings may span relations ('listing__price'); nullable keys sort last in
+    both directions. A primary key tie-breaker is appended when missing so the
+    ordering is total.
+    """
+
+    salt = 'core.pagination.cursor'
+
+    def __init__(self, queryset, ordering, per_page):
+        self.per_page = int(per_page)
+        ordering = list(ordering)
+        if ordering[-1].lstrip('-') not in ('pk', 'id'):
+            ordering.append('-pk' if ordering[-1].startswith('-') else 'pk')
+        self.keys = []
+        annotations = {}
+        for index, field in enumerate(ordering):
+            alias = f'_cursor_{index}'
+            name = field.lstrip('-')
+            annotations[alias] = F(name)
+            self.keys.append((alias, field.startswith('-'), self._is_nullable(queryset, name)))
+        self.queryset = queryset.annotate(**annotations)
+
+    @staticmethod
+    def _is_nullable(queryset, name):
+        if name in queryset.query.annotations or name == 'pk':
+            return False
+        if '__' in name:
+            # Joined columns can be NULL when the related row is missing
+            return True
+        return queryset.model._meta.get_field(name).null
+
+    def _output_field(self, alias):
+        return self.queryset.query.annotations[alias].resolve_expression(
+            self.queryset.query.clone()
+        ).output_field
+
+    def encode_cursor(self, obj, backwards=False):
+        values = []
+        for alias, descending, nullable in self.keys:
+            value = getattr(obj, alias)
+            if value is not None and not isinstance(value, (bool, int, float, str)):
+                value = str(value)
+            values.append(value)
+        return signing.dumps({'v': values, 'b': backwards}, salt=self.salt, compress=True)
+
+    def decode_cursor(self, cursor):
+        """Return (values, backwards), or None for a missing or invalid cursor."""
+        if not cursor:
+            return None
+        try:
+            data = signing.loads(cursor, salt=self.salt)
+            values = [
+                None if raw is None else self._output_field(alias).to_python(raw)
+                for (alias, descending, nullable), raw in zip(self.keys, data['v'], strict=True)
+            ]
+            return values, bool(data['b'])
+        except (signing.BadSignature, ValidationError, KeyError, TypeError, ValueError):
+            return None
+
+    def _ordering(self, backwards):
+        ordering = []
+        for alias, descending, nullable in self.keys:
+            nulls = {}
+            if nullable:
+                nulls = {'nulls_first': True} if backwards else {'nulls_last': True}
+            if descending != backwards:
+                ordering.append(F(alias).desc(**nulls))
+            else:
+                ordering.append(F(alias).asc(**nulls))
+        return ordering
+
+    def _beyond(self, alias, descending, nullable, value, backwards):
+        """Rows strictly past `value` on one key, in the direction of travel."""
+        if value is None:
+            # NULLs sort last: nothing follows them, every non-NULL precedes them
+            return Q(**{f'{alias}__isnull': False}) if backwards else Q(pk__in=[])
+        lookup = 'lt' if descending != backwards else 'gt'
+        condition = Q(**{f'{alias}__{lookup}': value})
+        if nullable and not backwards:
+            condition |= Q(**{f'{alias}__isnull': True})
+        return condition
+
+    def _seek(self, values, backwards):
+        """(k1 past v1) OR (k1 = v1 AND k2 past v2) OR ..."""
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (alias, descending, nullable), value in zip(self.keys, values):
+            condition |= equal & self._beyond(alias, descending, nullable, value, backwards)
+            equal &= Q(**{f'{alias}__isnull': True}) if value is None else Q(**{alias: value})
+        return condition
+
+    def get_page(self, cursor=None):
+        decoded = self.decode_cursor(cursor)
+        queryset = self.queryset
+        backwards = False
+        if decoded is not None:
+            values, backwards = decoded
+            queryset = queryset.filter(self._seek(values, backwards))
+        rows = list(queryset.order_by(*self._ordering(backwards))[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if has_more or backwards:
+                next_cursor = self.encode_cursor(rows[-1])
+            if decoded is not None and (has_more or not backwards):
+                previous_cursor = self.encode_cursor(rows[0], backwards=True)
+        return CursorPage(rows, self, next_cursor, previous_cursor)
+
+
+def paginate_by_cursor(request, queryset, ordering, per_page):
+    """
+    Cursor page for the request's `cursor` parameter, with `next_link` and
+    `previous_link` URLs that keep the other query parameters.
+    """
+    page = CursorPaginator(queryset, ordering, per_page).get_page(request.GET.get('cursor'))
+    page.next_link = page.next_url(request)
+    page.previous_link = page.previous_url(request)
+    return page
+
+
+def paginate_by_page(request, queryset, ordering, per_page):
+    """
+    Numbered page for the request's `page` parameter, with the same
+    `next_link` and `previous_link` attributes as paginate_by_cursor().
+    """
+    page = Paginator(queryset.order_by(*ordering), per_page).get_page(request.GET.get('page'))
+
+    def link_to(number):
+        params = request.GET.copy()
+        params.pop('cursor', None)
+        params['page'] = number
+        return f'{request.path}?{params.urlencode()}'
+
+    page.next_link = link_to(page.next_page_number()) if page.has_next() else None
+    page.previous_link = link_to(page.previous_page_number()) if page.has_previous() else None
+    return page
@@ -0,0 +1,73 @@
+"""
+Two-level cache for small, rarely changing site-wide data (navigation,
+site settings, footer).
+
+Values are stored in the shared Django cache under a versioned key and also
+kept in a process-local dict, so a warm page reads them without a database
+query or, within VERSION_CHECK_INTERVAL, even a cache round trip.
+
+Each namespace has a version in the shared cache. bump() (called from the
+save/delete signal receivers once the transaction commits) replaces it: the
+bumping process drops its local copies at once, other processes within
+VERSION_CHECK_INTERVAL seconds.
+"""
+import threading
+import time
+import uuid
+from django.core.cache import cache
+
+
+CACHE_TIMEOUT = 60 * 60
+VERSION_CHECK_INTERVAL = 5
+
+_lock = threading.Lock()
+_versions = {}  # namespace -> (version, checked_at)
+_values = {}  # (namespace, name) -> (version, value)
+
+
+def _version_key(namespace):
+    return f'site:{namespace}:version'
+
+
+def get_version(namespace):
+    now = time.monotonic()
+    known = _versions.get(namespace)
+    if known and now - known[1] < VERSION_CHECK_INTERVAL:
+        return known[0]
+    version = cache.get_or_set(_version_key(namespace), uuid.uuid4().hex, None)
+    _versions[namespace] = (version, now)
+    return version
+
+
+def bump(namespace):
+    """Invalidate everything cached under `namespace`."""
+    cache.set(_version_key(namespace), uuid.uuid4().hex, None)
+    with _lock:
+        _versions.pop(namespace, None)
+        for key in [key for key in _values if key[0] == namespace]:
+            del _values[key]
+
+
+def get_or_build(namespace, name, builder, timeout=CACHE_TIMEOUT):
+    """Return the cached value of `name`, calling builder() on a miss."""
+    version = get_version(namespace)
+    local = _values.get((namespace, name))
+    if local and local[0] == version:
+        return local[1]
+
+    key = f'site:{namespace}:{version}:{name}'
+    # Stored wrapped so that a cached None is distinguishable from a miss
+    wrapped = cache.get(key)
+    if wrapped is None:
+        wrapped = (builder(),)
+        cache.set(key, wrapped, timeout)
+    with _lock:
+        _values[(namespace, name)] = (version, wrapped[0])
+    return wrapped[0]
+
+
+def clear_local():
+    """Forget the process-local copies (the shared cache is untouched)."""
+    with _lock:
+        _versions.clear()
+        _values.clear()
@@ -0,0 +1,66 @@
+"""
+Helpers shared by the test suites.
+"""
+import os
+import sqlite3
+import tempfile
+from unittest import mock
+from django.db import connections
+
+
+def _begin_immediate(self):
+    self.cursor().execute('BEGIN IMMEDIATE')
+
+
+class ConcurrentWritesMixin:
+    """
+    For TransactionTestCases whose threads write to the database at once.
+
+    On SQLite, threads can't write to the in-memory test database together
+    ("database table is locked"), so these tests run against a copy of it
+    in a temporary file, where a writer waits up to `busy_timeout` seconds
+    for the lock. Their transactions also start with BEGIN IMMEDIATE: two
+    deferred transactions that both try to upgrade to a write lock fail at
+    once instead of waiting (Django 5.1's transaction_mode option does the
+    same). Other databases are left alone.
+    """
+
+    busy_timeout = 20
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        connection = connections['default']
+        if connection.vendor != 'sqlite':
+            return
+        patcher = mock.patch.object(type(connection), '_start_transaction_under_autocommit', _begin_immediate)
+        patcher.start()
+        cls.addClassCleanup(patcher.stop)
+        if connection.is_in_memory_db():
+            cls._use_file_database(connection)
+
+    @classmethod
+    def _use_file_database(cls, connection):
+        # Every thread's connection is built from this settings dict
+        settings_dict = connection.settings_dict
+        saved = settings_dict['NAME'], settings_dict.get('OPTIONS', {})
+        connection.ensure_connection()
+        memory = connection.connection
+        fd, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        target = sqlite3.connect(path)
+        memory.backup(target)
+        target.close()
+
+        settings_dict['NAME'] = path
+        settings_dict['OPTIONS'] = {**saved[1], 'timeout': cls.busy_timeout}
+        # The in-memory database lives as long as a connection to it is open
+        connection.connection = None
+
+        def restore():
+            connection.close()
+            settings_dict['NAME'], settings_dict['OPTIONS'] = saved
+            connection.connection = memory
+            os.remove(path)
+
+        cls.addClassCleanup(restore)
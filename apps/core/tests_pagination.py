@@ -0,0 +1,125 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from apps.accounts.models import User
+from apps.catalog.models import Category, Product, ProductListing
+from apps.core.pagination import CursorPaginator
+from apps.orders.models import Order
+
+
+class CursorPaginatorTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name="Laptops", slug="laptops")
+        now = timezone.now()
+        for index in range(7):
+            product = Product.objects.create(name=f"P{index}", slug=f"p{index}", category=category)
+            # Pairs of products share a timestamp so the id tie-breaker matters
+            Product.objects.filter(pk=product.pk).update(created_at=now - timedelta(hours=index // 2))
+            ProductListing.objects.update_or_create(
+                product=product, defaults={'price': None if index % 3 == 0 else Decimal(100 - index % 4)}
+            )
+
+    def walk(self, ordering, per_page=3):
+        """Follow next cursors to the end, then previous cursors back to the start."""
+        paginator = CursorPaginator(Product.objects.all(), ordering, per_page)
+        pages, page = [], paginator.get_page()
+        self.assertFalse(page.has_previous())
+        while True:
+            pages.append([p.pk for p in page])
+            if not page.has_next():
+                break
+            page = paginator.get_page(page.next_cursor)
+        backwards = [pages[-1]]
+        while page.has_previous():
+            page = paginator.get_page(page.previous_cursor)
+            backwards.insert(0, [p.pk for p in page])
+        self.assertEqual(backwards, pages)
+        return [pk for chunk in pages for pk in chunk]
+
+    def test_pages_follow_the_ordering(self):
+        for ordering, expected in (
+            (('-created_at', '-id'), Product.objects.order_by('-created_at', '-id')),
+            (('name',), Product.objects.order_by('name', 'pk')),
+        ):
+            self.assertEqual(self.walk(ordering), [p.pk for p in expected])
+
+    def test_nullable_related_keys_sort_last(self):
+        for ordering in (('listing__price', 'id'), ('-listing__price', '-id')):
+            ids = self.walk(ordering, per_page=2)
+            prices = dict(ProductListing.objects.values_list('product_id', 'price'))
+            self.assertEqual(len(ids), 7)
+            self.assertEqual([prices[pk] for pk in ids[-3:]], [None, None, None])
+            priced = [prices[pk] for pk in ids[:-3]]
+            self.assertEqual(priced, sorted(priced, reverse=ordering[0].startswith('-')))
+
+    def test_invalid_cursor_gives_first_page(self):
+        paginator = CursorPaginator(Product.objects.all(), ('-created_at',), 3)
+        first = [p.pk for p in paginator.get_page()]
+        self.assertEqual([p.pk for p in paginator.get_page('not-a-cursor')], first)
+
+    def test_no_count_or_offset(self):
+        paginator = CursorPaginator(Product.objects.all(), ('-created_at', '-id'), 3)
+        cursor = paginator.get_page().next_cursor
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(len(paginator.get_page(cursor)), 3)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        sql = ctx.captured_queries[0]['sql'].upper()
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('OFFSET', sql)
+
+
+class CursorPaginationViewTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+
+    @override_settings(CATALOG_CURSOR_PAGINATION=True)
+    def test_catalog_grid_links_next_page(self):
+        category = Category.objects.create(name="Laptops", slug="laptops")
+        for index in range(15):
+            Product.objects.create(name=f"P{index}", slug=f"p{index}", category=category)
+        response = self.client.get(reverse('catalog:product_list'), {'sort': 'name'})
+        self.assertEqual(len(response.context['products']), 12)
+        next_url = response.context['next_page_url']
+        self.assertIn('sort=name', next_url)
+        self.assertContains(response, 'id="infinite-scroll-sentinel"')
+
+        response = self.client.get(next_url, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual([p.name for p in response.context['products']], ['P7', 'P8', 'P9'])
+        self.assertIsNone(response.context['next_page_url'])
+
+    @override_settings(DASHBOARD_CURSOR_PAGINATION=True)
+    def test_dashboard_order_list_next_and_previous(self):
+        staff = User.objects.create_user(email='staff@example.com', password='pass', is_staff=True)
+        self.client.force_login(staff)
+        orders = [Order.objects.create(guest_email=f'{i}@example.com') for i in range(25)]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('dashboard:order_list'))
+        self.assertFalse(any('COUNT(*)' in q['sql'] and 'FROM "orders_order"' in q['sql'] for q in ctx.captured_queries))
+        page = response.context['orders']
+        self.assertEqual(len(page), 20)
+        self.assertFalse(page.has_previous())
+
+        response = self.client.get(page.next_link)
+        page = response.context['orders']
+        self.assertEqual({o.pk for o in page}, {o.pk for o in orders[:5]})
+        self.assertFalse(page.has_next())
+        self.assertEqual(len(self.client.get(page.previous_link).context['orders']), 20)
+
+    def test_dashboard_order_list_numbered_by_default(self):
+        staff = User.objects.create_user(email='staff@example.com', password='pass', is_staff=True)
+        self.client.force_login(staff)
+        for i in range(25):
+            Order.objects.create(guest_email=f'{i}@example.com', status='pending')
+        response = self.client.get(reverse('dashboard:order_list'), {'status': 'pending'})
+        page = response.context['orders']
+        self.assertFalse(response.context['cursor_pagination'])
+        self.assertEqual(page.paginator.count, 25)
+        self.assertIn('status=pending', page.next_link)
+        self.assertContains(response, 'of total 25 transactions')
+
+        page = self.client.get(page.next_link).context['orders']
+        self.assertEqual((page.number, len(page)), (2, 5))
@@ -0,0 +1,67 @@
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from apps.catalog.context_processors import catalog_context
+from apps.catalog.models import Category
+from apps.cms.models import FooterLink, FooterSection, SiteSettings
+from . import site_cache
+from .context_processors import get_footer_sections, site_settings
+
+
+class SiteContextCacheTests(TestCase):
+    """Site-wide context processor data is cached and invalidated by signals."""
+
+    def setUp(self):
+        cache.clear()
+        site_cache.clear_local()
+        self.category = Category.objects.create(name='Laptops', slug='laptops')
+        self.settings = SiteSettings.objects.create(site_name='Acme Store')
+
+    def test_warm_layout_renders_without_queries(self):
+        url = reverse('core:terms')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertContains(response, 'Acme Store')
+        self.assertContains(response, 'Laptops')
+
+    def test_unused_context_values_are_never_loaded(self):
+        request = RequestFactory().get('/')
+        with self.assertNumQueries(0):
+            site_settings(request)
+            catalog_context(request)
+
+    def test_site_settings_change_invalidates(self):
+        url = reverse('core:terms')
+        self.client.get(url)
+        self.settings.site_name = 'Renamed Store'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.settings.save()
+        self.assertContains(self.client.get(url), 'Renamed Store')
+
+    def test_category_change_invalidates_navigation(self):
+        url = reverse('core:terms')
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name='Monitors', slug='monitors')
+        self.assertContains(self.client.get(url), 'Monitors')
+
+    def test_footer_change_invalidates(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            section = FooterSection.objects.create(title='Help')
+        self.assertEqual([s.active_links for s in get_footer_sections()], [[]])
+        with self.captureOnCommitCallbacks(execute=True):
+            link = FooterLink.objects.create(section=section, title='FAQ', url='/faq/')
+        self.assertEqual([s.active_links for s in get_footer_sections()], [[link]])
+        with self.captureOnCommitCallbacks(execute=True):
+            section.delete()
+        self.assertEqual(get_footer_sections(), [])
+
+    def test_invalidation_waits_for_commit(self):
+        version = site_cache.get_version('site')
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.settings.save()
+            self.assertEqual(cache.get(site_cache._version_key('site')), version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(cache.get(site_cache._version_key('site')), version)
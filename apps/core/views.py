@@ -12,7 +12,7 @@ def home(request):
     featured_products = Product.objects.filter(
         is_active=True,
         is_featured=True
-    ).prefetch_related('images', 'variants__price').order_by('-created_at')[:8]
+    ).select_related('listing').order_by('-created_at')[:8]
     
     # Get active categories
     categories = Category.objects.filter(
@@ -32,7 +32,7 @@ def home(request):
     # Get some deal products (products with sale prices - placeholder for now, just get active products)
     deal_products = Product.objects.filter(
         is_active=True
-    ).prefetch_related('images', 'variants__price').order_by('?')[:4]
+    ).select_related('listing').order_by('?')[:4]
     
     context = {
         'featured_products': featured_products,
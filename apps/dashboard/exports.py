@@ -0,0 +1,284 @@
+"""
+Dashboard exports.
+
+Orders, customers and payments export with the filters of their list page.
+Rows are produced from queryset.iterator(chunk_size=DASHBOARD_EXPORT_CHUNK_SIZE)
+(order lines are prefetched per chunk), so memory stays flat however many
+rows there are. An order becomes one row per line, with the order columns
+and the shipping address fields repeated.
+
+CSV is streamed straight to the response. XLSX is written with openpyxl's
+write-only workbook (an optional dependency) to a temporary file first,
+because the format is a zip archive. Large exports can instead run as an
+ExportJob: DASHBOARD_EXPORT_QUEUE picks a Celery task ('celery'), a
+background thread ('thread') or the request itself ('sync'), and the job
+records its progress while it writes the file under MEDIA_ROOT.
+"""
+import csv
+import logging
+import os
+import tempfile
+import threading
+import uuid
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, Q
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from apps.accounts.models import User
+from apps.orders.models import Order, OrderItem
+from apps.payments.models import PaymentTransaction
+from .models import ExportJob
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('csv', 'xlsx')
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+# shipping_address keys exported as columns, in order
+ADDRESS_FIELDS = ['full_name', 'phone', 'address_line1', 'address_line2', 'area', 'city', 'postal_code', 'country']
+
+
+class ExportUnavailable(Exception):
+    """The requested format can't be produced here (e.g. openpyxl is not installed)."""
+
+
+def get_chunk_size():
+    return getattr(settings, 'DASHBOARD_EXPORT_CHUNK_SIZE', 2000)
+
+
+# ---- Querysets (shared with the list views) ----
+
+def filter_orders(params):
+    """Orders matching the order list filters (`params` is request.GET or a dict)."""
+    orders = Order.objects.all().order_by('-created_at')
+    if params.get('status'):
+        orders = orders.filter(status=params['status'])
+    if params.get('payment_status'):
+        orders = orders.filter(payment_status=params['payment_status'])
+    if params.get('search'):
+        search = params['search']
+        orders = orders.filter(
+            Q(order_number__icontains=search) | Q(payment_transaction_id__icontains=search) | Q(guest_email__icontains=search)
+        )
+    return orders
+
+
+def filter_customers(params):
+    """Customers matching the customer list filters."""
+    customers = User.objects.filter(is_staff=False).order_by('-date_joined')
+    if params.get('search'):
+        search = params['search']
+        customers = customers.filter(
+            Q(email__icontains=search) | Q(phone__icontains=search) | Q(profile__full_name__icontains=search)
+        )
+    return customers
+
+
+def filter_payments(params):
+    """Payment transactions matching the payment list filters."""
+    transactions = PaymentTransaction.objects.select_related('order').order_by('-created_at')
+    if params.get('status'):
+        transactions = transactions.filter(status=params['status'])
+    if params.get('search'):
+        search = params['search']
+        transactions = transactions.filter(
+            Q(transaction_id__icontains=search) | Q(provider_reference__icontains=search) | Q(order__order_number__icontains=search)
+        )
+    return transactions
+
+
+# ---- Rows ----
+
+def _datetime(value):
+    return timezone.localtime(value).strftime('%Y-%m-%d %H:%M') if value else ''
+
+
+def order_rows(orders):
+    yield [
+        'Order number', 'Placed at', 'Status', 'Payment status', 'Payment method', 'Transaction ID',
+        'Email', 'Phone', *[f'Ship {field.replace("_", " ")}' for field in ADDRESS_FIELDS], 'Shipping method',
+        'Subtotal', 'Shipping', 'Tax', 'Discount', 'Total', 'Promo code',
+        'SKU', 'Product', 'Variant', 'Quantity', 'Unit price', 'Line total',
+    ]
+    orders = orders.select_related('user').prefetch_related('items')
+    for order in orders.iterator(chunk_size=get_chunk_size()):
+        address = order.shipping_address or {}
+        columns = [
+            order.order_number, _datetime(order.created_at), order.status, order.payment_status,
+            order.payment_method, order.payment_transaction_id,
+            order.get_email(), order.guest_phone or address.get('phone', ''),
+            *[address.get(field, '') for field in ADDRESS_FIELDS], order.shipping_method_name,
+            order.subtotal, order.shipping_cost, order.tax_amount, order.discount_amount, order.total, order.promo_code,
+        ]
+        lines = order.items.all() or [None]
+        for item in lines:
+            if item is None:
+                yield columns + [''] * 6
+            else:
+                yield columns + [item.sku, item.product_name, item.variant_name, item.quantity, item.unit_price, item.total_price]
+
+
+def customer_rows(customers):
+    yield ['Email', 'Name', 'Phone', 'Email verified', 'Active', 'Joined', 'Last login', 'Orders']
+    customers = customers.select_related('profile').annotate(order_count=Count('orders'))
+    for customer in customers.iterator(chunk_size=get_chunk_size()):
+        profile = getattr(customer, 'profile', None)
+        yield [
+            customer.email, profile.full_name if profile else '', customer.phone or '',
+            'yes' if customer.is_verified_email else 'no', 'yes' if customer.is_active else 'no',
+            _datetime(customer.date_joined), _datetime(customer.last_login), customer.order_count,
+        ]
+
+
+def payment_rows(transactions):
+    yield ['Transaction ID', 'Order number', 'Created at', 'Method', 'Status', 'Amount', 'Currency', 'Provider reference']
+    for pmt_transaction in transactions.iterator(chunk_size=get_chunk_size()):
+        yield [
+            pmt_transaction.transaction_id, pmt_transaction.order.order_number, _datetime(pmt_transaction.created_at),
+            pmt_transaction.payment_method, pmt_transaction.status, pmt_transaction.amount,
+            pmt_transaction.currency, pmt_transaction.provider_reference,
+        ]
+
+
+# Export kind: (queryset for the list filters, row generator)
+EXPORTS = {
+    'orders': (filter_orders, order_rows),
+    'customers': (filter_customers, customer_rows),
+    'payments': (filter_payments, payment_rows),
+}
+
+
+def _cell(value):
+    # Keep spreadsheet programs from evaluating user-entered text as a formula
+    if isinstance(value, str) and value[:1] in ('=', '+', '-', '@'):
+        return "'" + value
+    return value
+
+
+def get_rows(kind, params):
+    """Header and data rows of an export."""
+    filter_queryset, rows = EXPORTS[kind]
+    return ([_cell(value) for value in row] for row in rows(filter_queryset(params)))
+
+
+class _Echo:
+    """A file-like object that hands back what is written (for csv.writer)."""
+
+    def write(self, value):
+        return value
+
+
+def _write_xlsx(rows, path, title):
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ExportUnavailable('XLSX export needs openpyxl installed.')
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+
+
+def _filename(kind, fmt):
+    return f"{kind}-{timezone.localtime().strftime('%Y%m%d-%H%M')}.{fmt}"
+
+
+def export_response(kind, fmt, params):
+    """Download response for an export, streamed for CSV."""
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        response = StreamingHttpResponse(
+            (writer.writerow(row) for row in get_rows(kind, params)), content_type=CONTENT_TYPES['csv']
+        )
+        response['Content-Disposition'] = f'attachment; filename="{_filename(kind, fmt)}"'
+        return response
+
+    # The temporary file is removed when the response closes it
+    output = tempfile.TemporaryFile()
+    _write_xlsx(get_rows(kind, params), output, kind)
+    output.seek(0)
+    return FileResponse(output, as_attachment=True, filename=_filename(kind, fmt), content_type=CONTENT_TYPES['xlsx'])
+
+
+# ---- Background jobs ----
+
+def start_job(kind, fmt, params, user=None):
+    """Create an export job for `kind` with the filters in `params` and hand it to a worker."""
+    filter_keys = ('status', 'payment_status', 'search')
+    job = ExportJob.objects.create(
+        kind=kind,
+        format=fmt,
+        filters={key: params.get(key) for key in filter_keys if params.get(key)},
+        created_by=user,
+    )
+    transaction.on_commit(lambda: dispatch_job(job.pk))
+    return job
+
+
+def dispatch_job(job_id):
+    """Hand a job to the configured worker."""
+    queue = getattr(settings, 'DASHBOARD_EXPORT_QUEUE', 'thread')
+    if queue == 'celery':
+        from .tasks import run_export_job
+        run_export_job.delay(job_id)
+    elif queue == 'sync':
+        run_job(job_id)
+    else:
+        threading.Thread(target=_run_in_thread, args=(job_id,), daemon=True).start()
+
+
+def _run_in_thread(job_id):
+    close_old_connections()
+    try:
+        run_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def _counted(rows, job):
+    """Pass rows through, recording progress on the job every chunk."""
+    chunk_size = get_chunk_size()
+    processed = 0
+    for processed, row in enumerate(rows):
+        # The first row is the header
+        if processed and processed % chunk_size == 0:
+            ExportJob.objects.filter(pk=job.pk).update(processed=processed)
+        yield row
+    job.processed = processed
+
+
+def run_job(job_id):
+    """Write the job's export under MEDIA_ROOT/exports/, recording progress as it goes."""
+    job = ExportJob.objects.get(pk=job_id)
+    filter_queryset, rows = EXPORTS[job.kind]
+    queryset = filter_queryset(job.filters)
+    job.status = 'running'
+    # Orders export a row per line
+    job.total = OrderItem.objects.filter(order__in=queryset.values('pk')).count() if job.kind == 'orders' else queryset.count()
+    job.save(update_fields=['status', 'total'])
+
+    name = f'exports/{job.kind}-{uuid.uuid4().hex}.{job.format}'
+    path = os.path.join(settings.MEDIA_ROOT, name)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = _counted(get_rows(job.kind, job.filters), job)
+        if job.format == 'xlsx':
+            _write_xlsx(data, path, job.kind)
+        else:
+            with open(path, 'w', newline='', encoding='utf-8') as output:
+                csv.writer(output).writerows(data)
+        job.file.name = name
+        job.status = 'done'
+    except Exception as e:
+        logger.exception(f"Export job {job.pk} failed")
+        if os.path.exists(path):
+            os.remove(path)
+        job.status = 'failed'
+        job.error_message = str(e)
+    job.finished_at = timezone.now()
+    job.save(update_fields=['file', 'status', 'processed', 'error_message', 'finished_at'])
+    return job
@@ -132,7 +132,8 @@ class ProductVariantForm(forms.ModelForm):
         # Pre-populate price fields if editing
         if instance and hasattr(instance, 'price'):
             initial['list_price'] = instance.price.list_price
-            initial['sale_price'] = instance.price.sale_price
+            # While a price schedule is in effect, the form edits the regular sale price
+            initial['sale_price'] = instance.price.base_sale_price if instance.price.schedule_id else instance.price.sale_price
             initial['cost_price'] = instance.price.cost_price
         
         # Pre-populate inventory fields if editing
@@ -160,6 +161,8 @@ class ProductVariantForm(forms.ModelForm):
             }
             
             if hasattr(variant, 'price'):
+                if variant.price.schedule_id:
+                    price_data['base_sale_price'] = price_data.pop('sale_price')
                 for key, value in price_data.items():
                     setattr(variant.price, key, value)
                 variant.price.save()
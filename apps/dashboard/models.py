@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.db import models
+
+
+class ExportJob(models.Model):
+    """A dashboard export written to MEDIA_ROOT in the background (see apps.dashboard.exports)."""
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    kind = models.CharField('kind', max_length=20) # 'orders', 'customers', 'payments'
+    format = models.CharField('format', max_length=10, default='csv') # 'csv', 'xlsx'
+    filters = models.JSONField('filters', default=dict, blank=True)
+    status = models.CharField('status', max_length=20, choices=STATUS_CHOICES, default='pending')
+    total = models.PositiveIntegerField('total rows', default=0)
+    processed = models.PositiveIntegerField('processed rows', default=0)
+    file = models.FileField('file', upload_to='exports/', blank=True)
+    error_message = models.TextField('error message', blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='export_jobs',
+        verbose_name='created by'
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField('finished at', null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'export job'
+        verbose_name_plural = 'export jobs'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.kind} export #{self.pk} ({self.status})"
+    
+    @property
+    def progress(self):
+        """Percentage of rows written."""
+        if self.status == 'done':
+            return 100
+        return min(int(self.processed * 100 / self.total), 99) if self.total else 0
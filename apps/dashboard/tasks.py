@@ -0,0 +1,7 @@
+from celery import shared_task
+from .exports import run_job
+
+
+@shared_task(ignore_result=True)
+def run_export_job(job_id):
+    run_job(job_id)
@@ -0,0 +1,97 @@
+import csv
+import io
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from importlib.util import find_spec
+from unittest import skipIf, skipUnless
+from django.core.cache import cache
+from django.http import StreamingHttpResponse
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from apps.accounts.models import User
+from apps.orders.models import Order, OrderItem
+from apps.payments.models import PaymentTransaction
+from .models import ExportJob
+
+HAS_OPENPYXL = find_spec('openpyxl') is not None
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        staff = User.objects.create_user(email='staff@example.com', password='pass', is_staff=True)
+        self.client.force_login(staff)
+        self.customer = User.objects.create_user(email='buyer@example.com', password='pass', phone='=1+2')
+        address = {'full_name': 'Buyer', 'address_line1': 'Road 1', 'city': 'Dhaka', 'postal_code': '1207'}
+        self.paid = Order.objects.create(user=self.customer, status='confirmed', payment_status='paid', shipping_address=address, total=Decimal('140.00'))
+        OrderItem.objects.create(order=self.paid, product_name='Laptop', sku='LAP-1', quantity=1, unit_price=Decimal('100.00'))
+        OrderItem.objects.create(order=self.paid, product_name='Bag', sku='BAG-1', quantity=2, unit_price=Decimal('20.00'))
+        self.pending = Order.objects.create(guest_email='guest@example.com', status='pending', total=Decimal('50.00'))
+        OrderItem.objects.create(order=self.pending, product_name='Phone', sku='PHN-1', quantity=1, unit_price=Decimal('50.00'))
+        PaymentTransaction.objects.create(transaction_id='TRAN-1', order=self.paid, amount=Decimal('140.00'), payment_method='sslcommerz', status='success')
+
+    def export(self, kind, **params):
+        response = self.client.get(reverse('dashboard:export', args=[kind]), params)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        return list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+    def test_orders_are_flattened_per_line_with_filters(self):
+        rows = self.export('orders', status='confirmed')
+        self.assertEqual([row['SKU'] for row in rows], ['LAP-1', 'BAG-1'])
+        self.assertEqual({row['Order number'] for row in rows}, {self.paid.order_number})
+        self.assertEqual((rows[1]['Ship city'], rows[1]['Ship postal code'], rows[1]['Line total']), ('Dhaka', '1207', '40.00'))
+        self.assertEqual(rows[0]['Email'], 'buyer@example.com')
+        self.assertEqual(len(self.export('orders')), 3)
+
+    def test_customers_and_payments(self):
+        customers = self.export('customers', search='buyer')
+        self.assertEqual([(row['Email'], row['Orders']) for row in customers], [('buyer@example.com', '1')])
+        # Text that a spreadsheet would evaluate is escaped
+        self.assertEqual(customers[0]['Phone'], "'=1+2")
+        payments = self.export('payments', status='success')
+        self.assertEqual([(row['Transaction ID'], row['Order number'], row['Amount']) for row in payments], [('TRAN-1', self.paid.order_number, '140.00')])
+        self.assertEqual(self.export('payments', status='failed'), [])
+
+    def test_list_pages_link_to_filtered_exports(self):
+        response = self.client.get(reverse('dashboard:order_list'), {'status': 'confirmed'})
+        self.assertContains(response, f"{reverse('dashboard:export', args=['orders'])}?status=confirmed&format=csv")
+        self.assertContains(self.client.get(reverse('dashboard:customer_list')), reverse('dashboard:export', args=['customers']))
+        self.assertContains(self.client.get(reverse('dashboard:payment_list')), reverse('dashboard:export', args=['payments']))
+
+    def test_unknown_kind_or_format(self):
+        self.assertEqual(self.client.get(reverse('dashboard:export', args=['products'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('dashboard:export', args=['orders']), {'format': 'pdf'}).status_code, 404)
+
+    def test_background_export_writes_to_media_root(self):
+        with override_settings(DASHBOARD_EXPORT_QUEUE='sync', DASHBOARD_EXPORT_CHUNK_SIZE=1, MEDIA_ROOT=self.media_root), \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.get(reverse('dashboard:export', args=['orders']), {'payment_status': 'paid', 'background': '1'})
+        job = ExportJob.objects.get()
+        self.assertRedirects(response, reverse('dashboard:export_job', args=[job.pk]), fetch_redirect_response=False)
+        self.assertEqual((job.status, job.filters, job.processed, job.total, job.progress), ('done', {'payment_status': 'paid'}, 2, 2, 100))
+        self.assertTrue(job.file.name.startswith('exports/orders-'))
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, job.file.name)))
+
+        self.assertContains(self.client.get(reverse('dashboard:export_job', args=[job.pk])), reverse('dashboard:export_download', args=[job.pk]))
+        progress = self.client.get(reverse('dashboard:export_job', args=[job.pk]), {'format': 'json'}).json()
+        self.assertEqual(progress, {'status': 'done', 'progress': 100, 'processed': 2, 'total': 2})
+        with override_settings(MEDIA_ROOT=self.media_root):
+            download = self.client.get(reverse('dashboard:export_download', args=[job.pk]))
+            rows = list(csv.DictReader(io.StringIO(b''.join(download.streaming_content).decode())))
+        self.assertEqual([row['SKU'] for row in rows], ['LAP-1', 'BAG-1'])
+
+    @skipUnless(HAS_OPENPYXL, 'openpyxl is not installed')
+    def test_xlsx(self):
+        from openpyxl import load_workbook
+        response = self.client.get(reverse('dashboard:export', args=['payments']), {'format': 'xlsx'})
+        sheet = load_workbook(io.BytesIO(b''.join(response.streaming_content))).active
+        self.assertEqual([cell.value for cell in sheet[2]][:2], ['TRAN-1', self.paid.order_number])
+
+    @skipIf(HAS_OPENPYXL, 'openpyxl is installed')
+    def test_xlsx_without_openpyxl(self):
+        response = self.client.get(reverse('dashboard:export', args=['payments']), {'format': 'xlsx'})
+        self.assertRedirects(response, reverse('dashboard:payment_list'), fetch_redirect_response=False)
@@ -6,6 +6,11 @@ app_name = 'dashboard'
 urlpatterns = [
     path('', views.dashboard_home, name='home'),
     
+    # Exports
+    path('exports/<str:kind>/', views.export, name='export'),
+    path('exports/jobs/<int:pk>/', views.export_job, name='export_job'),
+    path('exports/jobs/<int:pk>/download/', views.export_download, name='export_download'),
+    
     # Orders
     path('orders/', views.order_list, name='order_list'),
     path('orders/<str:order_number>/', views.order_detail, name='order_detail'),
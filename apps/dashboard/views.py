@@ -1,14 +1,21 @@
+from django.http import FileResponse, Http404, JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.admin.views.decorators import staff_member_required
+from django.conf import settings
 from django.contrib import messages
-from django.db.models import Sum, Count, Q
-from django.core.paginator import Paginator
-from apps.orders.models import Order, OrderStatusHistory
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+from apps.checkout.reservations import release_for_order
+from apps.promotions.engine import release_for_order as release_promotions
+from apps.core.pagination import paginate_by_cursor, paginate_by_page
+from apps.orders.models import DailyCategorySales, DailySales, Order, OrderStatusHistory
 from apps.catalog.models import Category, Brand, Product, ProductImage
 from apps.accounts.models import User
 from django.utils import timezone
 from datetime import timedelta
+from .exports import EXPORTS, FORMATS, ExportUnavailable, export_response, filter_customers, filter_orders, filter_payments, start_job
 from .forms import CategoryForm, BrandForm, ProductForm, ProductImageForm
+from .models import ExportJob
 
 
 @staff_member_required
@@ -16,8 +23,10 @@ def dashboard_home(request):
     """Staff dashboard home - overview of store stats with chart data."""
     today = timezone.now().date()
     
-    total_orders = Order.objects.count()
-    total_revenue = Order.objects.filter(payment_status='paid').aggregate(Sum('total'))['total__sum'] or 0
+    # Order totals come from the daily rollups (apps.orders.rollups), not from scanning orders
+    sales = DailySales.objects.aggregate(orders=Sum('placed_orders'), revenue=Sum('revenue'))
+    total_orders = sales['orders'] or 0
+    total_revenue = sales['revenue'] or 0
     total_customers = User.objects.filter(is_staff=False).count()
     total_products = Product.objects.count()
     
@@ -26,30 +35,29 @@ def dashboard_home(request):
     # --- Analytics Data for Charts ---
     # 1. Monthly Sales (Last 6 months)
     six_months_ago = today - timedelta(days=180)
-    monthly_sales = Order.objects.filter(
-        payment_status='paid',
-        created_at__date__gte=six_months_ago
-    ).extra(select={'month': "strftime('%%Y-%%m', created_at)"}).values('month').annotate(
-        revenue=Sum('total')
-    ).order_by('month')
+    monthly_sales = DailySales.objects.filter(day__gte=six_months_ago).annotate(
+        month=TruncMonth('day')
+    ).values('month').annotate(revenue=Sum('revenue')).order_by('month')
 
     # Convert to JSON serializable list for JS
-    sales_labels = [s['month'] for s in monthly_sales]
+    sales_labels = [s['month'].strftime('%Y-%m') for s in monthly_sales]
     sales_data = [float(s['revenue']) for s in monthly_sales]
 
     # 2. Category Distribution (Revenue by Category)
-    from apps.catalog.models import Category
     category_data = []
     category_labels = []
+    category_summary = []
     
     # Get top 5 categories by revenue
-    top_categories = Category.objects.annotate(
-        revenue=Sum('products__variants__order_items__order__total', filter=Q(products__variants__order_items__order__payment_status='paid'))
+    top_categories = DailyCategorySales.objects.values('category__name').annotate(
+        revenue=Sum('revenue')
     ).filter(revenue__gt=0).order_by('-revenue')[:5]
 
     for cat in top_categories:
-        category_labels.append(cat.name)
-        category_data.append(float(cat.revenue))
+        category_labels.append(cat['category__name'])
+        category_data.append(float(cat['revenue']))
+        if total_revenue:
+            category_summary.append((cat['category__name'], round(cat['revenue'] * 100 / total_revenue)))
     
     context = {
         'total_orders': total_orders,
@@ -61,32 +69,87 @@ def dashboard_home(request):
         'sales_data': sales_data,
         'category_labels': category_labels,
         'category_data': category_data,
+        'category_summary': category_summary,
         'title': 'Staff Dashboard Overview',
     }
     return render(request, 'dashboard/index.html', context)
 
 
+# ==================== EXPORTS ====================
+
+# Export kind: the list page it exports
+EXPORT_LISTS = {
+    'orders': 'order_list',
+    'customers': 'customer_list',
+    'payments': 'payment_list',
+}
+
+
+@staff_member_required
+def export(request, kind):
+    """Export orders, customers or payments with the list page's filters, as a download or a background job."""
+    fmt = request.GET.get('format', 'csv')
+    if kind not in EXPORTS or fmt not in FORMATS:
+        raise Http404
+    
+    if request.GET.get('background'):
+        job = start_job(kind, fmt, request.GET, user=request.user)
+        messages.success(request, f'Your {kind} export has started.')
+        return redirect('dashboard:export_job', pk=job.pk)
+    
+    try:
+        return export_response(kind, fmt, request.GET)
+    except ExportUnavailable as e:
+        messages.error(request, str(e))
+        return redirect(f'dashboard:{EXPORT_LISTS[kind]}')
+
+
+@staff_member_required
+def export_job(request, pk):
+    """Progress of a background export, with its download once done."""
+    job = get_object_or_404(ExportJob, pk=pk)
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'status': job.status, 'progress': job.progress, 'processed': job.processed, 'total': job.total})
+    
+    context = {
+        'job': job,
+        'title': f'{job.kind.title()} Export',
+    }
+    return render(request, 'dashboard/exports/export_job.html', context)
+
+
+@staff_member_required
+def export_download(request, pk):
+    """Download a finished background export (served here, not from MEDIA_URL, to keep it staff-only)."""
+    job = get_object_or_404(ExportJob, pk=pk, status='done')
+    return FileResponse(job.file.open('rb'), as_attachment=True, filename=f'{job.kind}-{job.pk}.{job.format}')
+
+
 # ==================== ORDER MANAGEMENT ====================
 
+def paginate_list(request, queryset, ordering, per_page=20):
+    """
+    Return (page, cursor_pagination) for a list view. Cursor pages are used
+    with DASHBOARD_CURSOR_PAGINATION or when following a ?cursor= link; they
+    skip the COUNT(*) but have no page numbers or total.
+    """
+    if getattr(settings, 'DASHBOARD_CURSOR_PAGINATION', False) or 'cursor' in request.GET:
+        return paginate_by_cursor(request, queryset, ordering, per_page), True
+    return paginate_by_page(request, queryset, ordering, per_page), False
+
+
 @staff_member_required
 def order_list(request):
     """List all orders with filtering."""
-    orders = Order.objects.all().order_by('-created_at')
-    
+    orders = filter_orders(request.GET)
     status = request.GET.get('status')
-    if status:
-        orders = orders.filter(status=status)
-    
     payment_status = request.GET.get('payment_status')
-    if payment_status:
-        orders = orders.filter(payment_status=payment_status)
     
-    paginator = Paginator(orders, 20)
-    page = request.GET.get('page')
-    orders = paginator.get_page(page)
+    orders, cursor_pagination = paginate_list(request, orders, ('-created_at', '-id'))
     
     context = {
         'orders': orders,
+        'cursor_pagination': cursor_pagination,
         'title': 'Order Management',
         'status_choices': Order.ORDER_STATUS_CHOICES,
         'payment_status_choices': Order.PAYMENT_STATUS_CHOICES,
@@ -109,6 +172,9 @@ def order_detail(request, order_number):
             old_status = order.status
             order.status = new_status
             order.save()
+            if new_status == 'cancelled':
+                release_for_order(order)
+                release_promotions(order)
             
             OrderStatusHistory.objects.create(
                 order=order,
@@ -291,12 +357,11 @@ def product_list(request):
     if is_featured == '1':
         products = products.filter(is_featured=True)
     
-    paginator = Paginator(products, 20)
-    page = request.GET.get('page')
-    products = paginator.get_page(page)
+    products, cursor_pagination = paginate_list(request, products, ('-created_at', '-id'))
     
     context = {
         'products': products,
+        'cursor_pagination': cursor_pagination,
         'title': 'Product Management',
         'current_is_active': is_active,
         'current_is_featured': is_featured,
@@ -474,14 +539,13 @@ def variant_delete(request, pk, variant_pk):
 @staff_member_required
 def customer_list(request):
     """List all customers."""
-    customers = User.objects.filter(is_staff=False).order_by('-date_joined')
+    customers = filter_customers(request.GET)
     
-    paginator = Paginator(customers, 20)
-    page = request.GET.get('page')
-    customers = paginator.get_page(page)
+    customers, cursor_pagination = paginate_list(request, customers, ('-date_joined', '-id'))
     
     context = {
         'customers': customers,
+        'cursor_pagination': cursor_pagination,
         'title': 'Customer Management',
     }
     return render(request, 'dashboard/customers/customer_list.html', context)
@@ -707,20 +771,19 @@ def shipping_method_delete(request, pk):
 
 
 # ==================== PAYMENT METHOD MANAGEMENT ====================
-from apps.payments.models import PaymentMethod, PaymentTransaction
+from apps.payments.models import PaymentMethod
 from .forms import PaymentMethodForm
 
 @staff_member_required
 def payment_list(request):
     """List all payment transactions."""
-    transactions = PaymentTransaction.objects.select_related('order').order_by('-created_at')
+    transactions = filter_payments(request.GET)
     
-    paginator = Paginator(transactions, 20)
-    page = request.GET.get('page')
-    transactions = paginator.get_page(page)
+    transactions, cursor_pagination = paginate_list(request, transactions, ('-created_at', '-id'))
     
     context = {
         'transactions': transactions,
+        'cursor_pagination': cursor_pagination,
         'title': 'Payments',
     }
     return render(request, 'dashboard/payments/payment_list.html', context)
@@ -0,0 +1,34 @@
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from apps.orders.models import Order
+from apps.orders.rollups import refresh_days
+
+# Days recomputed per batch
+CHUNK_DAYS = 31
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily sales rollups read by the staff dashboard (all days by default).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='First day to rebuild (YYYY-MM-DD).')
+        parser.add_argument('--days', type=int, help='Rebuild only the last this many days.')
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        if options['since']:
+            try:
+                start = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError(f"Invalid date: {options['since']}")
+        elif options['days']:
+            start = today - timedelta(days=options['days'] - 1)
+        else:
+            first = Order.objects.order_by('created_at').values_list('created_at', flat=True).first()
+            start = timezone.localdate(first) if first else today
+        
+        days = [start + timedelta(days=n) for n in range((today - start).days + 1)]
+        for i in range(0, len(days), CHUNK_DAYS):
+            refresh_days(days[i:i + CHUNK_DAYS])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt sales rollups for {len(days)} days from {start}.'))
@@ -0,0 +1,135 @@
+# Generated by Django 5.0.14 on 2026-10-17 00:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollups(apps, schema_editor):
+    """Roll up the existing orders, as apps.orders.rollups.refresh_days() does for a day."""
+    Order = apps.get_model('orders', 'Order')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    DailySales = apps.get_model('orders', 'DailySales')
+    DailyPaymentMethodSales = apps.get_model('orders', 'DailyPaymentMethodSales')
+    DailyCategorySales = apps.get_model('orders', 'DailyCategorySales')
+    DailyBrandSales = apps.get_model('orders', 'DailyBrandSales')
+
+    paid = Order.objects.filter(payment_status='paid')
+    items = OrderItem.objects.filter(order__in=paid)
+    sales = {row['day']: row for row in paid.values(day=TruncDate('created_at')).annotate(orders=Count('pk'), revenue=Sum('total'))}
+    units = {row['day']: row['units'] for row in items.values(day=TruncDate('order__created_at')).annotate(units=Sum('quantity'))}
+    DailySales.objects.bulk_create([
+        DailySales(
+            day=row['day'], placed_orders=row['placed'], orders=sales.get(row['day'], {}).get('orders', 0),
+            units=units.get(row['day']) or 0, revenue=sales.get(row['day'], {}).get('revenue') or 0,
+        )
+        for row in Order.objects.values(day=TruncDate('created_at')).annotate(placed=Count('pk'))
+    ], batch_size=500)
+
+    method_units = {
+        (row['day'], row['payment_method']): row['units']
+        for row in items.values(day=TruncDate('order__created_at'), payment_method=F('order__payment_method')).annotate(units=Sum('quantity'))
+    }
+    DailyPaymentMethodSales.objects.bulk_create([
+        DailyPaymentMethodSales(
+            day=row['day'], payment_method=row['payment_method'], orders=row['orders'], revenue=row['revenue'],
+            units=method_units.get((row['day'], row['payment_method'])) or 0,
+        )
+        for row in paid.values('payment_method', day=TruncDate('created_at')).annotate(orders=Count('pk'), revenue=Sum('total'))
+    ], batch_size=500)
+
+    for model, field, dimension in (
+        (DailyCategorySales, 'category_id', 'variant__product__category'),
+        (DailyBrandSales, 'brand_id', 'variant__product__brand'),
+    ):
+        rows = items.exclude(**{f'{dimension}__isnull': True}).values(
+            day=TruncDate('order__created_at'), key=F(dimension)
+        ).annotate(orders=Count('order_id', distinct=True), units=Sum('quantity'), revenue=Sum('total_price'))
+        model.objects.bulk_create([
+            model(day=row['day'], orders=row['orders'], units=row['units'], revenue=row['revenue'], **{field: row['key']})
+            for row in rows
+        ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0008_listing_price_range'),
+        ('orders', '0003_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orders', models.PositiveIntegerField(default=0, verbose_name='paid orders')),
+                ('units', models.PositiveIntegerField(default=0, verbose_name='units')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='revenue')),
+                ('day', models.DateField(unique=True, verbose_name='day')),
+                ('placed_orders', models.PositiveIntegerField(default=0, verbose_name='placed orders')),
+            ],
+            options={
+                'verbose_name': 'daily sales',
+                'verbose_name_plural': 'daily sales',
+                'ordering': ['day'],
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyPaymentMethodSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='day')),
+                ('orders', models.PositiveIntegerField(default=0, verbose_name='paid orders')),
+                ('units', models.PositiveIntegerField(default=0, verbose_name='units')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='revenue')),
+                ('payment_method', models.CharField(blank=True, max_length=50, verbose_name='payment method')),
+            ],
+            options={
+                'verbose_name': 'daily payment method sales',
+                'verbose_name_plural': 'daily payment method sales',
+                'ordering': ['day'],
+                'abstract': False,
+                'unique_together': {('day', 'payment_method')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyBrandSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='day')),
+                ('orders', models.PositiveIntegerField(default=0, verbose_name='paid orders')),
+                ('units', models.PositiveIntegerField(default=0, verbose_name='units')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='revenue')),
+                ('brand', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='catalog.brand', verbose_name='brand')),
+            ],
+            options={
+                'verbose_name': 'daily brand sales',
+                'verbose_name_plural': 'daily brand sales',
+                'ordering': ['day'],
+                'abstract': False,
+                'unique_together': {('day', 'brand')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyCategorySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='day')),
+                ('orders', models.PositiveIntegerField(default=0, verbose_name='paid orders')),
+                ('units', models.PositiveIntegerField(default=0, verbose_name='units')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='revenue')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='catalog.category', verbose_name='category')),
+            ],
+            options={
+                'verbose_name': 'daily category sales',
+                'verbose_name_plural': 'daily category sales',
+                'ordering': ['day'],
+                'abstract': False,
+                'unique_together': {('day', 'category')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -106,6 +106,7 @@ class Order(models.Model):
             models.Index(fields=['order_number']),
             models.Index(fields=['status']),
             models.Index(fields=['user', 'created_at']),
+            models.Index(fields=['created_at', 'id']),
         ]
     
     def __str__(self):
@@ -214,3 +215,85 @@ class OrderStatusHistory(models.Model):
     
     def __str__(self):
         return f"{self.order.order_number} - {self.status}"
+
+
+class SalesRollup(models.Model):
+    """
+    Paid sales of one day, pre-aggregated for the staff dashboard. Rows are
+    rebuilt by apps.orders.rollups and never edited by hand.
+    """
+    
+    day = models.DateField('day')
+    orders = models.PositiveIntegerField('paid orders', default=0)
+    units = models.PositiveIntegerField('units', default=0)
+    revenue = models.DecimalField('revenue', max_digits=14, decimal_places=2, default=0)
+    
+    class Meta:
+        abstract = True
+        ordering = ['day']
+
+
+class DailySales(SalesRollup):
+    """Store-wide sales of one day; `revenue` is the sum of paid order totals."""
+    
+    day = models.DateField('day', unique=True)
+    placed_orders = models.PositiveIntegerField('placed orders', default=0)
+    
+    class Meta(SalesRollup.Meta):
+        verbose_name = 'daily sales'
+        verbose_name_plural = 'daily sales'
+    
+    def __str__(self):
+        return f"{self.day}: {self.revenue}"
+
+
+class DailyCategorySales(SalesRollup):
+    """Sales of one category on one day; `revenue` is the sum of its paid line totals."""
+    
+    category = models.ForeignKey(
+        'catalog.Category',
+        on_delete=models.CASCADE,
+        related_name='daily_sales',
+        verbose_name='category'
+    )
+    
+    class Meta(SalesRollup.Meta):
+        verbose_name = 'daily category sales'
+        verbose_name_plural = 'daily category sales'
+        unique_together = ('day', 'category')
+    
+    def __str__(self):
+        return f"{self.day} {self.category}: {self.revenue}"
+
+
+class DailyBrandSales(SalesRollup):
+    """Sales of one brand on one day; `revenue` is the sum of its paid line totals."""
+    
+    brand = models.ForeignKey(
+        'catalog.Brand',
+        on_delete=models.CASCADE,
+        related_name='daily_sales',
+        verbose_name='brand'
+    )
+    
+    class Meta(SalesRollup.Meta):
+        verbose_name = 'daily brand sales'
+        verbose_name_plural = 'daily brand sales'
+        unique_together = ('day', 'brand')
+    
+    def __str__(self):
+        return f"{self.day} {self.brand}: {self.revenue}"
+
+
+class DailyPaymentMethodSales(SalesRollup):
+    """Sales paid with one payment method on one day; `revenue` is the sum of paid order totals."""
+    
+    payment_method = models.CharField('payment method', max_length=50, blank=True)
+    
+    class Meta(SalesRollup.Meta):
+        verbose_name = 'daily payment method sales'
+        verbose_name_plural = 'daily payment method sales'
+        unique_together = ('day', 'payment_method')
+    
+    def __str__(self):
+        return f"{self.day} {self.payment_method}: {self.revenue}"
@@ -0,0 +1,186 @@
+"""
+Daily sales rollups.
+
+The staff dashboard reads DailySales and its per category, brand and payment
+method siblings instead of aggregating orders, so it touches one row per day
+rather than every order. refresh_days() recomputes a day's rows from that
+day's orders; saving or deleting an order (or one of its lines) queues a
+refresh of its day once the transaction commits, so the tables follow
+payments, refunds and edits however they happen. The rebuild_sales_rollups
+command backfills or repairs any range.
+
+Refreshes run off the request: ORDERS_ROLLUP_QUEUE picks a Celery task
+('celery'), a background thread ('thread') or the committing request itself
+('sync'). A queued refresh waits ORDERS_ROLLUP_DELAY seconds and covers every
+change to its day until it starts, so a busy day is recomputed a bounded
+number of times rather than once per order line. A queued refresh can be
+lost (a thread's timer dies with its process, and the day's pending marker
+holds back new ones until it expires), so a periodic task also refreshes the
+last ORDERS_ROLLUP_RECENT_DAYS days. A refresh locks the day's
+DailySales row (kept, zeroed, once the day has no orders) before it
+aggregates, so overlapping refreshes of a day run one after the other and
+the last to commit saw every change committed before it.
+
+A day is the date of the order's created_at in the site time zone. Only paid
+orders count as sales (placed_orders counts all of them). Category and
+brand rows add up line totals, so an order with several lines in one
+category is not counted twice; a line belongs to the current category and
+brand of its product, and lines without one are left out of those tables.
+"""
+import logging
+import threading
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import DailyBrandSales, DailyCategorySales, DailyPaymentMethodSales, DailySales, Order, OrderItem
+
+logger = logging.getLogger(__name__)
+
+
+def _orders_on(days):
+    start = timezone.make_aware(datetime.combine(min(days), time.min))
+    end = timezone.make_aware(datetime.combine(max(days) + timedelta(days=1), time.min))
+    return Order.objects.filter(created_at__gte=start, created_at__lt=end, created_at__date__in=days)
+
+
+def _by_day(rows, *keys):
+    return {tuple(row[key] for key in ('day',) + keys): row for row in rows}
+
+
+def _line_rows(items, dimension):
+    """Units, revenue and paid orders per (day, key) of the lines' `dimension`."""
+    return items.exclude(**{f'{dimension}__isnull': True}).values(
+        day=TruncDate('order__created_at'), key=F(dimension)
+    ).annotate(orders=Count('order_id', distinct=True), units=Sum('quantity'), revenue=Sum('total_price'))
+
+
+def _upsert(model, rows, unique_fields):
+    model.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=unique_fields,
+        update_fields=[field.name for field in model._meta.concrete_fields if not field.primary_key and field.name not in unique_fields],
+    )
+
+
+def _replace(model, days, rows, unique_fields):
+    """Swap the model's rows for `days` with `rows`."""
+    model.objects.filter(day__in=days).delete()
+    _upsert(model, rows, unique_fields)
+
+
+def _lock_days(days):
+    """Lock the DailySales rows of `days`, creating the missing ones first."""
+    DailySales.objects.bulk_create([DailySales(day=day) for day in days], ignore_conflicts=True)
+    list(DailySales.objects.select_for_update().filter(day__in=days).order_by('day').values_list('pk', flat=True))
+
+
+def refresh_days(days):
+    """Recompute the rollup rows of `days` (dates). Returns the number of days refreshed."""
+    days = sorted(set(days))
+    if not days:
+        return 0
+    with transaction.atomic():
+        _lock_days(days)
+        _refresh_locked_days(days)
+    return len(days)
+
+
+def _refresh_locked_days(days):
+    orders = _orders_on(days)
+    paid = orders.filter(payment_status='paid')
+    items = OrderItem.objects.filter(order__in=paid)
+
+    placed = _by_day(orders.values(day=TruncDate('created_at')).annotate(placed=Count('pk')))
+    sales = _by_day(paid.values(day=TruncDate('created_at')).annotate(orders=Count('pk'), revenue=Sum('total')))
+    units = _by_day(items.values(day=TruncDate('order__created_at')).annotate(units=Sum('quantity')))
+    method_sales = _by_day(paid.values('payment_method', day=TruncDate('created_at')).annotate(orders=Count('pk'), revenue=Sum('total')), 'payment_method')
+    method_units = _by_day(items.values(day=TruncDate('order__created_at'), payment_method=F('order__payment_method')).annotate(units=Sum('quantity')), 'payment_method')
+
+    daily = [
+        DailySales(
+            day=day,
+            placed_orders=placed.get((day,), {}).get('placed', 0),
+            orders=sales.get((day,), {}).get('orders', 0),
+            units=units.get((day,), {}).get('units') or 0,
+            revenue=sales.get((day,), {}).get('revenue') or 0,
+        )
+        for day in days
+    ]
+    by_method = [
+        DailyPaymentMethodSales(
+            day=day, payment_method=method, orders=row['orders'], revenue=row['revenue'],
+            units=method_units.get((day, method), {}).get('units') or 0,
+        )
+        for (day, method), row in method_sales.items()
+    ]
+    by_category = [
+        DailyCategorySales(day=row['day'], category_id=row['key'], orders=row['orders'], units=row['units'], revenue=row['revenue'])
+        for row in _line_rows(items, 'variant__product__category')
+    ]
+    by_brand = [
+        DailyBrandSales(day=row['day'], brand_id=row['key'], orders=row['orders'], units=row['units'], revenue=row['revenue'])
+        for row in _line_rows(items, 'variant__product__brand')
+    ]
+
+    _upsert(DailySales, daily, ['day'])
+    _replace(DailyPaymentMethodSales, days, by_method, ['day', 'payment_method'])
+    _replace(DailyCategorySales, days, by_category, ['day', 'category'])
+    _replace(DailyBrandSales, days, by_brand, ['day', 'brand'])
+
+
+def _pending_key(day):
+    return f'orders:rollups:pending:{day.isoformat()}'
+
+
+def schedule_rollup_refresh(created_at):
+    """Queue a refresh of the day an order was placed once the surrounding transaction commits."""
+    if created_at:
+        day = timezone.localdate(created_at)
+        transaction.on_commit(lambda: dispatch_refresh(day))
+
+
+def dispatch_refresh(day):
+    """Hand a refresh of `day` to the configured worker, unless one is already waiting."""
+    queue = getattr(settings, 'ORDERS_ROLLUP_QUEUE', 'thread')
+    if queue == 'sync':
+        refresh_days([day])
+        return
+    delay = getattr(settings, 'ORDERS_ROLLUP_DELAY', 10)
+    # The marker expires in case the worker dies before running the refresh
+    if not cache.add(_pending_key(day), True, delay + 60):
+        return
+    if queue == 'celery':
+        from .tasks import refresh_sales_rollups
+        refresh_sales_rollups.apply_async((day.isoformat(),), countdown=delay)
+    else:
+        timer = threading.Timer(delay, _run_in_thread, args=(day,))
+        timer.daemon = True
+        timer.start()
+
+
+def refresh_recent_days():
+    """Refresh the last ORDERS_ROLLUP_RECENT_DAYS days, today included."""
+    today = timezone.localdate()
+    count = getattr(settings, 'ORDERS_ROLLUP_RECENT_DAYS', 2)
+    return refresh_days([today - timedelta(days=offset) for offset in range(count)])
+
+
+def run_refresh(day):
+    """Run a queued refresh; changes committed from here on queue another one."""
+    cache.delete(_pending_key(day))
+    refresh_days([day])
+
+
+def _run_in_thread(day):
+    close_old_connections()
+    try:
+        run_refresh(day)
+    except Exception:
+        logger.exception(f"Sales rollup refresh of {day} failed")
+    finally:
+        close_old_connections()
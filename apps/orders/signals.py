@@ -0,0 +1,16 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Order, OrderItem
+from .rollups import schedule_rollup_refresh
+
+
+@receiver([post_save, post_delete], sender=Order)
+def refresh_rollups_on_order_change(sender, instance, **kwargs):
+    schedule_rollup_refresh(instance.created_at)
+
+
+@receiver([post_save, post_delete], sender=OrderItem)
+def refresh_rollups_on_item_change(sender, instance, **kwargs):
+    # Lines deleted along with their order are covered by the order's receiver
+    created_at = Order.objects.filter(pk=instance.order_id).values_list('created_at', flat=True).first()
+    schedule_rollup_refresh(created_at)
@@ -0,0 +1,14 @@
+from datetime import date
+from celery import shared_task
+from .rollups import refresh_recent_days, run_refresh
+
+
+@shared_task(ignore_result=True)
+def refresh_sales_rollups(day):
+    run_refresh(date.fromisoformat(day))
+
+
+@shared_task(ignore_result=True)
+def refresh_recent_sales_rollups():
+    """Catch up on refreshes lost with a dead worker or thread (for celery beat)."""
+    refresh_recent_days()
@@ -0,0 +1,152 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from apps.accounts.models import User
+from apps.catalog.models import Brand, Category, Product, ProductVariant
+from .models import DailyBrandSales, DailyCategorySales, DailyPaymentMethodSales, DailySales, Order, OrderItem
+from .rollups import refresh_days
+from .tasks import refresh_recent_sales_rollups, refresh_sales_rollups
+
+
+@override_settings(ORDERS_ROLLUP_QUEUE='sync')
+class SalesRollupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.localdate()
+        self.laptops = Category.objects.create(name="Laptops", slug="laptops")
+        self.phones = Category.objects.create(name="Phones", slug="phones")
+        self.brand = Brand.objects.create(name="Acme", slug="acme")
+        self.laptop = self.variant(self.laptops, 'LAP-1')
+        self.bag = self.variant(self.laptops, 'BAG-1')
+        self.phone = self.variant(self.phones, 'PHN-1')
+
+    def variant(self, category, sku):
+        product = Product.objects.create(name=sku, slug=sku.lower(), category=category, brand=self.brand)
+        return ProductVariant.objects.create(product=product, sku=sku)
+
+    def order(self, lines, payment_status='paid', payment_method='cod', shipping=Decimal('60.00')):
+        with self.captureOnCommitCallbacks(execute=True):
+            subtotal = sum(price * quantity for _, quantity, price in lines)
+            order = Order.objects.create(
+                guest_email='buyer@example.com', payment_status=payment_status, payment_method=payment_method,
+                subtotal=subtotal, shipping_cost=shipping, total=subtotal + shipping,
+            )
+            for variant, quantity, price in lines:
+                OrderItem.objects.create(order=order, variant=variant, product_name=variant.sku, quantity=quantity, unit_price=price)
+        return order
+
+    def test_orders_are_rolled_up_without_double_counting(self):
+        self.order([(self.laptop, 1, Decimal('100.00')), (self.bag, 2, Decimal('20.00'))])
+        self.order([(self.phone, 1, Decimal('50.00'))], payment_method='sslcommerz')
+        self.order([(self.phone, 5, Decimal('50.00'))], payment_status='pending')
+
+        day = DailySales.objects.get()
+        self.assertEqual(
+            (day.day, day.placed_orders, day.orders, day.units, day.revenue),
+            (self.today, 3, 2, 4, Decimal('310.00'))
+        )
+        self.assertEqual(
+            dict(DailyCategorySales.objects.values_list('category__name', 'revenue')),
+            {'Laptops': Decimal('140.00'), 'Phones': Decimal('50.00')}
+        )
+        self.assertEqual(DailyCategorySales.objects.get(category=self.laptops).orders, 1)
+        self.assertEqual(DailyBrandSales.objects.values_list('units', 'revenue').get(), (4, Decimal('190.00')))
+        self.assertEqual(
+            dict(DailyPaymentMethodSales.objects.values_list('payment_method', 'revenue')),
+            {'cod': Decimal('200.00'), 'sslcommerz': Decimal('110.00')}
+        )
+
+    def test_state_changes_update_the_day(self):
+        order = self.order([(self.laptop, 1, Decimal('100.00'))], payment_status='pending')
+        self.assertEqual(DailySales.objects.get().revenue, 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order.payment_status = 'paid'
+            order.save()
+        self.assertEqual(DailySales.objects.get().revenue, Decimal('160.00'))
+        self.assertEqual(DailyCategorySales.objects.get().revenue, Decimal('100.00'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order.payment_status = 'refunded'
+            order.save()
+        self.assertEqual((DailySales.objects.get().orders, DailySales.objects.get().revenue), (0, 0))
+        self.assertFalse(DailyCategorySales.objects.exists())
+
+        # The day keeps its (zeroed) row, which refreshes lock
+        with self.captureOnCommitCallbacks(execute=True):
+            order.delete()
+        self.assertEqual(DailySales.objects.values_list('placed_orders', 'revenue').get(), (0, 0))
+        self.assertFalse(DailyBrandSales.objects.exists())
+
+    def test_command_backfills_past_days(self):
+        order = self.order([(self.laptop, 1, Decimal('100.00'))])
+        Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(days=3))
+        out = StringIO()
+        call_command('rebuild_sales_rollups', stdout=out)
+        self.assertIn('Rebuilt sales rollups for 4 days', out.getvalue())
+        self.assertEqual(
+            DailySales.objects.filter(placed_orders__gt=0).values_list('day', 'revenue').get(),
+            (self.today - timedelta(days=3), Decimal('160.00'))
+        )
+
+    def test_refresh_locks_the_day_before_reading_orders(self):
+        self.order([(self.laptop, 1, Decimal('100.00'))])
+        with CaptureQueriesContext(connection) as ctx:
+            refresh_days([self.today])
+        sql = [query['sql'] for query in ctx.captured_queries]
+        lock = next(i for i, query in enumerate(sql) if query.startswith('INSERT') and '"orders_dailysales"' in query)
+        read = next(i for i, query in enumerate(sql) if 'FROM "orders_order"' in query)
+        self.assertLess(lock, read)
+
+    @override_settings(ORDERS_ROLLUP_QUEUE='celery', ORDERS_ROLLUP_DELAY=30)
+    def test_changes_to_a_day_share_one_queued_refresh(self):
+        with mock.patch('apps.orders.tasks.refresh_sales_rollups.apply_async') as apply_async:
+            order = self.order([(self.laptop, 1, Decimal('100.00')), (self.bag, 2, Decimal('20.00'))], payment_status='pending')
+            with self.captureOnCommitCallbacks(execute=True):
+                order.payment_status = 'paid'
+                order.save()
+        apply_async.assert_called_once_with((self.today.isoformat(),), countdown=30)
+        self.assertFalse(DailySales.objects.exists())
+
+        # Once the refresh has started, later changes queue another one
+        refresh_sales_rollups(self.today.isoformat())
+        self.assertEqual(DailySales.objects.get().revenue, Decimal('200.00'))
+        with mock.patch('apps.orders.tasks.refresh_sales_rollups.apply_async') as apply_async:
+            self.order([(self.phone, 1, Decimal('50.00'))])
+        apply_async.assert_called_once()
+
+    @override_settings(ORDERS_ROLLUP_QUEUE='thread', ORDERS_ROLLUP_RECENT_DAYS=2)
+    def test_periodic_refresh_catches_up_on_lost_refreshes(self):
+        # The queued refresh dies with its thread
+        with mock.patch('apps.orders.rollups.threading.Timer'):
+            yesterday = self.order([(self.laptop, 1, Decimal('100.00'))])
+            older = self.order([(self.phone, 1, Decimal('50.00'))])
+        Order.objects.filter(pk=yesterday.pk).update(created_at=timezone.now() - timedelta(days=1))
+        Order.objects.filter(pk=older.pk).update(created_at=timezone.now() - timedelta(days=2))
+        self.assertFalse(DailySales.objects.exists())
+
+        refresh_recent_sales_rollups()
+        self.assertEqual(
+            dict(DailySales.objects.values_list('day', 'revenue')),
+            {self.today: 0, self.today - timedelta(days=1): Decimal('160.00')}
+        )
+
+    def test_dashboard_reads_rollups(self):
+        self.order([(self.laptop, 1, Decimal('100.00')), (self.bag, 2, Decimal('20.00'))])
+        self.order([(self.phone, 1, Decimal('50.00'))])
+        staff = User.objects.create_user(email='staff@example.com', password='pass', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(reverse('dashboard:home'))
+        self.assertEqual((response.context['total_orders'], response.context['total_revenue']), (2, Decimal('310.00')))
+        self.assertEqual(response.context['sales_labels'], [self.today.strftime('%Y-%m')])
+        self.assertEqual(response.context['category_labels'], ['Laptops', 'Phones'])
+        self.assertEqual(response.context['category_summary'], [('Laptops', 45), ('Phones', 16)])
+
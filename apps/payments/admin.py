@@ -1 +1,25 @@
 from django.contrib import admin
+from .models import PaymentTransaction, WebhookEvent
+
+
+@admin.register(PaymentTransaction)
+class PaymentTransactionAdmin(admin.ModelAdmin):
+    """Admin for PaymentTransaction model."""
+    
+    list_display = ['transaction_id', 'order', 'amount', 'payment_method', 'status', 'created_at']
+    list_filter = ['status', 'payment_method']
+    search_fields = ['transaction_id', 'provider_reference', 'order__order_number']
+    raw_id_fields = ['order']
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    """Admin for WebhookEvent model. Events are append-only."""
+    
+    list_display = ['provider', 'event_type', 'transaction_id', 'processed', 'attempts', 'next_attempt_at', 'created_at']
+    list_filter = ['provider', 'event_type', 'processed']
+    search_fields = ['transaction_id']
+    readonly_fields = [
+        'provider', 'event_type', 'payload', 'transaction_id', 'processed', 'processed_at',
+        'attempts', 'next_attempt_at', 'error_message', 'created_at'
+    ]
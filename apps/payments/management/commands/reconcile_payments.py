@@ -0,0 +1,28 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from apps.payments.reconciliation import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Settle SSLCommerz payments left pending (e.g. lost IPNs) by asking the gateway for their status.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--after-minutes', type=int, help='Only transactions at least this old (default: PAYMENTS_RECONCILE_AFTER_MINUTES).')
+        parser.add_argument('--expire-minutes', type=int, help='Cancel transactions without a gateway outcome once this old (default: PAYMENTS_RECONCILE_EXPIRE_MINUTES).')
+        parser.add_argument('--batch-size', type=int, help='Transactions per batch (default: PAYMENTS_RECONCILE_BATCH_SIZE).')
+        parser.add_argument('--workers', type=int, help='Concurrent gateway queries (default: PAYMENTS_RECONCILE_WORKERS).')
+        parser.add_argument('--limit', type=int, help='Stop after this many transactions.')
+
+    def handle(self, *args, **options):
+        stats = reconcile(
+            after=timedelta(minutes=options['after_minutes']) if options['after_minutes'] is not None else None,
+            expire_after=timedelta(minutes=options['expire_minutes']) if options['expire_minutes'] is not None else None,
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+            limit=options['limit'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Reconciled {stats['scanned']} transactions in {stats['seconds']}s ({stats['per_second']}/s): "
+            f"{stats['success']} paid, {stats['failed']} failed, {stats['cancelled']} cancelled, "
+            f"{stats['open']} still open, {stats['unreachable']} unreachable."
+        ))
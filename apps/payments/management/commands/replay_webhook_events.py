@@ -0,0 +1,31 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from apps.payments.models import WebhookEvent
+from apps.payments.webhooks import pending_events, process_event
+
+
+class Command(BaseCommand):
+    help = 'Process payment webhook events that are stuck: due for retry, out of attempts or never picked up.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('event_ids', nargs='*', type=int, help='Replay only these unprocessed events.')
+        parser.add_argument(
+            '--stuck-minutes', type=int, default=getattr(settings, 'PAYMENTS_WEBHOOK_STUCK_MINUTES', 10),
+            help='Also replay events never attempted this many minutes after they arrived.'
+        )
+
+    def handle(self, *args, **options):
+        if options['event_ids']:
+            events = WebhookEvent.objects.filter(pk__in=options['event_ids'], processed=False)
+        else:
+            events = pending_events(stuck_after=timedelta(minutes=options['stuck_minutes']))
+        
+        processed = failed = 0
+        for event_id in list(events.values_list('pk', flat=True)):
+            process_event(event_id)
+            if WebhookEvent.objects.filter(pk=event_id, processed=True).exists():
+                processed += 1
+            else:
+                failed += 1
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} webhook events; {failed} still failing.'))
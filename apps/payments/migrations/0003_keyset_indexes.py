@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-17 00:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_keyset_indexes'),
+        ('payments', '0002_paymentmethod'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='paymenttransaction',
+            index=models.Index(fields=['created_at', 'id'], name='payments_pa_created_b4148e_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.14 on 2026-10-17 00:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='webhookevent',
+            options={'ordering': ['created_at']},
+        ),
+        migrations.AddField(
+            model_name='webhookevent',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0, verbose_name='attempts'),
+        ),
+        migrations.AddField(
+            model_name='webhookevent',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='next attempt at'),
+        ),
+        migrations.AddField(
+            model_name='webhookevent',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='processed at'),
+        ),
+        migrations.AddField(
+            model_name='webhookevent',
+            name='transaction_id',
+            field=models.CharField(blank=True, db_index=True, max_length=100, verbose_name='transaction id'),
+        ),
+        migrations.AddIndex(
+            model_name='webhookevent',
+            index=models.Index(fields=['processed', 'next_attempt_at'], name='payments_we_process_ffdf00_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-17 00:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_keyset_indexes'),
+        ('payments', '0004_webhook_processing'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='paymenttransaction',
+            index=models.Index(fields=['provider_reference'], name='payments_pa_provide_ddbf17_idx'),
+        ),
+    ]
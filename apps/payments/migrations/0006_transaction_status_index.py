@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-17 00:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_keyset_indexes'),
+        ('payments', '0005_provider_reference_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='paymenttransaction',
+            index=models.Index(fields=['status', 'created_at'], name='payments_pa_status_c4e513_idx'),
+        ),
+    ]
@@ -58,18 +58,38 @@ class PaymentTransaction(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['provider_reference']),
+            models.Index(fields=['status', 'created_at']),
+        ]
 
     def __str__(self):
         return f"Payment {self.transaction_id} - {self.order.order_number} ({self.status})"
 
 class WebhookEvent(models.Model):
+    """
+    A gateway callback, stored as received and processed later by
+    apps.payments.webhooks. Rows are never changed except for the
+    processing bookkeeping below.
+    """
     provider = models.CharField('provider', max_length=50) # 'sslcommerz'
     event_type = models.CharField('event type', max_length=100, blank=True)
     payload = models.JSONField('payload')
+    transaction_id = models.CharField('transaction id', max_length=100, blank=True, db_index=True) # tran_id from the payload
     processed = models.BooleanField(default=False)
+    processed_at = models.DateTimeField('processed at', null=True, blank=True)
+    attempts = models.PositiveIntegerField('attempts', default=0)
+    next_attempt_at = models.DateTimeField('next attempt at', null=True, blank=True)
     error_message = models.TextField(blank=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['processed', 'next_attempt_at']),
+        ]
+
     def __str__(self):
         return f"Webhook {self.provider} - {self.created_at}"
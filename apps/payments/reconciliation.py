@@ -0,0 +1,129 @@
+"""
+Reconciliation of payments the gateway never told us about.
+
+A customer who closes the gateway tab, or an IPN that never arrives, leaves
+a PaymentTransaction open with its stock reserved. reconcile() walks the
+open SSLCommerz transactions older than PAYMENTS_RECONCILE_AFTER_MINUTES,
+oldest first and a batch at a time (keyset pagination over the
+(status, created_at) index), asks the gateway's transaction query API about
+each through a bounded thread pool, and settles the batch in one database
+transaction through the same path the webhooks use. Transactions the
+gateway has no outcome for are cancelled once they are older than
+PAYMENTS_RECONCILE_EXPIRE_MINUTES (unless the validation API finds one of
+their attempts paid after all); until then they are left alone. A payment
+confirmed after its transaction was cancelled still settles through the
+webhooks, which let a validated payment overturn a cancellation.
+"""
+import logging
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import PaymentTransaction
+from .utils import VALID_STATUSES, SSLCommerzProvider
+from .webhooks import OPEN_STATUSES, gateway_outcome, settle
+
+logger = logging.getLogger(__name__)
+
+
+def stale_transactions(older_than):
+    """Open SSLCommerz transactions created before `older_than`, oldest first."""
+    return PaymentTransaction.objects.filter(
+        status__in=OPEN_STATUSES, payment_method='sslcommerz', created_at__lt=older_than
+    ).order_by('created_at', 'pk')
+
+
+def decide(pmt_transaction, attempts, expire_before, provider):
+    """
+    What to do with a transaction given the gateway's `attempts` for it:
+    (status, response, reference), or None to leave it open.
+    """
+    transaction_id = pmt_transaction.transaction_id
+    outcome = gateway_outcome(transaction_id, attempts)
+    if outcome is not None:
+        return outcome
+    if pmt_transaction.created_at >= expire_before:
+        return None
+    # Before writing the payment off, let the validation API check the
+    # attempts still in progress; if it can't be asked, try again next run
+    for attempt in attempts:
+        val_id = attempt.get('val_id')
+        if not val_id or attempt.get('tran_id', transaction_id) != transaction_id:
+            continue
+        result = provider.validate_transaction(val_id)
+        if result is None:
+            return None
+        if result.get('status') in VALID_STATUSES and result.get('tran_id', transaction_id) == transaction_id:
+            return 'success', result, val_id
+    return 'cancelled', {'reconciled': 'expired', 'attempts': attempts}, ''
+
+
+def _settle_batch(decisions):
+    """Apply {pk: decision} in one transaction, skipping whatever a webhook settled meanwhile."""
+    settled = Counter()
+    with transaction.atomic():
+        locked = PaymentTransaction.objects.select_for_update().select_related('order').filter(
+            pk__in=list(decisions), status__in=OPEN_STATUSES
+        )
+        for pmt_transaction in locked:
+            status, response, reference = decisions[pmt_transaction.pk]
+            settle(pmt_transaction, status, response, reference=reference)
+            settled[status] += 1
+    return settled
+
+
+def reconcile(after=None, expire_after=None, batch_size=None, workers=None, limit=None):
+    """
+    Reconcile stale open transactions; `after`/`expire_after` are timedeltas,
+    the rest default to the PAYMENTS_RECONCILE_* settings. Returns metrics:
+    counts of transactions scanned, settled per status, left open and not
+    reachable at the gateway, plus the elapsed seconds and throughput.
+    """
+    now = timezone.now()
+    after = after if after is not None else timedelta(minutes=getattr(settings, 'PAYMENTS_RECONCILE_AFTER_MINUTES', 30))
+    expire_after = expire_after if expire_after is not None else timedelta(minutes=getattr(settings, 'PAYMENTS_RECONCILE_EXPIRE_MINUTES', 120))
+    batch_size = batch_size or getattr(settings, 'PAYMENTS_RECONCILE_BATCH_SIZE', 100)
+    workers = workers or getattr(settings, 'PAYMENTS_RECONCILE_WORKERS', 8)
+
+    stats = Counter()
+    started = time.monotonic()
+    provider = SSLCommerzProvider()
+    pending = stale_transactions(now - after)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='reconcile') as pool:
+        cursor = None
+        while limit is None or stats['scanned'] < limit:
+            batch = pending
+            if cursor is not None:
+                batch = batch.filter(Q(created_at__gt=cursor[0]) | Q(created_at=cursor[0], pk__gt=cursor[1]))
+            size = batch_size if limit is None else min(batch_size, limit - stats['scanned'])
+            batch = list(batch.only('pk', 'transaction_id', 'created_at')[:size])
+            if not batch:
+                break
+            cursor = (batch[-1].created_at, batch[-1].pk)
+            stats['scanned'] += len(batch)
+
+            decisions = {}
+            results = pool.map(provider.query_transaction, [pmt_transaction.transaction_id for pmt_transaction in batch])
+            for pmt_transaction, attempts in zip(batch, results):
+                if attempts is None:
+                    stats['unreachable'] += 1
+                    continue
+                decision = decide(pmt_transaction, attempts, now - expire_after, provider)
+                if decision is None:
+                    stats['open'] += 1
+                else:
+                    decisions[pmt_transaction.pk] = decision
+            if decisions:
+                settled = _settle_batch(decisions)
+                stats.update(settled)
+                # Settled by a webhook while we asked the gateway
+                stats['open'] += len(decisions) - sum(settled.values())
+
+    stats['seconds'] = round(time.monotonic() - started, 3)
+    stats['per_second'] = round(stats['scanned'] / stats['seconds'], 1) if stats['seconds'] else 0
+    logger.info(f"Payment reconciliation: {dict(stats)}")
+    return stats
@@ -0,0 +1,29 @@
+from datetime import timedelta
+from celery import shared_task
+from django.conf import settings
+from .reconciliation import reconcile
+from .webhooks import dispatch, pending_events, process_event
+
+
+@shared_task(ignore_result=True)
+def process_webhook_event(event_id):
+    delay = process_event(event_id)
+    if delay is not None:
+        dispatch(event_id, countdown=delay)
+
+
+@shared_task(ignore_result=True)
+def drain_webhook_events():
+    """
+    Queue the events left unprocessed, e.g. by a worker that died (for celery
+    beat). Events out of attempts are left to the replay_webhook_events command.
+    """
+    stuck_after = timedelta(minutes=getattr(settings, 'PAYMENTS_WEBHOOK_STUCK_MINUTES', 10))
+    for event_id in pending_events(stuck_after=stuck_after, exhausted=False).values_list('pk', flat=True):
+        dispatch(event_id)
+
+
+@shared_task(ignore_result=True)
+def reconcile_pending_payments():
+    """Settle payments whose callbacks never arrived (for celery beat)."""
+    reconcile()
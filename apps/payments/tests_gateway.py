@@ -0,0 +1,193 @@
+import json
+import threading
+import time
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from unittest import mock
+import requests
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from apps.cart.cart import SessionCart
+from apps.catalog.models import Category, Product, ProductVariant, VariantInventory
+from apps.checkout.models import CheckoutSession, ShippingMethod, StockReservation
+from apps.core import site_cache
+from apps.orders.models import Order
+from apps.pricing.models import Price
+from . import utils
+from .utils import SSLCommerzProvider, reset_client
+
+
+class StubGateway:
+    """
+    A local HTTP server standing in for SSLCommerz. Each request gets the
+    next (status, payload, delay) of `script`; the last entry repeats. A
+    callable payload is called with the parsed query string.
+    """
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls = []
+        self.ports = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def respond(self):
+                self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                stub.calls.append((self.command, self.path.split('?')[0]))
+                stub.ports.append(self.client_address[1])
+                status, payload, delay = stub.script.pop(0) if len(stub.script) > 1 else stub.script[0]
+                if callable(payload):
+                    payload = payload(parse_qs(urlsplit(self.path).query))
+                time.sleep(delay)
+                body = json.dumps(payload).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except OSError:
+                    pass  # The client gave up waiting
+
+            do_GET = do_POST = respond
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+GATEWAY_SETTINGS = {
+    'SSLCOMMERZ_READ_TIMEOUT': 0.5,
+    'SSLCOMMERZ_MAX_RETRIES': 2,
+    'SSLCOMMERZ_RETRY_BACKOFF': 0,
+    'SSLCOMMERZ_BREAKER_THRESHOLD': 2,
+    'SSLCOMMERZ_BREAKER_RESET': 60,
+}
+
+
+class GatewayClientTests(TestCase):
+    def stub(self, *script):
+        cache.clear()
+        stub = StubGateway(*script)
+        self.addCleanup(stub.close)
+        settings = override_settings(SSLCOMMERZ_BASE_URL=stub.url, **GATEWAY_SETTINGS)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        reset_client()
+        self.addCleanup(reset_client)
+        return stub
+
+    def test_validation_is_retried_on_server_errors(self):
+        stub = self.stub((503, {}, 0), (200, {'status': 'VALID'}, 0))
+        self.assertEqual(SSLCommerzProvider().validate_transaction('val-1'), {'status': 'VALID'})
+        self.assertEqual(stub.calls, [('GET', '/validator/api/validationserverAPI.php')] * 2)
+
+    def test_read_timeout_is_bounded(self):
+        stub = self.stub((200, {'status': 'VALID'}, 2))
+        started = time.monotonic()
+        self.assertIsNone(SSLCommerzProvider().validate_transaction('val-1'))
+        self.assertLess(time.monotonic() - started, 3)
+        self.assertEqual(len(stub.calls), 3)
+
+    def test_circuit_opens_after_repeated_failures(self):
+        stub = self.stub((500, {}, 0))
+        provider = SSLCommerzProvider()
+        self.assertIsNone(provider.validate_transaction('val-1'))
+        self.assertIsNone(provider.validate_transaction('val-2'))
+        self.assertTrue(utils.get_breaker().is_open)
+        self.assertIsNone(provider.validate_transaction('val-3'))
+        self.assertEqual(len(stub.calls), 6)
+
+    def test_trial_call_failing_with_any_request_error_reopens_the_circuit(self):
+        self.stub((200, {'status': 'VALID'}, 0))
+        breaker = utils.get_breaker()
+        for _ in range(2):
+            breaker.record_failure()
+        breaker.opened_at -= 60
+        with mock.patch.object(utils.get_session(), 'request', side_effect=requests.exceptions.ChunkedEncodingError):
+            self.assertIsNone(SSLCommerzProvider().validate_transaction('val-1'))
+        self.assertTrue(breaker.is_open)
+        self.assertFalse(breaker._trial)
+
+        # The next trial goes through once the reset period has passed again
+        breaker.opened_at -= 60
+        self.assertEqual(SSLCommerzProvider().validate_transaction('val-1'), {'status': 'VALID'})
+        self.assertFalse(breaker.is_open)
+
+    def test_connection_is_reused(self):
+        stub = self.stub((200, {'status': 'VALID'}, 0))
+        for val_id in ('val-1', 'val-2', 'val-3'):
+            SSLCommerzProvider().validate_transaction(val_id)
+        self.assertEqual(len(stub.ports), 3)
+        self.assertEqual(len(set(stub.ports)), 1)
+
+
+class GatewayCheckoutTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        site_cache.clear_local()
+        reset_client()
+        self.addCleanup(reset_client)
+        category = Category.objects.create(name="Laptops", slug="laptops")
+        product = Product.objects.create(name="Laptop", slug="laptop", category=category)
+        self.variant = ProductVariant.objects.create(product=product, sku="LAP-1")
+        Price.objects.create(variant=self.variant, list_price=Decimal('100.00'))
+        VariantInventory.objects.create(variant=self.variant, stock_qty=5)
+        self.user = get_user_model().objects.create_user(email='buyer@example.com', password='secret')
+        self.client.force_login(self.user)
+        SessionCart(self.client.get('/').wsgi_request).set_quantities({self.variant.id: 2})
+        CheckoutSession.objects.create(
+            user=self.user,
+            session_key='checkout',
+            guest_shipping_address={'full_name': 'Buyer', 'address_line1': 'Road 1', 'city': 'Dhaka'},
+            shipping_method=ShippingMethod.objects.create(name='Standard', price=Decimal('60.00')),
+            payment_method='sslcommerz',
+        )
+
+    def place_order(self, *script):
+        stub = StubGateway(*script)
+        self.addCleanup(stub.close)
+        depths = []
+
+        def record_depth(*args, **kwargs):
+            depths.append(len(connection.atomic_blocks))
+            return gateway_request(*args, **kwargs)
+
+        gateway_request = utils.gateway_request
+        outer = len(connection.atomic_blocks)
+        with override_settings(SSLCOMMERZ_BASE_URL=stub.url, **GATEWAY_SETTINGS), \
+                mock.patch.object(utils, 'gateway_request', side_effect=record_depth):
+            response = self.client.post(reverse('checkout:place_order'))
+        # The gateway was called outside the order transaction
+        self.assertEqual(depths, [outer])
+        return stub, response
+
+    def test_redirects_to_gateway_after_commit(self):
+        stub, response = self.place_order((200, {'status': 'SUCCESS', 'GatewayPageURL': 'https://pay.example.com/x'}, 0))
+        self.assertRedirects(response, 'https://pay.example.com/x', fetch_redirect_response=False)
+        order = Order.objects.get()
+        self.assertEqual(order.payments.get().status, 'pending')
+        self.assertEqual(StockReservation.objects.get().order, order)
+        self.assertEqual(len(SessionCart(self.client.get('/').wsgi_request)), 0)
+
+    def test_failed_initialization_is_not_retried_and_cancels_the_order(self):
+        stub, response = self.place_order((503, {}, 0))
+        self.assertRedirects(response, reverse('checkout:review'), fetch_redirect_response=False)
+        self.assertEqual(stub.calls, [('POST', '/gwprocess/v4/api.php')])
+        order = Order.objects.get()
+        self.assertEqual((order.status, order.payment_status, order.payments.get().status), ('cancelled', 'failed', 'failed'))
+        self.assertEqual(StockReservation.objects.get().status, 'released')
+        self.assertEqual(len(SessionCart(self.client.get('/').wsgi_request)), 2)
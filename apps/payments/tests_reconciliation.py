@@ -0,0 +1,133 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from apps.catalog.models import Category, Product, ProductVariant, VariantInventory
+from apps.checkout.models import StockReservation
+from apps.orders.models import Order
+from .models import PaymentTransaction
+from .reconciliation import reconcile
+from .tests_gateway import GATEWAY_SETTINGS, StubGateway
+from .utils import reset_client
+
+# What the stub gateway knows about each tran_id
+ATTEMPTS = {
+    'TRAN-PAID': [{'status': 'FAILED', 'tran_id': 'TRAN-PAID'}, {'status': 'VALID', 'tran_id': 'TRAN-PAID', 'val_id': 'VAL-1'}],
+    'TRAN-FAILED': [{'status': 'FAILED', 'tran_id': 'TRAN-FAILED'}],
+    'TRAN-LATE': [{'status': 'PENDING', 'tran_id': 'TRAN-LATE', 'val_id': 'VAL-LATE'}],
+    'TRAN-UNPAID': [{'status': 'PENDING', 'tran_id': 'TRAN-UNPAID', 'val_id': 'VAL-UNPAID'}],
+}
+# What its validation API says about each val_id
+VALIDATIONS = {
+    'VAL-LATE': {'status': 'VALID', 'tran_id': 'TRAN-LATE', 'val_id': 'VAL-LATE'},
+}
+
+
+def transaction_query(query):
+    if 'val_id' in query:
+        return VALIDATIONS.get(query['val_id'][0], {'status': 'INVALID_TRANSACTION'})
+    attempts = ATTEMPTS.get(query['tran_id'][0], [])
+    return {'APIConnect': 'DONE', 'no_of_trans_found': len(attempts), 'element': attempts}
+
+
+class ReconciliationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_client()
+        self.addCleanup(reset_client)
+        category = Category.objects.create(name="Laptops", slug="laptops")
+        product = Product.objects.create(name="Laptop", slug="laptop", category=category)
+        self.variant = ProductVariant.objects.create(product=product, sku="LAP-1")
+        VariantInventory.objects.create(variant=self.variant, stock_qty=10, reserved_qty=6)
+
+    def payment(self, transaction_id, minutes_old, payment_method='sslcommerz'):
+        order = Order.objects.create(guest_email='buyer@example.com', total=Decimal('100.00'))
+        StockReservation.objects.create(
+            variant=self.variant, quantity=1, order=order, expires_at=timezone.now() + timedelta(hours=1)
+        )
+        payment = PaymentTransaction.objects.create(
+            transaction_id=transaction_id, order=order, amount=Decimal('100.00'), payment_method=payment_method
+        )
+        PaymentTransaction.objects.filter(pk=payment.pk).update(created_at=timezone.now() - timedelta(minutes=minutes_old))
+        return payment
+
+    def stub(self, *script):
+        stub = StubGateway(*script)
+        self.addCleanup(stub.close)
+        settings = override_settings(SSLCOMMERZ_BASE_URL=stub.url, **GATEWAY_SETTINGS)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        return stub
+
+    def status(self, transaction_id):
+        payment = PaymentTransaction.objects.select_related('order').get(transaction_id=transaction_id)
+        reservation = StockReservation.objects.get(order=payment.order)
+        return payment.status, payment.order.payment_status, reservation.status
+
+    def test_stale_transactions_are_settled_from_the_gateway(self):
+        stub = self.stub((200, transaction_query, 0))
+        for transaction_id, minutes_old in [('TRAN-PAID', 60), ('TRAN-FAILED', 90), ('TRAN-GONE', 180), ('TRAN-WAIT', 45), ('TRAN-NEW', 5)]:
+            self.payment(transaction_id, minutes_old)
+        self.payment('TRAN-COD', 600, payment_method='cod')
+
+        stats = reconcile(batch_size=2, workers=2)
+
+        self.assertEqual(len(stub.calls), 4)
+        self.assertEqual(self.status('TRAN-PAID'), ('success', 'paid', 'converted'))
+        self.assertEqual(PaymentTransaction.objects.get(transaction_id='TRAN-PAID').provider_reference, 'VAL-1')
+        self.assertEqual(VariantInventory.objects.values_list('stock_qty', 'reserved_qty').get(), (9, 3))
+        self.assertEqual(self.status('TRAN-FAILED'), ('failed', 'failed', 'released'))
+        self.assertEqual(self.status('TRAN-GONE'), ('cancelled', 'failed', 'released'))
+        for transaction_id in ['TRAN-WAIT', 'TRAN-NEW', 'TRAN-COD']:
+            self.assertEqual(self.status(transaction_id), ('pending', 'pending', 'active'))
+        self.assertEqual(
+            {key: stats[key] for key in ['scanned', 'success', 'failed', 'cancelled', 'open', 'unreachable']},
+            {'scanned': 4, 'success': 1, 'failed': 1, 'cancelled': 1, 'open': 1, 'unreachable': 0}
+        )
+
+    def test_expiry_checks_attempts_in_progress_with_the_validation_api(self):
+        stub = self.stub((200, transaction_query, 0))
+        self.payment('TRAN-LATE', 180)
+        self.payment('TRAN-UNPAID', 180)
+        stats = reconcile()
+        self.assertEqual(len(stub.calls), 4)
+        self.assertEqual(self.status('TRAN-LATE'), ('success', 'paid', 'converted'))
+        self.assertEqual(PaymentTransaction.objects.get(transaction_id='TRAN-LATE').provider_reference, 'VAL-LATE')
+        self.assertEqual(self.status('TRAN-UNPAID'), ('cancelled', 'failed', 'released'))
+        self.assertEqual((stats['success'], stats['cancelled']), (1, 1))
+
+    def test_expiry_waits_when_the_validation_api_is_unreachable(self):
+        self.stub((200, transaction_query, 0), (500, {}, 0))
+        self.payment('TRAN-LATE', 180)
+        stats = reconcile()
+        self.assertEqual(stats['open'], 1)
+        self.assertEqual(self.status('TRAN-LATE'), ('pending', 'pending', 'active'))
+
+    def test_unreachable_gateway_leaves_transactions_open(self):
+        self.stub((500, {}, 0))
+        self.payment('TRAN-GONE', 180)
+        stats = reconcile()
+        self.assertEqual(stats['unreachable'], 1)
+        self.assertEqual(self.status('TRAN-GONE'), ('pending', 'pending', 'active'))
+
+    def test_gateway_is_queried_concurrently(self):
+        stub = self.stub((200, transaction_query, 0.3))
+        for i in range(8):
+            self.payment(f'TRAN-WAIT-{i}', 45)
+        started = time.monotonic()
+        stats = reconcile(workers=4)
+        self.assertLess(time.monotonic() - started, 8 * 0.3)
+        self.assertEqual(stats['open'], 8)
+        self.assertLessEqual(len(set(stub.ports)), 4)
+
+    def test_command_reports_metrics(self):
+        self.stub((200, transaction_query, 0))
+        self.payment('TRAN-PAID', 60)
+        out = StringIO()
+        call_command('reconcile_payments', '--limit', '10', stdout=out)
+        self.assertIn('Reconciled 1 transactions in', out.getvalue())
+        self.assertIn('1 paid, 0 failed, 0 cancelled, 0 still open, 0 unreachable.', out.getvalue())
@@ -0,0 +1,53 @@
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from apps.orders.models import Order
+from . import utils
+from .models import PaymentTransaction
+from .utils import SSLCommerzProvider
+
+
+def gateway_returning(payload):
+    response = mock.Mock()
+    response.json.return_value = payload
+    return mock.patch.object(utils, 'gateway_request', return_value=response)
+
+
+class ValidationCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.provider = SSLCommerzProvider()
+
+    def test_valid_result_is_reused(self):
+        with gateway_returning({'status': 'VALID', 'tran_id': 'TRAN-1'}) as gateway:
+            for _ in range(3):
+                self.assertEqual(self.provider.validate_transaction('VAL-1')['status'], 'VALID')
+        self.assertEqual(gateway.call_count, 1)
+
+    def test_settled_transaction_answers_without_the_gateway(self):
+        order = Order.objects.create(guest_email='buyer@example.com', total=Decimal('100.00'))
+        PaymentTransaction.objects.create(
+            transaction_id='TRAN-1', order=order, amount=Decimal('100.00'), status='success',
+            provider_reference='VAL-1', provider_response={'status': 'VALID', 'tran_id': 'TRAN-1'},
+        )
+        with gateway_returning({'status': 'VALIDATED'}) as gateway:
+            self.assertEqual(self.provider.validate_transaction('VAL-1')['tran_id'], 'TRAN-1')
+            with self.assertNumQueries(0):
+                self.provider.validate_transaction('VAL-1')
+        gateway.assert_not_called()
+
+    @override_settings(SSLCOMMERZ_VALIDATION_NEGATIVE_TTL=60)
+    def test_negative_result_expires_quickly(self):
+        with gateway_returning({'status': 'INVALID_TRANSACTION'}) as gateway, \
+                mock.patch.object(utils.cache, 'set', wraps=cache.set) as cache_set:
+            self.provider.validate_transaction('VAL-1')
+            self.provider.validate_transaction('VAL-1')
+        self.assertEqual(gateway.call_count, 1)
+        cache_set.assert_called_once_with(utils.validation_cache_key('VAL-1'), {'status': 'INVALID_TRANSACTION'}, 60)
+
+    def test_gateway_failure_is_not_cached(self):
+        with mock.patch.object(utils, 'gateway_request', side_effect=utils.GatewayUnavailable('down')) as gateway:
+            self.assertIsNone(self.provider.validate_transaction('VAL-1'))
+            self.assertIsNone(self.provider.validate_transaction('VAL-1'))
+        self.assertEqual(gateway.call_count, 2)
@@ -0,0 +1,180 @@
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from apps.catalog.models import Category, Product, ProductVariant, VariantInventory
+from apps.core.testing import ConcurrentWritesMixin
+from apps.orders.models import Order, OrderItem
+from .models import PaymentTransaction, WebhookEvent
+from .tasks import drain_webhook_events
+from .utils import SSLCommerzProvider
+from .webhooks import process_event
+
+
+def create_paid_order_setup():
+    category, _ = Category.objects.get_or_create(name="Laptops", slug="laptops")
+    product = Product.objects.create(name="Laptop", slug="laptop", category=category)
+    variant = ProductVariant.objects.create(product=product, sku="LAP-1")
+    VariantInventory.objects.create(variant=variant, stock_qty=5)
+    order = Order.objects.create(guest_email='buyer@example.com', subtotal=Decimal('200.00'), total=Decimal('200.00'))
+    OrderItem.objects.create(order=order, variant=variant, product_name='Laptop', quantity=2, unit_price=Decimal('100.00'))
+    payment = PaymentTransaction.objects.create(
+        transaction_id='TRAN-1', order=order, amount=Decimal('200.00'), payment_method='sslcommerz'
+    )
+    return variant, order, payment
+
+
+def stock(variant):
+    return VariantInventory.objects.get(variant=variant).stock_qty
+
+
+VALID = {'status': 'VALID', 'tran_id': 'TRAN-1', 'amount': '200.00'}
+FAILED = {'status': 'FAILED', 'tran_id': 'TRAN-1'}
+
+
+@override_settings(PAYMENTS_WEBHOOK_QUEUE='sync', PAYMENTS_WEBHOOK_RETRY_BACKOFF=1)
+class WebhookProcessingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.variant, self.order, self.payment = create_paid_order_setup()
+        patcher = mock.patch.object(SSLCommerzProvider, 'validate_transaction', return_value=VALID)
+        self.validate = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(SSLCommerzProvider, 'query_transaction', return_value=[FAILED])
+        self.query = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, name, **data):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse(f'payments:sslcommerz_{name}'), {'tran_id': 'TRAN-1', **data})
+
+    def test_success_is_acknowledged_and_applied(self):
+        response = self.post('success', val_id='VAL-1')
+        self.assertRedirects(response, reverse('checkout:order_confirmation', args=[self.order.order_number]), fetch_redirect_response=False)
+        self.payment.refresh_from_db()
+        self.order.refresh_from_db()
+        self.assertEqual((self.payment.status, self.payment.provider_reference), ('success', 'VAL-1'))
+        self.assertEqual((self.order.status, self.order.payment_status), ('confirmed', 'paid'))
+        self.assertEqual(stock(self.variant), 3)
+        self.assertTrue(WebhookEvent.objects.get().processed)
+
+    def test_duplicate_callbacks_settle_the_payment_once(self):
+        self.post('success', val_id='VAL-1')
+        self.assertEqual(self.post('ipn', val_id='VAL-1').status_code, 200)
+        self.post('fail')
+        self.assertEqual(self.validate.call_count, 1)
+        self.assertEqual(PaymentTransaction.objects.get().status, 'success')
+        self.assertEqual(stock(self.variant), 3)
+        self.assertEqual(WebhookEvent.objects.filter(processed=True).count(), 3)
+
+    def test_invalid_payment_is_not_applied(self):
+        self.validate.return_value = {'status': 'INVALID_TRANSACTION'}
+        self.post('ipn', val_id='VAL-1')
+        self.assertEqual(PaymentTransaction.objects.get().status, 'pending')
+        self.assertEqual(WebhookEvent.objects.get().error_message, 'Payment validation failed.')
+
+    def test_failure_cancels_and_releases_the_order(self):
+        self.post('fail')
+        self.order.refresh_from_db()
+        self.assertEqual(PaymentTransaction.objects.get().status, 'failed')
+        self.assertEqual((self.order.status, self.order.payment_status), ('cancelled', 'failed'))
+        self.assertEqual(stock(self.variant), 5)
+        self.query.assert_called_once_with('TRAN-1')
+
+    def test_validated_payment_after_a_failed_attempt_is_applied(self):
+        self.post('fail')
+        self.post('ipn', val_id='VAL-1')
+        self.payment.refresh_from_db()
+        self.order.refresh_from_db()
+        self.assertEqual((self.payment.status, self.payment.provider_reference), ('success', 'VAL-1'))
+        self.assertEqual((self.order.status, self.order.payment_status), ('confirmed', 'paid'))
+        self.assertEqual(stock(self.variant), 3)
+
+    def test_spoofed_fail_callback_is_ignored(self):
+        self.query.return_value = []
+        self.post('cancel')
+        self.order.refresh_from_db()
+        self.assertEqual(PaymentTransaction.objects.get().status, 'pending')
+        self.assertEqual(self.order.status, 'pending')
+        self.assertEqual(WebhookEvent.objects.get().error_message, 'Not confirmed by the gateway.')
+
+        # The gateway knows better: the customer paid
+        self.query.return_value = [FAILED, dict(VALID, val_id='VAL-2')]
+        self.post('fail')
+        self.payment.refresh_from_db()
+        self.assertEqual((self.payment.status, self.payment.provider_reference), ('success', 'VAL-2'))
+        self.assertEqual(stock(self.variant), 3)
+
+    def test_unreachable_gateway_is_retried_with_backoff(self):
+        self.validate.return_value = None
+        self.post('ipn', val_id='VAL-1')
+        event = WebhookEvent.objects.get()
+        self.assertFalse(event.processed)
+        self.assertEqual(event.attempts, 1)
+        self.assertGreater(event.next_attempt_at, timezone.now())
+
+        self.validate.return_value = VALID
+        WebhookEvent.objects.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+        out = StringIO()
+        call_command('replay_webhook_events', stdout=out)
+        self.assertIn('Processed 1 webhook events; 0 still failing.', out.getvalue())
+        self.assertEqual(PaymentTransaction.objects.get().status, 'success')
+
+    def test_drain_requeues_lost_and_due_events_but_not_exhausted_ones(self):
+        def event(**fields):
+            created = WebhookEvent.objects.create(provider='sslcommerz', event_type='ipn', payload={'tran_id': 'TRAN-1'})
+            WebhookEvent.objects.filter(pk=created.pk).update(**fields)
+            return created.pk
+
+        old = timezone.now() - timedelta(hours=1)
+        lost = event(created_at=old)
+        event()
+        due = event(attempts=1, next_attempt_at=timezone.now() - timedelta(seconds=1))
+        event(created_at=old, attempts=5)
+        with mock.patch('apps.payments.tasks.dispatch') as dispatch:
+            drain_webhook_events()
+        self.assertEqual([call.args[0] for call in dispatch.call_args_list], [lost, due])
+
+    def test_intake_does_not_call_the_gateway(self):
+        with override_settings(PAYMENTS_WEBHOOK_QUEUE='celery'), \
+                mock.patch('apps.payments.tasks.process_webhook_event.apply_async') as apply_async:
+            self.post('ipn', val_id='VAL-1')
+        event = WebhookEvent.objects.get()
+        apply_async.assert_called_once_with((event.pk,), countdown=0)
+        self.validate.assert_not_called()
+        self.assertEqual(process_event(event.pk), None)
+        self.assertEqual(PaymentTransaction.objects.get().status, 'success')
+
+
+class DuplicateCallbackStressTests(ConcurrentWritesMixin, TransactionTestCase):
+    def test_parallel_duplicates_apply_once(self):
+        variant, order, payment = create_paid_order_setup()
+        events = [
+            WebhookEvent.objects.create(provider='sslcommerz', event_type=event_type, payload={'tran_id': 'TRAN-1', 'val_id': 'VAL-1'}, transaction_id='TRAN-1')
+            for event_type in ['success', 'ipn'] * 5
+        ]
+        barrier = threading.Barrier(len(events))
+
+        def worker(event):
+            try:
+                barrier.wait()
+                process_event(event.pk)
+            finally:
+                connection.close()
+
+        with mock.patch.object(SSLCommerzProvider, 'validate_transaction', return_value=VALID):
+            workers = [threading.Thread(target=worker, args=(event,)) for event in events]
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+
+        self.assertEqual(stock(variant), 3)
+        self.assertEqual(WebhookEvent.objects.filter(processed=True).count(), len(events))
@@ -1,18 +1,177 @@
-import requests
+"""
+SSLCommerz gateway client.
+
+All calls share one keep-alive requests.Session per process, with connect
+and read timeouts. Failed calls are retried a bounded number of times with
+exponential backoff and full jitter; payment initialization (a POST that
+creates a gateway session) is only retried when the connection could not be
+made. A circuit breaker stops calling the gateway for a while after
+repeated failures, so a gateway outage fails checkouts fast instead of
+tying up workers.
+
+Validation results are cached by val_id, so duplicate callbacks and
+re-checks of a settled payment do not go back to the gateway.
+"""
 import logging
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
 from django.conf import settings
+from django.core.cache import cache
 from django.urls import reverse
 from django.utils import timezone
+from .models import PaymentTransaction
 
 logger = logging.getLogger(__name__)
 
+POOL_SIZE = 10
+
+# Validation statuses of a genuine payment ('VALIDATED' once it was validated before)
+VALID_STATUSES = ('VALID', 'VALIDATED')
+
+_lock = threading.Lock()
+_session = None
+_breaker = None
+
+
+class GatewayUnavailable(Exception):
+    """The gateway could not be reached, or the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures; while open, calls fail
+    fast. After `reset_after` seconds one trial call is let through, and its
+    outcome closes the circuit or opens it again. State is per process.
+    """
+    
+    def __init__(self, threshold, reset_after):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+    
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+    
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if not self._trial and time.monotonic() - self.opened_at >= self.reset_after:
+                self._trial = True
+                return True
+            return False
+    
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+def get_session():
+    """The process-wide pooled HTTP session."""
+    global _session
+    with _lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=2, pool_maxsize=POOL_SIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
+
+def get_breaker():
+    global _breaker
+    with _lock:
+        if _breaker is None:
+            _breaker = CircuitBreaker(
+                getattr(settings, 'SSLCOMMERZ_BREAKER_THRESHOLD', 5),
+                getattr(settings, 'SSLCOMMERZ_BREAKER_RESET', 30),
+            )
+        return _breaker
+
+
+def reset_client():
+    """Drop the pooled session and the breaker state (e.g. after settings change)."""
+    global _session, _breaker
+    with _lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+        _breaker = None
+
+
+def validation_cache_key(val_id):
+    return f'sslcommerz:validation:{val_id}'
+
+
+def gateway_request(method, url, idempotent=True, **kwargs):
+    """
+    Call the gateway and return the response. Connection failures are always
+    retried; read timeouts, 5xx responses and other request errors (e.g. a
+    broken chunked response) only when `idempotent`. Raises
+    GatewayUnavailable when the retries are exhausted or the circuit is
+    open, and requests.HTTPError on a 4xx response.
+    """
+    breaker = get_breaker()
+    if not breaker.allow():
+        raise GatewayUnavailable('SSLCommerz is temporarily unavailable')
+    
+    timeout = (getattr(settings, 'SSLCOMMERZ_CONNECT_TIMEOUT', 3.05), getattr(settings, 'SSLCOMMERZ_READ_TIMEOUT', 20))
+    attempts = getattr(settings, 'SSLCOMMERZ_MAX_RETRIES', 2) + 1
+    backoff = getattr(settings, 'SSLCOMMERZ_RETRY_BACKOFF', 0.5)
+    for attempt in range(attempts):
+        try:
+            response = get_session().request(method, url, timeout=timeout, **kwargs)
+        except requests.ConnectionError as e:
+            # Includes connect timeouts: the request never reached the gateway
+            error, retry = e, True
+        except requests.Timeout as e:
+            error, retry = e, idempotent
+        except requests.RequestException as e:
+            # Counted as a failure like the others, so a half-open circuit's
+            # trial call always settles the breaker
+            error, retry = e, idempotent
+        else:
+            if response.status_code < 500:
+                breaker.record_success()
+                response.raise_for_status()
+                return response
+            error, retry = requests.HTTPError(f'{response.status_code} Server Error', response=response), idempotent
+        
+        if not retry or attempt == attempts - 1:
+            break
+        logger.warning(f"SSLCommerz call failed ({error}), retrying")
+        time.sleep(random.uniform(0, backoff * 2 ** attempt))
+    
+    breaker.record_failure()
+    raise GatewayUnavailable(str(error)) from error
+
+
 class SSLCommerzProvider:
     def __init__(self):
         self.store_id = getattr(settings, 'SSLCOMMERZ_STORE_ID', '')
         self.store_pass = getattr(settings, 'SSLCOMMERZ_STORE_PASS', '')
         self.sandbox = getattr(settings, 'SSLCOMMERZ_SANDBOX', True)
         
-        if self.sandbox:
+        if getattr(settings, 'SSLCOMMERZ_BASE_URL', ''):
+            self.base_url = settings.SSLCOMMERZ_BASE_URL.rstrip('/')
+        elif self.sandbox:
             self.base_url = "https://sandbox.sslcommerz.com"
         else:
             self.base_url = "https://securepay.sslcommerz.com"
@@ -64,8 +223,7 @@ class SSLCommerzProvider:
         
         try:
             logger.info(f"SSLCommerz Post Data: {post_data}")
-            response = requests.post(url, data=post_data)
-            response.raise_for_status()
+            response = gateway_request('POST', url, idempotent=False, data=post_data)
             data = response.json()
             
             if data.get('status') == 'SUCCESS':
@@ -74,6 +232,9 @@ class SSLCommerzProvider:
                 error_msg = data.get('failedreason') or str(data)
                 logger.error(f"SSLCommerz Init Error: {error_msg} | Full response: {data}")
                 return None, error_msg
+        except GatewayUnavailable as e:
+            logger.error(f"SSLCommerz Unavailable: {str(e)}")
+            return None, 'The payment gateway is not responding. Please try again shortly.'
         except Exception as e:
             logger.exception(f"SSLCommerz Request Exception: {str(e)}")
             return None, str(e)
@@ -81,7 +242,34 @@ class SSLCommerzProvider:
     def validate_transaction(self, val_id):
         """
         Validate a transaction using val_id.
+        
+        Results are cached by val_id: a valid payment for
+        SSLCOMMERZ_VALIDATION_CACHE_TTL seconds (and for good, through the
+        provider_response of the transaction it settled), anything else
+        for SSLCOMMERZ_VALIDATION_NEGATIVE_TTL seconds. Failed calls are
+        not cached.
         """
+        key = validation_cache_key(val_id)
+        result = cache.get(key)
+        if result is not None:
+            return result
+        
+        settled = PaymentTransaction.objects.filter(
+            provider_reference=val_id, status='success'
+        ).values_list('provider_response', flat=True).first()
+        if settled and settled.get('status') in VALID_STATUSES:
+            cache.set(key, settled, getattr(settings, 'SSLCOMMERZ_VALIDATION_CACHE_TTL', 86400))
+            return settled
+        
+        result = self._request_validation(val_id)
+        if result is not None:
+            if result.get('status') in VALID_STATUSES:
+                cache.set(key, result, getattr(settings, 'SSLCOMMERZ_VALIDATION_CACHE_TTL', 86400))
+            else:
+                cache.set(key, result, getattr(settings, 'SSLCOMMERZ_VALIDATION_NEGATIVE_TTL', 60))
+        return result
+    
+    def _request_validation(self, val_id):
         url = f"{self.base_url}/validator/api/validationserverAPI.php"
         params = {
             'val_id': val_id,
@@ -91,9 +279,39 @@ class SSLCommerzProvider:
         }
         
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
+            response = gateway_request('GET', url, params=params)
             return response.json()
+        except GatewayUnavailable as e:
+            logger.error(f"SSLCommerz Validation Unavailable: {str(e)}")
+            return None
         except Exception as e:
             logger.exception("SSLCommerz Validation Exception")
             return None
+    
+    def query_transaction(self, tran_id):
+        """
+        Look up the gateway's payment attempts for our tran_id. Returns the
+        list of attempts (empty if the customer never paid), or None if the
+        gateway could not be asked.
+        """
+        url = f"{self.base_url}/validator/api/merchantTransIDvalidationAPI.php"
+        params = {
+            'tran_id': tran_id,
+            'store_id': self.store_id,
+            'store_passwd': self.store_pass,
+            'format': 'json',
+        }
+        
+        try:
+            response = gateway_request('GET', url, params=params)
+            data = response.json()
+            if data.get('APIConnect') not in (None, 'DONE'):
+                logger.error(f"SSLCommerz Transaction Query Error: {data}")
+                return None
+            return data.get('element') or []
+        except GatewayUnavailable as e:
+            logger.error(f"SSLCommerz Transaction Query Unavailable: {str(e)}")
+            return None
+        except Exception as e:
+            logger.exception("SSLCommerz Transaction Query Exception")
+            return None
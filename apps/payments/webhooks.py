@@ -0,0 +1,267 @@
+"""
+Payment webhook processing.
+
+The callback views only append a WebhookEvent and acknowledge; the event is
+handed to a worker once the row is committed. PAYMENTS_WEBHOOK_QUEUE picks
+the worker: a Celery task ('celery'), a process-local thread pool
+('thread', the fallback when no broker runs) or the committing request
+itself ('sync').
+
+process_event() is idempotent. The gateway is asked outside any
+transaction: success and IPN callbacks are checked with the validation API,
+fail and cancel callbacks (which anyone can post) with the transaction query
+API, and nothing happens unless the gateway confirms the outcome. The state
+change then runs under select_for_update on the event and the
+PaymentTransaction, and only moves a transaction forward (pending ->
+success/failed/cancelled, and failed/cancelled -> success when the customer
+paid after all; never away from success). Duplicate success and IPN
+callbacks therefore settle the payment once. A failed attempt is
+retried after an exponential backoff with jitter, up to
+PAYMENTS_WEBHOOK_MAX_ATTEMPTS; the replay_webhook_events command picks up
+whatever is left.
+"""
+import logging
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from apps.checkout.reservations import convert_for_order, release_for_order
+from apps.promotions.engine import release_for_order as release_promotions
+from .models import PaymentTransaction, WebhookEvent
+from .utils import VALID_STATUSES, SSLCommerzProvider
+
+logger = logging.getLogger(__name__)
+
+# Event types and the transaction status they lead to
+TRANSITIONS = {
+    'success': 'success',
+    'ipn': 'success',
+    'failed': 'failed',
+    'cancelled': 'cancelled',
+}
+# Statuses a transaction may still leave
+OPEN_STATUSES = ('pending', 'processing')
+# Statuses a validated payment may still overturn
+UNPAID_STATUSES = ('failed', 'cancelled')
+# Gateway statuses of a finished, unsuccessful attempt and what they settle to
+CLOSED_STATUSES = {
+    'FAILED': 'failed',
+    'CANCELLED': 'cancelled',
+}
+
+_lock = threading.Lock()
+_executor = None
+
+
+class WebhookError(Exception):
+    """Processing failed in a way worth retrying (e.g. the gateway was unreachable)."""
+
+
+def record_event(event_type, data):
+    """Store a callback as received and queue it once committed."""
+    event = WebhookEvent.objects.create(
+        provider='sslcommerz',
+        event_type=event_type,
+        payload=data,
+        transaction_id=data.get('tran_id') or '',
+    )
+    transaction.on_commit(lambda: dispatch(event.pk))
+    return event
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'PAYMENTS_WEBHOOK_WORKERS', 4), thread_name_prefix='webhooks'
+            )
+        return _executor
+
+
+def _run_in_thread(event_id):
+    close_old_connections()
+    try:
+        delay = process_event(event_id)
+        if delay is not None:
+            threading.Timer(delay, dispatch, args=(event_id,)).start()
+    except Exception:
+        logger.exception(f"Webhook event {event_id}: processing crashed")
+    finally:
+        close_old_connections()
+
+
+def dispatch(event_id, countdown=0):
+    """Hand an event to the configured worker."""
+    queue = getattr(settings, 'PAYMENTS_WEBHOOK_QUEUE', 'thread')
+    if queue == 'celery':
+        from .tasks import process_webhook_event
+        process_webhook_event.apply_async((event_id,), countdown=countdown)
+    elif queue == 'sync':
+        process_event(event_id)
+    else:
+        _get_executor().submit(_run_in_thread, event_id)
+
+
+def get_backoff(attempts):
+    """Seconds to wait after `attempts` failed attempts: exponential, with jitter."""
+    delay = getattr(settings, 'PAYMENTS_WEBHOOK_RETRY_BACKOFF', 30) * 2 ** (attempts - 1)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def can_move(current, status):
+    """Whether a transaction in `current` status may be settled to `status`."""
+    return current in OPEN_STATUSES or (status == 'success' and current in UNPAID_STATUSES)
+
+
+def gateway_outcome(transaction_id, attempts):
+    """
+    What the gateway's `attempts` for a transaction (from its transaction
+    query API) settle it to: (status, response, reference), or None while
+    the gateway has no outcome.
+    """
+    attempts = [attempt for attempt in attempts if attempt.get('tran_id', transaction_id) == transaction_id]
+    for attempt in attempts:
+        if attempt.get('status') in VALID_STATUSES:
+            return 'success', attempt, attempt.get('val_id', '')
+    if attempts and attempts[-1].get('status') in CLOSED_STATUSES:
+        return CLOSED_STATUSES[attempts[-1]['status']], attempts[-1], ''
+    return None
+
+
+def _validate(event):
+    """Gateway outcome of a success/IPN callback; None if the payment is not valid."""
+    val_id = event.payload.get('val_id')
+    if not val_id:
+        return None
+    result = SSLCommerzProvider().validate_transaction(val_id)
+    if result is None:
+        raise WebhookError(f'Could not validate {val_id}')
+    if result.get('status') not in VALID_STATUSES or result.get('tran_id', event.transaction_id) != event.transaction_id:
+        return None
+    return 'success', result, val_id
+
+
+def _confirm(event):
+    """Gateway outcome of a fail/cancel callback; None if the gateway has none."""
+    attempts = SSLCommerzProvider().query_transaction(event.transaction_id)
+    if attempts is None:
+        raise WebhookError(f'Could not query {event.transaction_id}')
+    return gateway_outcome(event.transaction_id, attempts)
+
+
+def _apply(event, pmt_transaction, outcome):
+    """Move the locked transaction (and its order) to the confirmed outcome, if it may still move."""
+    target = TRANSITIONS.get(event.event_type)
+    if target is None or not can_move(pmt_transaction.status, target):
+        return
+    if outcome is None:
+        event.error_message = 'Payment validation failed.' if target == 'success' else 'Not confirmed by the gateway.'
+        return
+    status, response, reference = outcome
+    if not can_move(pmt_transaction.status, status):
+        return
+    settle(pmt_transaction, status, response, reference=reference)
+    if status == 'success':
+        logger.info(f"Webhook: Order {pmt_transaction.order.order_number} marked as PAID via {event.event_type}.")
+
+
+def settle(pmt_transaction, status, response, reference=''):
+    """
+    Move a locked transaction to `status` (see can_move) and carry its order
+    along: a successful payment confirms the order and takes its stock, any
+    other outcome cancels it and frees the stock and promotions it held (as
+    apps.checkout.views.abandon_order does).
+    """
+    order = pmt_transaction.order
+    pmt_transaction.status = status
+    pmt_transaction.provider_response = response
+    if status == 'success':
+        pmt_transaction.provider_reference = reference
+        pmt_transaction.save()
+
+        order.payment_status = 'paid'
+        order.status = 'confirmed'
+        order.payment_method = 'sslcommerz'
+        order.payment_transaction_id = pmt_transaction.transaction_id
+        order.save()
+        convert_for_order(order)
+    else:
+        pmt_transaction.save()
+
+        order.payment_status = 'failed'
+        order.status = 'cancelled'
+        order.save(update_fields=['status', 'payment_status', 'updated_at'])
+        release_for_order(order)
+        release_promotions(order)
+
+
+def process_event(event_id):
+    """
+    Process one event. Returns None when done (or nothing was left to do),
+    or the seconds to wait before retrying.
+    """
+    event = WebhookEvent.objects.filter(pk=event_id, processed=False).first()
+    if event is None:
+        return None
+
+    try:
+        outcome = None
+        target = TRANSITIONS.get(event.event_type)
+        current = PaymentTransaction.objects.filter(
+            transaction_id=event.transaction_id
+        ).values_list('status', flat=True).first()
+        # A duplicate of a settled payment needs no gateway call
+        if target is not None and current is not None and can_move(current, target):
+            outcome = _validate(event) if target == 'success' else _confirm(event)
+
+        with transaction.atomic():
+            event = WebhookEvent.objects.select_for_update().get(pk=event_id)
+            if event.processed:
+                return None
+            pmt_transaction = PaymentTransaction.objects.select_for_update().select_related('order').filter(
+                transaction_id=event.transaction_id
+            ).first()
+            if pmt_transaction is None:
+                event.error_message = f'Transaction {event.transaction_id} not found.'
+            else:
+                _apply(event, pmt_transaction, outcome)
+            event.processed = True
+            event.processed_at = timezone.now()
+            event.attempts += 1
+            event.next_attempt_at = None
+            event.save(update_fields=['processed', 'processed_at', 'attempts', 'next_attempt_at', 'error_message'])
+        return None
+    except Exception as e:
+        logger.warning(f"Webhook event {event_id}: attempt failed: {e}")
+        attempts = event.attempts + 1
+        delay = get_backoff(attempts)
+        give_up = attempts >= getattr(settings, 'PAYMENTS_WEBHOOK_MAX_ATTEMPTS', 5)
+        WebhookEvent.objects.filter(pk=event_id).update(
+            attempts=attempts,
+            error_message=str(e),
+            next_attempt_at=None if give_up else timezone.now() + timedelta(seconds=delay),
+        )
+        return None if give_up else delay
+
+
+def pending_events(stuck_after=None, exhausted=True):
+    """
+    Unprocessed events that no worker is going to pick up: due for retry,
+    out of attempts (unless `exhausted` is False), or (with `stuck_after`)
+    never attempted and older than that timedelta.
+    """
+    now = timezone.now()
+    max_attempts = getattr(settings, 'PAYMENTS_WEBHOOK_MAX_ATTEMPTS', 5)
+    events = WebhookEvent.objects.filter(processed=False)
+    due = events.filter(next_attempt_at__lte=now)
+    if stuck_after is not None:
+        due = due | events.filter(next_attempt_at__isnull=True, created_at__lt=now - stuck_after)
+    if exhausted:
+        due = due | events.filter(next_attempt_at__isnull=True, attempts__gte=max_attempts)
+    else:
+        due = due.filter(attempts__lt=max_attempts)
+    return due.order_by('created_at')
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import TaxClass, Price
+from .models import TaxClass, Price, PriceSchedule
 
 
 @admin.register(TaxClass)
@@ -22,6 +22,7 @@ class PriceAdmin(admin.ModelAdmin):
     list_filter = ['currency', 'tax_class']
     search_fields = ['variant__sku', 'variant__product__name']
     raw_id_fields = ['variant']
+    readonly_fields = ['schedule', 'base_sale_price']
     
     def effective_price(self, obj):
         return f"৳{obj.effective_price:,.2f}"
@@ -32,3 +33,14 @@ class PriceAdmin(admin.ModelAdmin):
             return f"-{obj.discount_percent}%"
         return '-'
     discount_percent.short_description = 'Discount'
+
+
+@admin.register(PriceSchedule)
+class PriceScheduleAdmin(admin.ModelAdmin):
+    """Admin for PriceSchedule model."""
+    
+    list_display = ['variant', 'name', 'sale_price', 'starts_at', 'ends_at', 'is_active']
+    list_filter = ['is_active']
+    search_fields = ['name', 'variant__sku', 'variant__product__name']
+    raw_id_fields = ['variant']
+    date_hierarchy = 'starts_at'
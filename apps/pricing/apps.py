@@ -5,3 +5,6 @@ class PricingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.pricing'
     verbose_name = 'Pricing'
+
+    def ready(self):
+        import apps.pricing.signals
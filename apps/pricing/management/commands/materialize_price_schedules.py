@@ -0,0 +1,29 @@
+import time
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.pricing.schedules import materialize_schedules, next_boundary
+
+
+class Command(BaseCommand):
+    help = 'Apply the price schedule windows in effect now to variant sale prices and listings.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep running, waking at each window boundary.'
+        )
+        parser.add_argument(
+            '--max-sleep', type=int, default=300,
+            help='With --loop, the longest wait in seconds (picks up newly created schedules).'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            count = materialize_schedules()
+            self.stdout.write(self.style.SUCCESS(f'Updated {count} scheduled prices.'))
+            if not options['loop']:
+                return
+            now = timezone.now()
+            boundary = next_boundary(now)
+            wait = options['max_sleep'] if boundary is None else (boundary - now).total_seconds()
+            time.sleep(min(max(wait, 1), options['max_sleep']))
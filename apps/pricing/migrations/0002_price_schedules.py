@@ -0,0 +1,52 @@
+# Generated by Django 5.0.14 on 2026-10-17 00:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0008_listing_price_range'),
+        ('pricing', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='price',
+            name='base_sale_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=12, null=True, verbose_name='regular sale price'),
+        ),
+        migrations.CreateModel(
+            name='PriceSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(blank=True, max_length=200, verbose_name='name')),
+                ('sale_price', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='sale price')),
+                ('starts_at', models.DateTimeField(verbose_name='starts at')),
+                ('ends_at', models.DateTimeField(blank=True, help_text='Leave blank for no end', null=True, verbose_name='ends at')),
+                ('is_active', models.BooleanField(default=True, verbose_name='active')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('variant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_schedules', to='catalog.productvariant', verbose_name='variant')),
+            ],
+            options={
+                'verbose_name': 'price schedule',
+                'verbose_name_plural': 'price schedules',
+                'ordering': ['-starts_at', '-pk'],
+            },
+        ),
+        migrations.AddField(
+            model_name='price',
+            name='schedule',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='pricing.priceschedule', verbose_name='active schedule'),
+        ),
+        migrations.AddIndex(
+            model_name='priceschedule',
+            index=models.Index(fields=['is_active', 'starts_at'], name='pricing_pri_is_acti_c7783e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='priceschedule',
+            index=models.Index(fields=['is_active', 'ends_at'], name='pricing_pri_is_acti_a3acca_idx'),
+        ),
+    ]
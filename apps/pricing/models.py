@@ -83,6 +83,27 @@ class Price(models.Model):
         verbose_name='tax class'
     )
     
+    # Set by apps.pricing.schedules while a PriceSchedule window is in effect:
+    # sale_price then holds the scheduled price and base_sale_price the
+    # regular one, restored when the window ends
+    schedule = models.ForeignKey(
+        'PriceSchedule',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        editable=False,
+        verbose_name='active schedule'
+    )
+    base_sale_price = models.DecimalField(
+        'regular sale price',
+        max_digits=12,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        editable=False
+    )
+    
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
@@ -119,3 +140,45 @@ class Price(models.Model):
     def get_price_with_tax(self):
         """Get price including tax."""
         return self.effective_price + self.get_tax_amount()
+
+
+class PriceSchedule(models.Model):
+    """
+    A time-windowed sale price for a variant (e.g. a flash sale).
+    
+    Schedules are never evaluated on storefront requests: the
+    materialize_price_schedules command copies the winning window into
+    Price.sale_price (and the listing snapshots) at each window boundary.
+    When windows overlap, the one that started last wins.
+    """
+    
+    variant = models.ForeignKey(
+        ProductVariant,
+        on_delete=models.CASCADE,
+        related_name='price_schedules',
+        verbose_name='variant'
+    )
+    name = models.CharField('name', max_length=200, blank=True)
+    sale_price = models.DecimalField('sale price', max_digits=12, decimal_places=2)
+    starts_at = models.DateTimeField('starts at')
+    ends_at = models.DateTimeField('ends at', null=True, blank=True, help_text='Leave blank for no end')
+    is_active = models.BooleanField('active', default=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'price schedule'
+        verbose_name_plural = 'price schedules'
+        ordering = ['-starts_at', '-pk']
+        indexes = [
+            models.Index(fields=['is_active', 'starts_at']),
+            models.Index(fields=['is_active', 'ends_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.variant} @ {self.sale_price} from {self.starts_at:%Y-%m-%d %H:%M}"
+    
+    def covers(self, at):
+        """Check if the window is in effect at `at`."""
+        return self.is_active and self.starts_at <= at and (self.ends_at is None or at < self.ends_at)
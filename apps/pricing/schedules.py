@@ -0,0 +1,95 @@
+"""
+Scheduled sale prices.
+
+resolve_schedules()/resolve_price() answer "what does this variant cost at
+time T" from PriceSchedule rows. Storefront requests never call them:
+materialize_schedules() writes the answer into Price.sale_price, in bulk,
+for every variant whose winning window changed, then refreshes the affected
+listing snapshots and makes stored cart prices stale. The
+materialize_price_schedules command runs it at window boundaries.
+"""
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from apps.cart.cart import invalidate_cart_prices
+from apps.catalog.models import ProductVariant
+from apps.catalog.signals import schedule_listing_refresh
+from .models import Price, PriceSchedule
+
+
+def covering(at, variant_ids=None):
+    """Schedules in effect at `at`."""
+    schedules = PriceSchedule.objects.filter(is_active=True, starts_at__lte=at).filter(
+        Q(ends_at__isnull=True) | Q(ends_at__gt=at)
+    )
+    if variant_ids is not None:
+        schedules = schedules.filter(variant_id__in=variant_ids)
+    return schedules
+
+
+def resolve_schedules(at, variant_ids=None, ignore=()):
+    """The winning schedule per variant at `at`, as {variant_id: PriceSchedule}."""
+    winners = {}
+    for schedule in covering(at, variant_ids).exclude(pk__in=ignore).order_by('variant_id', '-starts_at', '-pk'):
+        winners.setdefault(schedule.variant_id, schedule)
+    return winners
+
+
+def resolve_price(variant, at=None):
+    """The effective selling price of `variant` at `at` (default: now), or None if it isn't priced."""
+    price = variant.get_price()
+    if price is None:
+        return None
+    schedule = resolve_schedules(at or timezone.now(), [variant.pk]).get(variant.pk)
+    if schedule is not None:
+        return schedule.sale_price
+    regular = price.base_sale_price if price.schedule_id else price.sale_price
+    return regular or price.list_price
+
+
+def next_boundary(after):
+    """The first window start or end after `after`, or None."""
+    starts = PriceSchedule.objects.filter(is_active=True, starts_at__gt=after).order_by('starts_at').values_list('starts_at', flat=True).first()
+    ends = PriceSchedule.objects.filter(is_active=True, ends_at__gt=after).order_by('ends_at').values_list('ends_at', flat=True).first()
+    return min(filter(None, [starts, ends]), default=None)
+
+
+def materialize_schedules(now=None, variant_ids=None, ignore=()):
+    """
+    Bring Price.sale_price in line with the schedules in effect at `now`
+    (default: now), optionally only for `variant_ids` and disregarding the
+    schedules in `ignore` (one being deleted). Only variants that have a
+    window in effect or had one materialized are read. Returns the number
+    of prices changed.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        winners = resolve_schedules(now, variant_ids, ignore)
+        prices = Price.objects.select_for_update().filter(Q(variant_id__in=list(winners)) | Q(schedule__isnull=False))
+        if variant_ids is not None:
+            prices = prices.filter(variant_id__in=variant_ids)
+
+        changed = []
+        for price in prices:
+            schedule = winners.get(price.variant_id)
+            if schedule is None:
+                # The window ended: back to the regular sale price
+                price.sale_price, price.base_sale_price, price.schedule = price.base_sale_price, None, None
+            elif price.schedule_id == schedule.pk and price.sale_price == schedule.sale_price:
+                continue
+            else:
+                if price.schedule_id is None:
+                    price.base_sale_price = price.sale_price
+                price.sale_price, price.schedule = schedule.sale_price, schedule
+            price.updated_at = now
+            changed.append(price)
+        if not changed:
+            return 0
+
+        # bulk_update skips the Price signal receivers; do their work once for the batch
+        Price.objects.bulk_update(changed, ['sale_price', 'base_sale_price', 'schedule', 'updated_at'])
+        product_ids = ProductVariant.objects.filter(pk__in=[price.variant_id for price in changed]).values_list('product_id', flat=True).distinct()
+        for product_id in product_ids:
+            schedule_listing_refresh(product_id)
+        transaction.on_commit(invalidate_cart_prices)
+    return len(changed)
@@ -0,0 +1,17 @@
+from django.db import transaction
+from django.db.models.signals import post_save, pre_delete
+from django.dispatch import receiver
+from .models import PriceSchedule
+from .schedules import materialize_schedules
+
+
+@receiver(post_save, sender=PriceSchedule)
+def materialize_on_schedule_save(sender, instance, **kwargs):
+    # A window that is already open (or was edited while open) takes effect at once
+    transaction.on_commit(lambda: materialize_schedules(variant_ids=[instance.variant_id]))
+
+
+@receiver(pre_delete, sender=PriceSchedule)
+def materialize_on_schedule_delete(sender, instance, **kwargs):
+    # Before the price is detached from the window, so its regular sale price is restored
+    materialize_schedules(variant_ids=[instance.variant_id], ignore=[instance.pk])
@@ -0,0 +1,79 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from apps.cart.cart import get_price_version
+from apps.catalog.models import Category, Product, ProductListing, ProductVariant
+from .models import Price, PriceSchedule
+from .schedules import materialize_schedules, next_boundary, resolve_price
+
+
+class PriceScheduleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+        category = Category.objects.create(name="Laptops", slug="laptops")
+        self.product = Product.objects.create(name="Laptop", slug="laptop", category=category)
+        self.variant = ProductVariant.objects.create(product=self.product, sku="LAP-1")
+        self.price = Price.objects.create(variant=self.variant, list_price=Decimal('100.00'), sale_price=Decimal('95.00'))
+
+    def schedule(self, sale_price, starts_in, ends_in=None, **kwargs):
+        # Created without running the save receiver's immediate materialization
+        return PriceSchedule.objects.bulk_create([PriceSchedule(
+            variant=self.variant,
+            sale_price=sale_price,
+            starts_at=self.now + timedelta(hours=starts_in),
+            ends_at=self.now + timedelta(hours=ends_in) if ends_in is not None else None,
+            **kwargs
+        )])[0]
+
+    def test_resolve_price_at_a_time(self):
+        self.schedule(Decimal('80.00'), 1, 5)
+        self.schedule(Decimal('70.00'), 2, 3)
+        self.schedule(Decimal('10.00'), 0, 10, is_active=False)
+        hours = [0.5, 1.5, 2.5, 4, 6]
+        self.assertEqual(
+            [resolve_price(self.variant, self.now + timedelta(hours=h)) for h in hours],
+            [Decimal('95.00'), Decimal('80.00'), Decimal('70.00'), Decimal('80.00'), Decimal('95.00')]
+        )
+        self.assertEqual(next_boundary(self.now), self.now + timedelta(hours=1))
+
+    def test_materializer_flips_sale_price_and_listing_at_boundaries(self):
+        window = self.schedule(Decimal('60.00'), 1, 2)
+        self.assertEqual(materialize_schedules(self.now), 0)
+
+        version = get_price_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(materialize_schedules(self.now + timedelta(hours=1)), 1)
+        self.price.refresh_from_db()
+        self.assertEqual((self.price.sale_price, self.price.base_sale_price, self.price.schedule), (Decimal('60.00'), Decimal('95.00'), window))
+        self.assertEqual(ProductListing.objects.get(product=self.product).price, Decimal('60.00'))
+        self.assertNotEqual(get_price_version(), version)
+        self.assertEqual(materialize_schedules(self.now + timedelta(hours=1.5)), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(materialize_schedules(self.now + timedelta(hours=2)), 1)
+        self.price.refresh_from_db()
+        self.assertEqual((self.price.sale_price, self.price.base_sale_price, self.price.schedule), (Decimal('95.00'), None, None))
+        self.assertEqual(ProductListing.objects.get(product=self.product).price, Decimal('95.00'))
+
+    def test_open_window_applies_on_save_and_is_undone_on_delete(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            window = PriceSchedule.objects.create(variant=self.variant, sale_price=Decimal('50.00'), starts_at=self.now)
+        self.price.refresh_from_db()
+        self.assertEqual(self.price.sale_price, Decimal('50.00'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            window.delete()
+        self.price.refresh_from_db()
+        self.assertEqual((self.price.sale_price, self.price.schedule), (Decimal('95.00'), None))
+
+    def test_command(self):
+        self.schedule(Decimal('60.00'), -1)
+        out = StringIO()
+        call_command('materialize_price_schedules', stdout=out)
+        self.assertIn('Updated 1 scheduled prices.', out.getvalue())
+        self.assertEqual(Price.objects.get().sale_price, Decimal('60.00'))
@@ -1 +1,27 @@
 from django.contrib import admin
+from .models import Promotion, PromotionRedemption
+
+
+@admin.register(Promotion)
+class PromotionAdmin(admin.ModelAdmin):
+    """Admin for Promotion model."""
+    
+    list_display = [
+        'name', 'code', 'rule_type', 'value', 'scope', 'is_active',
+        'starts_at', 'ends_at', 'usage_count', 'usage_limit'
+    ]
+    list_filter = ['rule_type', 'scope', 'is_active']
+    search_fields = ['name', 'code']
+    filter_horizontal = ['categories', 'brands']
+    raw_id_fields = ['variants']
+    readonly_fields = ['usage_count']
+
+
+@admin.register(PromotionRedemption)
+class PromotionRedemptionAdmin(admin.ModelAdmin):
+    """Admin for PromotionRedemption model."""
+    
+    list_display = ['promotion', 'order', 'amount', 'created_at']
+    list_filter = ['promotion']
+    search_fields = ['promotion__name', 'promotion__code', 'order__order_number']
+    raw_id_fields = ['promotion', 'order']
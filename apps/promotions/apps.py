@@ -5,3 +5,6 @@ class PromotionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.promotions'
     verbose_name = 'Promotions'
+
+    def ready(self):
+        import apps.promotions.signals
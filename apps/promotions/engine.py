@@ -0,0 +1,248 @@
+"""
+Promotion evaluation.
+
+Running promotions are compiled into an index (plain dicts keyed by variant,
+category and brand id, with category scopes expanded to their subcategories)
+cached through apps.core.site_cache under the 'promotions' namespace. The
+signal receivers bump the namespace whenever a promotion or the category tree
+changes, so evaluating a cart costs O(lines + applicable rules) and no
+queries.
+
+Usage limits are enforced when the order is placed: redeem() increments each
+counter with a conditional UPDATE (WHERE usage_count < usage_limit), so two
+checkouts can't both take the last use.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from apps.catalog.models import CategoryClosure
+from apps.core import site_cache
+from .models import Promotion, PromotionRedemption
+
+
+CENT = Decimal('0.01')
+
+
+class PromotionUnavailable(Exception):
+    """A promotion was used up (or withdrawn) before the order could redeem it."""
+
+    def __init__(self, names):
+        self.names = list(names)
+        super().__init__(f"Promotions no longer available: {', '.join(self.names)}")
+
+
+def normalize_code(code):
+    return (code or '').strip().upper()
+
+
+def _money(value):
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def _running():
+    now = timezone.now()
+    return Promotion.objects.filter(is_active=True).filter(
+        Q(ends_at__isnull=True) | Q(ends_at__gt=now)
+    ).filter(
+        Q(usage_limit__isnull=True) | Q(usage_count__lt=F('usage_limit'))
+    )
+
+
+def build_index():
+    """Compile the running promotions into lookup tables."""
+    promotions = list(_running().prefetch_related('categories', 'brands', 'variants'))
+
+    category_ids = {category.pk for promotion in promotions for category in promotion.categories.all()}
+    subtree = {}
+    for ancestor_id, descendant_id in CategoryClosure.objects.filter(ancestor_id__in=category_ids).values_list('ancestor_id', 'descendant_id'):
+        subtree.setdefault(ancestor_id, set()).add(descendant_id)
+
+    index = {'rules': {}, 'all': [], 'variant': {}, 'category': {}, 'brand': {}, 'codes': {}}
+    for rank, promotion in enumerate(promotions):
+        index['rules'][promotion.pk] = {
+            'id': promotion.pk,
+            'rank': rank,
+            'name': promotion.name,
+            'code': promotion.code,
+            'rule_type': promotion.rule_type,
+            'value': promotion.value,
+            'buy_quantity': promotion.buy_quantity,
+            'get_quantity': promotion.get_quantity,
+            'min_subtotal': promotion.min_subtotal,
+            'starts_at': promotion.starts_at,
+            'ends_at': promotion.ends_at,
+        }
+        if promotion.code:
+            index['codes'][promotion.code] = promotion.pk
+
+        if promotion.scope == 'all':
+            index['all'].append(promotion.pk)
+            continue
+        if promotion.scope == 'category':
+            keys = set()
+            for category in promotion.categories.all():
+                keys |= subtree.get(category.pk, {category.pk})
+        elif promotion.scope == 'brand':
+            keys = {brand.pk for brand in promotion.brands.all()}
+        else:
+            keys = {variant.pk for variant in promotion.variants.all()}
+        for key in keys:
+            index[promotion.scope].setdefault(key, []).append(promotion.pk)
+    return index
+
+
+def get_index():
+    return site_cache.get_or_build('promotions', 'index', build_index)
+
+
+def get_version():
+    """Changes whenever the index does; part of the checkout totals memo key."""
+    return site_cache.get_version('promotions')
+
+
+def invalidate_index():
+    site_cache.bump('promotions')
+
+
+def _is_open(rule, now):
+    return (rule['starts_at'] is None or rule['starts_at'] <= now) and (rule['ends_at'] is None or now < rule['ends_at'])
+
+
+def find_code(code):
+    """The compiled rule of the running promotion with `code`, or None."""
+    index = get_index()
+    rule_id = index['codes'].get(normalize_code(code))
+    if rule_id is None:
+        return None
+    rule = index['rules'][rule_id]
+    return rule if _is_open(rule, timezone.now()) else None
+
+
+def _remaining(line):
+    return line['line_total'] - line['discount']
+
+
+def _line_discounts(rule, lines):
+    """Discount per line for `rule`, never more than what is left of each line."""
+    if rule['rule_type'] == 'percentage':
+        return [min(_money(_remaining(line) * rule['value'] / 100), _remaining(line)) for line in lines]
+
+    if rule['rule_type'] == 'fixed':
+        remaining = [_remaining(line) for line in lines]
+        scoped = sum(remaining, Decimal('0'))
+        amount = min(rule['value'], scoped)
+        if amount <= 0:
+            return [Decimal('0')] * len(lines)
+        # Spread over the lines in proportion, then settle the rounding
+        # difference on lines that have room, from the last line back
+        shares = [min(_money(amount * part / scoped), part) for part in remaining]
+        difference = amount - sum(shares, Decimal('0'))
+        for i in reversed(range(len(shares))):
+            if not difference:
+                break
+            if difference > 0:
+                change = min(difference, remaining[i] - shares[i])
+            else:
+                change = max(difference, -shares[i])
+            shares[i] += change
+            difference -= change
+        return shares
+
+    if rule['rule_type'] == 'bogo':
+        group = rule['buy_quantity'] + rule['get_quantity']
+        return [
+            min(_money(line['quantity'] // group * rule['get_quantity'] * line['unit_price']), _remaining(line))
+            for line in lines
+        ]
+
+    return [Decimal('0')] * len(lines)
+
+
+def evaluate(lines, promo_code=''):
+    """
+    Apply the promotions matching `lines` (the checkout totals lines, which
+    carry variant, category and brand ids) and `promo_code`, adding to each
+    line's 'discount'. Returns (discount, free_shipping, applied), where
+    `applied` lists {'id', 'name', 'code', 'amount'} per promotion used.
+    """
+    index = get_index()
+    code = normalize_code(promo_code)
+    now = timezone.now()
+    subtotal = sum((line['line_total'] for line in lines), Decimal('0'))
+
+    matched = {}
+    for line in lines:
+        for rule_id in (
+            index['all']
+            + index['variant'].get(line['variant_id'], [])
+            + index['category'].get(line['category_id'], [])
+            + index['brand'].get(line['brand_id'], [])
+        ):
+            matched.setdefault(rule_id, []).append(line)
+
+    discount = Decimal('0')
+    free_shipping = False
+    applied = []
+    for rule in sorted((index['rules'][rule_id] for rule_id in matched), key=lambda rule: rule['rank']):
+        if rule['code'] and rule['code'] != code:
+            continue
+        if not _is_open(rule, now) or subtotal < rule['min_subtotal']:
+            continue
+        if rule['rule_type'] == 'free_shipping':
+            free_shipping = True
+            applied.append({'id': rule['id'], 'name': rule['name'], 'code': rule['code'], 'amount': Decimal('0')})
+            continue
+
+        rule_lines = matched[rule['id']]
+        amount = Decimal('0')
+        for line, line_discount in zip(rule_lines, _line_discounts(rule, rule_lines)):
+            line['discount'] += line_discount
+            amount += line_discount
+        if amount > 0:
+            discount += amount
+            applied.append({'id': rule['id'], 'name': rule['name'], 'code': rule['code'], 'amount': amount})
+    return discount, free_shipping, applied
+
+
+def redeem(order, applied):
+    """
+    Count the order's use of the `applied` promotions (as returned by
+    evaluate) and record it. Must run inside the transaction that places the
+    order; raises PromotionUnavailable when a promotion has been used up or
+    withdrawn meanwhile.
+    """
+    unavailable = []
+    for entry in sorted(applied, key=lambda entry: entry['id']):
+        used = Promotion.objects.filter(pk=entry['id'], is_active=True).filter(
+            Q(usage_limit__isnull=True) | Q(usage_count__lt=F('usage_limit'))
+        ).update(usage_count=F('usage_count') + 1)
+        if not used:
+            unavailable.append(entry['name'])
+    if unavailable:
+        invalidate_index()
+        raise PromotionUnavailable(unavailable)
+
+    PromotionRedemption.objects.bulk_create([
+        PromotionRedemption(promotion_id=entry['id'], order=order, amount=entry['amount'])
+        for entry in applied
+    ])
+    used_up = Promotion.objects.filter(
+        pk__in=[entry['id'] for entry in applied], usage_limit__isnull=False, usage_count__gte=F('usage_limit')
+    )
+    if applied and used_up.exists():
+        transaction.on_commit(invalidate_index)
+
+
+def release_for_order(order):
+    """Give back the order's promotion uses (payment failed or order cancelled). Safe to call twice."""
+    with transaction.atomic():
+        redemptions = list(PromotionRedemption.objects.select_for_update().filter(order=order))
+        if not redemptions:
+            return 0
+        PromotionRedemption.objects.filter(pk__in=[r.pk for r in redemptions]).delete()
+        Promotion.objects.filter(
+            pk__in=[r.promotion_id for r in redemptions], usage_count__gt=0
+        ).update(usage_count=F('usage_count') - 1)
+        transaction.on_commit(invalidate_index)
+        return len(redemptions)
@@ -0,0 +1,70 @@
+# Generated by Django 5.0.14 on 2026-10-17 00:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('catalog', '0008_listing_price_range'),
+        ('orders', '0003_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Promotion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, verbose_name='name')),
+                ('code', models.CharField(blank=True, db_index=True, help_text='Leave blank to apply the promotion automatically', max_length=50, verbose_name='code')),
+                ('description', models.TextField(blank=True, verbose_name='description')),
+                ('rule_type', models.CharField(choices=[('percentage', 'Percentage off'), ('fixed', 'Fixed amount off'), ('bogo', 'Buy X get Y free'), ('free_shipping', 'Free shipping')], default='percentage', max_length=20, verbose_name='rule type')),
+                ('value', models.DecimalField(decimal_places=2, default=0, help_text='Percentage for percentage rules, amount for fixed rules', max_digits=12, verbose_name='value')),
+                ('buy_quantity', models.PositiveIntegerField(default=1, help_text='BOGO: units to buy', verbose_name='buy quantity')),
+                ('get_quantity', models.PositiveIntegerField(default=1, help_text='BOGO: units given free', verbose_name='get quantity')),
+                ('min_subtotal', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='minimum subtotal')),
+                ('scope', models.CharField(choices=[('all', 'All products'), ('category', 'Categories'), ('brand', 'Brands'), ('variant', 'Variants')], default='all', max_length=20, verbose_name='scope')),
+                ('is_active', models.BooleanField(default=True, verbose_name='active')),
+                ('starts_at', models.DateTimeField(blank=True, null=True, verbose_name='starts at')),
+                ('ends_at', models.DateTimeField(blank=True, null=True, verbose_name='ends at')),
+                ('usage_limit', models.PositiveIntegerField(blank=True, help_text='Leave blank for unlimited', null=True, verbose_name='usage limit')),
+                ('usage_count', models.PositiveIntegerField(default=0, editable=False, verbose_name='usage count')),
+                ('priority', models.IntegerField(default=0, help_text='Higher priority rules are applied first', verbose_name='priority')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('brands', models.ManyToManyField(blank=True, related_name='promotions', to='catalog.brand', verbose_name='brands')),
+                ('categories', models.ManyToManyField(blank=True, help_text='Subcategories are included', related_name='promotions', to='catalog.category', verbose_name='categories')),
+                ('variants', models.ManyToManyField(blank=True, related_name='promotions', to='catalog.productvariant', verbose_name='variants')),
+            ],
+            options={
+                'verbose_name': 'promotion',
+                'verbose_name_plural': 'promotions',
+                'ordering': ['-priority', 'pk'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PromotionRedemption',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='discount amount')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='promotion_redemptions', to='orders.order', verbose_name='order')),
+                ('promotion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='redemptions', to='promotions.promotion', verbose_name='promotion')),
+            ],
+            options={
+                'verbose_name': 'promotion redemption',
+                'verbose_name_plural': 'promotion redemptions',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='promotion',
+            index=models.Index(fields=['is_active', 'ends_at'], name='promotions__is_acti_4afad1_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='promotionredemption',
+            unique_together={('promotion', 'order')},
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-17 01:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0008_listing_price_range'),
+        ('promotions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='promotion',
+            constraint=models.UniqueConstraint(condition=models.Q(('code', ''), _negated=True), fields=('code',), name='promotion_unique_code'),
+        ),
+    ]
@@ -1 +1,130 @@
 from django.db import models
+from django.utils import timezone
+
+
+class Promotion(models.Model):
+    """
+    A discount rule.
+
+    Promotions without a code apply automatically; the others only when the
+    customer enters their code. The scope limits which cart lines qualify.
+    usage_count is only changed by conditional UPDATEs (see
+    apps.promotions.engine.redeem), so usage_limit holds under concurrent
+    checkouts.
+    """
+
+    RULE_TYPE_CHOICES = [
+        ('percentage', 'Percentage off'),
+        ('fixed', 'Fixed amount off'),
+        ('bogo', 'Buy X get Y free'),
+        ('free_shipping', 'Free shipping'),
+    ]
+
+    SCOPE_CHOICES = [
+        ('all', 'All products'),
+        ('category', 'Categories'),
+        ('brand', 'Brands'),
+        ('variant', 'Variants'),
+    ]
+
+    name = models.CharField('name', max_length=200)
+    code = models.CharField(
+        'code',
+        max_length=50,
+        blank=True,
+        db_index=True,
+        help_text='Leave blank to apply the promotion automatically'
+    )
+    description = models.TextField('description', blank=True)
+
+    rule_type = models.CharField('rule type', max_length=20, choices=RULE_TYPE_CHOICES, default='percentage')
+    value = models.DecimalField(
+        'value',
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        help_text='Percentage for percentage rules, amount for fixed rules'
+    )
+    buy_quantity = models.PositiveIntegerField('buy quantity', default=1, help_text='BOGO: units to buy')
+    get_quantity = models.PositiveIntegerField('get quantity', default=1, help_text='BOGO: units given free')
+    min_subtotal = models.DecimalField('minimum subtotal', max_digits=12, decimal_places=2, default=0)
+
+    # Scope
+    scope = models.CharField('scope', max_length=20, choices=SCOPE_CHOICES, default='all')
+    categories = models.ManyToManyField(
+        'catalog.Category',
+        blank=True,
+        related_name='promotions',
+        verbose_name='categories',
+        help_text='Subcategories are included'
+    )
+    brands = models.ManyToManyField('catalog.Brand', blank=True, related_name='promotions', verbose_name='brands')
+    variants = models.ManyToManyField('catalog.ProductVariant', blank=True, related_name='promotions', verbose_name='variants')
+
+    # Validity
+    is_active = models.BooleanField('active', default=True)
+    starts_at = models.DateTimeField('starts at', null=True, blank=True)
+    ends_at = models.DateTimeField('ends at', null=True, blank=True)
+    usage_limit = models.PositiveIntegerField('usage limit', null=True, blank=True, help_text='Leave blank for unlimited')
+    usage_count = models.PositiveIntegerField('usage count', default=0, editable=False)
+    priority = models.IntegerField('priority', default=0, help_text='Higher priority rules are applied first')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'promotion'
+        verbose_name_plural = 'promotions'
+        ordering = ['-priority', 'pk']
+        indexes = [
+            models.Index(fields=['is_active', 'ends_at']),
+        ]
+        constraints = [
+            # Blank codes are the automatic promotions, of which there can be many
+            models.UniqueConstraint(fields=['code'], condition=~models.Q(code=''), name='promotion_unique_code'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.code})" if self.code else self.name
+
+    def save(self, *args, **kwargs):
+        self.code = self.code.strip().upper()
+        super().save(*args, **kwargs)
+
+    def is_running(self, now=None):
+        """Check if the promotion is active, within its dates and not used up."""
+        now = now or timezone.now()
+        return (
+            self.is_active
+            and (self.starts_at is None or self.starts_at <= now)
+            and (self.ends_at is None or now < self.ends_at)
+            and (self.usage_limit is None or self.usage_count < self.usage_limit)
+        )
+
+
+class PromotionRedemption(models.Model):
+    """One use of a promotion by an order."""
+
+    promotion = models.ForeignKey(
+        Promotion,
+        on_delete=models.CASCADE,
+        related_name='redemptions',
+        verbose_name='promotion'
+    )
+    order = models.ForeignKey(
+        'orders.Order',
+        on_delete=models.CASCADE,
+        related_name='promotion_redemptions',
+        verbose_name='order'
+    )
+    amount = models.DecimalField('discount amount', max_digits=12, decimal_places=2, default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'promotion redemption'
+        verbose_name_plural = 'promotion redemptions'
+        unique_together = ('promotion', 'order')
+
+    def __str__(self):
+        return f"{self.promotion} - {self.order_id}"
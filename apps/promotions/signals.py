@@ -0,0 +1,16 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from .engine import invalidate_index
+from .models import Promotion
+
+
+@receiver([post_save, post_delete], sender=Promotion)
+@receiver(m2m_changed, sender=Promotion.categories.through)
+@receiver(m2m_changed, sender=Promotion.brands.through)
+@receiver(m2m_changed, sender=Promotion.variants.through)
+@receiver([post_save, post_delete], sender='catalog.Category')
+def invalidate_index_on_promotion_change(sender, **kwargs):
+    # Category scopes include subcategories, so tree changes recompile too.
+    # After the commit, so a concurrent checkout can't compile the old rows anew.
+    transaction.on_commit(invalidate_index)
@@ -0,0 +1,208 @@
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from apps.cart.cart import SessionCart
+from apps.catalog.models import Brand, Category, Product, ProductVariant
+from apps.checkout.models import CheckoutSession, ShippingMethod
+from apps.checkout.totals import calculate_totals
+from apps.core import site_cache
+from apps.core.testing import ConcurrentWritesMixin
+from apps.orders.models import Order
+from apps.pricing.models import Price
+from .engine import PromotionUnavailable, evaluate, get_index, redeem, release_for_order
+from .models import Promotion, PromotionRedemption
+
+
+def create_variant(sku, price, category, brand=None):
+    product = Product.objects.create(name=sku, slug=sku.lower(), category=category, brand=brand)
+    variant = ProductVariant.objects.create(product=product, sku=sku)
+    Price.objects.create(variant=variant, list_price=price)
+    return variant
+
+
+class PromotionEngineTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        site_cache.clear_local()
+        self.computers = Category.objects.create(name="Computers", slug="computers")
+        self.laptops = Category.objects.create(name="Laptops", slug="laptops", parent=self.computers)
+        self.cables = Category.objects.create(name="Cables", slug="cables")
+        self.brand = Brand.objects.create(name="Acme", slug="acme")
+        self.laptop = create_variant("LAP-1", Decimal('1000.00'), self.laptops, self.brand)
+        self.cable = create_variant("CAB-1", Decimal('10.00'), self.cables)
+        self.shipping_method = ShippingMethod.objects.create(name='Standard', price=Decimal('60.00'))
+
+    def totals(self, quantities, promo_code=''):
+        return calculate_totals(quantities, self.shipping_method, promo_code)
+
+    def test_percentage_on_category_includes_subcategories(self):
+        promotion = Promotion.objects.create(name='Computer week', rule_type='percentage', value=Decimal('10'), scope='category')
+        promotion.categories.add(self.computers)
+        totals = self.totals({self.laptop.id: 1, self.cable.id: 2})
+        self.assertEqual([line['discount'] for line in totals['lines']], [Decimal('100.00'), Decimal('0')])
+        self.assertEqual((totals['discount'], totals['total']), (Decimal('100.00'), Decimal('980.00')))
+        self.assertEqual(totals['promotions'], [{'id': promotion.id, 'name': 'Computer week', 'code': '', 'amount': Decimal('100.00')}])
+
+    def test_fixed_bogo_and_free_shipping(self):
+        fixed = Promotion.objects.create(name='Acme 50 off', rule_type='fixed', value=Decimal('50'), scope='brand')
+        fixed.brands.add(self.brand)
+        bogo = Promotion.objects.create(name='Cables 2 for 1', rule_type='bogo', scope='variant')
+        bogo.variants.add(self.cable)
+        Promotion.objects.create(name='Ship free', rule_type='free_shipping', min_subtotal=Decimal('500'))
+
+        totals = self.totals({self.laptop.id: 1, self.cable.id: 5})
+        self.assertEqual([line['discount'] for line in totals['lines']], [Decimal('50'), Decimal('20.00')])
+        self.assertEqual((totals['discount'], totals['shipping']), (Decimal('70.00'), Decimal('0')))
+        self.assertTrue(totals['free_shipping'])
+
+        totals = self.totals({self.cable.id: 1})
+        self.assertEqual((totals['discount'], totals['shipping']), (Decimal('0.00'), Decimal('60.00')))
+
+    def test_fixed_amount_never_takes_a_line_below_zero(self):
+        Promotion.objects.create(name='2 off', rule_type='fixed', value=Decimal('2'))
+        lines = [
+            {'variant_id': pk, 'category_id': None, 'brand_id': None, 'quantity': 1,
+             'unit_price': total, 'line_total': total, 'discount': Decimal('0')}
+            for pk, total in enumerate([Decimal('1.00'), Decimal('1.00'), Decimal('1.00'), Decimal('0.01')])
+        ]
+        discount, _, _ = evaluate(lines)
+        self.assertEqual(discount, Decimal('2.00'))
+        self.assertTrue(all(Decimal('0') <= line['discount'] <= line['line_total'] for line in lines))
+
+    def test_codes_are_unique_but_many_promotions_can_be_automatic(self):
+        Promotion.objects.create(name='Auto 1', rule_type='percentage', value=Decimal('5'))
+        Promotion.objects.create(name='Auto 2', rule_type='percentage', value=Decimal('5'))
+        Promotion.objects.create(name='Save', code='SAVE', rule_type='percentage', value=Decimal('5'))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Promotion.objects.create(name='Save again', code=' save ', rule_type='percentage', value=Decimal('5'))
+
+    def test_coded_promotions_need_their_code(self):
+        Promotion.objects.create(name='Welcome', code='welcome', rule_type='percentage', value=Decimal('5'))
+        self.assertEqual(self.totals({self.cable.id: 2})['discount'], Decimal('0.00'))
+        self.assertEqual(self.totals({self.cable.id: 2}, ' Welcome ')['discount'], Decimal('1.00'))
+
+    def test_inactive_and_expired_promotions_are_ignored(self):
+        Promotion.objects.create(name='Off', rule_type='percentage', value=Decimal('5'), is_active=False)
+        Promotion.objects.create(name='Over', rule_type='percentage', value=Decimal('5'), ends_at=timezone.now() - timedelta(days=1))
+        Promotion.objects.create(name='Later', rule_type='percentage', value=Decimal('5'), starts_at=timezone.now() + timedelta(days=1))
+        self.assertEqual(self.totals({self.cable.id: 2})['promotions'], [])
+
+    def test_evaluation_reads_the_compiled_index(self):
+        promotion = Promotion.objects.create(name='Sale', rule_type='percentage', value=Decimal('10'), scope='variant')
+        promotion.variants.add(self.laptop)
+        get_index()
+        lines = [{'variant_id': self.laptop.id, 'category_id': self.laptops.id, 'brand_id': self.brand.id, 'quantity': 1,
+                  'unit_price': Decimal('1000.00'), 'line_total': Decimal('1000.00'), 'discount': Decimal('0')}]
+        with self.assertNumQueries(0):
+            self.assertEqual(evaluate(lines)[0], Decimal('100.00'))
+
+        # The index is recompiled once the change commits
+        with self.captureOnCommitCallbacks(execute=True):
+            promotion.variants.remove(self.laptop)
+            lines[0]['discount'] = Decimal('0')
+            self.assertEqual(evaluate(lines)[0], Decimal('100.00'))
+        lines[0]['discount'] = Decimal('0')
+        self.assertEqual(evaluate(lines)[0], Decimal('0'))
+
+    def test_usage_limit(self):
+        promotion = Promotion.objects.create(name='Once', code='ONCE', rule_type='fixed', value=Decimal('5'), usage_limit=1)
+        applied = self.totals({self.cable.id: 1}, 'ONCE')['promotions']
+        first = Order.objects.create(guest_email='a@example.com', subtotal=10, total=5)
+        second = Order.objects.create(guest_email='b@example.com', subtotal=10, total=5)
+
+        redeem(first, applied)
+        with self.assertRaises(PromotionUnavailable):
+            with transaction.atomic():
+                redeem(second, applied)
+        self.assertEqual(Promotion.objects.get(pk=promotion.pk).usage_count, 1)
+        self.assertEqual(self.totals({self.cable.id: 1}, 'ONCE')['promotions'], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(release_for_order(first), 1)
+        self.assertEqual(release_for_order(first), 0)
+        self.assertEqual(Promotion.objects.get(pk=promotion.pk).usage_count, 0)
+        redeem(second, applied)
+        self.assertEqual(PromotionRedemption.objects.get().order, second)
+
+
+class PromoCheckoutTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        site_cache.clear_local()
+        category = Category.objects.create(name="Laptops", slug="laptops")
+        self.variant = create_variant("LAP-1", Decimal('100.00'), category)
+        self.promotion = Promotion.objects.create(name='Launch', code='LAUNCH', rule_type='percentage', value=Decimal('20'), usage_limit=1)
+        self.user = get_user_model().objects.create_user(email='buyer@example.com', password='secret')
+        self.client.force_login(self.user)
+        SessionCart(self.client.get('/').wsgi_request).set_quantities({self.variant.id: 2})
+        CheckoutSession.objects.create(
+            user=self.user,
+            session_key='checkout',
+            guest_shipping_address={'full_name': 'Buyer', 'address_line1': 'Road 1', 'city': 'Dhaka'},
+            shipping_method=ShippingMethod.objects.create(name='Standard', price=Decimal('60.00')),
+            payment_method='cod',
+        )
+
+    def test_code_is_applied_and_redeemed(self):
+        self.client.post(reverse('checkout:apply_promo_code'), {'promo_code': 'nope'})
+        self.assertEqual(CheckoutSession.objects.get().promo_code, '')
+        self.client.post(reverse('checkout:apply_promo_code'), {'promo_code': 'launch'})
+        self.assertEqual(CheckoutSession.objects.get().promo_code, 'LAUNCH')
+
+        response = self.client.get(reverse('checkout:review'))
+        self.assertContains(response, 'Launch (LAUNCH)')
+        self.assertEqual(response.context['total'], Decimal('220.00'))
+
+        self.client.post(reverse('checkout:place_order'))
+        order = Order.objects.get()
+        self.assertEqual((order.discount_amount, order.total, order.promo_code), (Decimal('40.00'), Decimal('220.00'), 'LAUNCH'))
+        self.assertEqual(order.promotion_redemptions.get().amount, Decimal('40.00'))
+        self.assertEqual(Promotion.objects.get().usage_count, 1)
+
+    def test_promotion_used_up_after_review_cancels_placement(self):
+        self.client.post(reverse('checkout:apply_promo_code'), {'promo_code': 'LAUNCH'})
+        self.client.get(reverse('checkout:review'))
+        # Another customer takes the last use; this process' index is not refreshed yet
+        Promotion.objects.filter(pk=self.promotion.pk).update(usage_count=1)
+
+        response = self.client.post(reverse('checkout:place_order'))
+        self.assertRedirects(response, reverse('checkout:review'), fetch_redirect_response=False)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(self.client.get(reverse('checkout:review')).context['total'], Decimal('260.00'))
+
+
+class UsageLimitStressTests(ConcurrentWritesMixin, TransactionTestCase):
+    def test_parallel_redemptions_respect_the_limit(self):
+        limit, buyers = 3, 20
+        promotion = Promotion.objects.create(name='Few', code='FEW', rule_type='fixed', value=Decimal('5'), usage_limit=limit)
+        orders = [Order.objects.create(guest_email=f'buyer{index}@example.com', subtotal=10, total=5) for index in range(buyers)]
+        applied = [{'id': promotion.id, 'name': promotion.name, 'code': promotion.code, 'amount': Decimal('5')}]
+        barrier = threading.Barrier(buyers)
+        results = []
+
+        def buyer(order):
+            try:
+                barrier.wait()
+                with transaction.atomic():
+                    redeem(order, applied)
+                results.append(True)
+            except PromotionUnavailable:
+                results.append(False)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=buyer, args=(order,)) for order in orders]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        self.assertEqual(results.count(True), limit)
+        self.assertEqual(Promotion.objects.get().usage_count, limit)
+        self.assertEqual(PromotionRedemption.objects.count(), limit)
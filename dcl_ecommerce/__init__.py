@@ -1,3 +1,6 @@
 """
 DCL Ecommerce main package.
 """
+from .celery import app as celery_app
+
+__all__ = ('celery_app',)
@@ -0,0 +1,13 @@
+"""
+Celery application for background work (see PAYMENTS_WEBHOOK_QUEUE).
+Start a worker with: celery -A dcl_ecommerce worker
+and the periodic tasks (CELERY_BEAT_SCHEDULE) with: celery -A dcl_ecommerce beat
+"""
+import os
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dcl_ecommerce.settings')
+
+app = Celery('dcl_ecommerce')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
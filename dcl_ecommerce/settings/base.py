@@ -218,6 +218,70 @@ EMAIL_USE_TLS = env('EMAIL_USE_TLS', default=True)
 SSLCOMMERZ_STORE_ID = env('SSLCOMMERZ_STORE_ID', default='')
 SSLCOMMERZ_STORE_PASS = env('SSLCOMMERZ_STORE_PASS', default='')
 SSLCOMMERZ_SANDBOX = env.bool('SSLCOMMERZ_SANDBOX', default=True)
+# Overrides the sandbox/live endpoint, e.g. with a local stub gateway
+SSLCOMMERZ_BASE_URL = env('SSLCOMMERZ_BASE_URL', default='')
+# Seconds to connect and to wait for a response
+SSLCOMMERZ_CONNECT_TIMEOUT = env.float('SSLCOMMERZ_CONNECT_TIMEOUT', default=3.05)
+SSLCOMMERZ_READ_TIMEOUT = env.float('SSLCOMMERZ_READ_TIMEOUT', default=20)
+# Retries of failed calls, with exponential backoff (in seconds) and jitter
+SSLCOMMERZ_MAX_RETRIES = env.int('SSLCOMMERZ_MAX_RETRIES', default=2)
+SSLCOMMERZ_RETRY_BACKOFF = env.float('SSLCOMMERZ_RETRY_BACKOFF', default=0.5)
+# Consecutive failures that open the circuit, and seconds before it is tried again
+SSLCOMMERZ_BREAKER_THRESHOLD = env.int('SSLCOMMERZ_BREAKER_THRESHOLD', default=5)
+SSLCOMMERZ_BREAKER_RESET = env.int('SSLCOMMERZ_BREAKER_RESET', default=30)
+# Seconds that validation results are cached by val_id: valid payments, and anything else
+SSLCOMMERZ_VALIDATION_CACHE_TTL = env.int('SSLCOMMERZ_VALIDATION_CACHE_TTL', default=60 * 60 * 24)
+SSLCOMMERZ_VALIDATION_NEGATIVE_TTL = env.int('SSLCOMMERZ_VALIDATION_NEGATIVE_TTL', default=60)
+
+
+# Payment Webhook Settings
+# Who processes gateway callbacks: 'celery', 'thread' (an in-process worker pool,
+# for deployments without a broker) or 'sync' (the request that received it)
+PAYMENTS_WEBHOOK_QUEUE = env('PAYMENTS_WEBHOOK_QUEUE', default='thread')
+PAYMENTS_WEBHOOK_WORKERS = env.int('PAYMENTS_WEBHOOK_WORKERS', default=4)
+PAYMENTS_WEBHOOK_MAX_ATTEMPTS = env.int('PAYMENTS_WEBHOOK_MAX_ATTEMPTS', default=5)
+# Seconds before the first retry; doubles with each further attempt
+PAYMENTS_WEBHOOK_RETRY_BACKOFF = env.int('PAYMENTS_WEBHOOK_RETRY_BACKOFF', default=30)
+# Minutes after which a never-attempted event counts as lost and is queued again
+PAYMENTS_WEBHOOK_STUCK_MINUTES = env.int('PAYMENTS_WEBHOOK_STUCK_MINUTES', default=10)
+
+# Dashboard Export Settings
+# Who writes background exports: 'celery', 'thread' or 'sync' (the request itself)
+DASHBOARD_EXPORT_QUEUE = env('DASHBOARD_EXPORT_QUEUE', default='thread')
+# Rows fetched from the database at a time
+DASHBOARD_EXPORT_CHUNK_SIZE = env.int('DASHBOARD_EXPORT_CHUNK_SIZE', default=2000)
+
+# Payment Reconciliation Settings
+# Open SSLCommerz transactions older than this are checked with the gateway,
+# and cancelled once this old if the gateway has no outcome for them
+PAYMENTS_RECONCILE_AFTER_MINUTES = env.int('PAYMENTS_RECONCILE_AFTER_MINUTES', default=30)
+PAYMENTS_RECONCILE_EXPIRE_MINUTES = env.int('PAYMENTS_RECONCILE_EXPIRE_MINUTES', default=120)
+PAYMENTS_RECONCILE_BATCH_SIZE = env.int('PAYMENTS_RECONCILE_BATCH_SIZE', default=100)
+PAYMENTS_RECONCILE_WORKERS = env.int('PAYMENTS_RECONCILE_WORKERS', default=8)
+
+
+# Celery Settings
+CELERY_BROKER_URL = env('CELERY_BROKER_URL', default='redis://localhost:6379/0')
+CELERY_TASK_IGNORE_RESULT = True
+# Periodic tasks, run by: celery -A dcl_ecommerce beat
+CELERY_BEAT_SCHEDULE = {
+    'drain-webhook-events': {
+        'task': 'apps.payments.tasks.drain_webhook_events',
+        'schedule': 60,
+    },
+    'reconcile-pending-payments': {
+        'task': 'apps.payments.tasks.reconcile_pending_payments',
+        'schedule': 5 * 60,
+    },
+    'release-expired-reservations': {
+        'task': 'apps.checkout.tasks.release_expired_reservations',
+        'schedule': 60,
+    },
+    'refresh-recent-sales-rollups': {
+        'task': 'apps.orders.tasks.refresh_recent_sales_rollups',
+        'schedule': 5 * 60,
+    },
+}
 
 
 # DCL Brand Colors
@@ -227,3 +291,24 @@ DCL_ACCENT_COLOR = '#0054A6'  # Light Blue
 
 # Cart Settings
 CART_SESSION_ID = 'cart'
+
+# Checkout Settings
+# Minutes that stock stays reserved for a checkout, and for a placed order awaiting payment
+CHECKOUT_RESERVATION_TTL = env.int('CHECKOUT_RESERVATION_TTL', default=15)
+
+# Order Settings
+# Who refreshes the daily sales rollups: 'celery', 'thread' or 'sync' (the request that changed the order)
+ORDERS_ROLLUP_QUEUE = env('ORDERS_ROLLUP_QUEUE', default='thread')
+# Seconds a queued refresh of a day waits; changes made meanwhile share it
+ORDERS_ROLLUP_DELAY = env.int('ORDERS_ROLLUP_DELAY', default=10)
+# Days (today included) the periodic refresh recomputes, for refreshes that were lost
+ORDERS_ROLLUP_RECENT_DAYS = env.int('ORDERS_ROLLUP_RECENT_DAYS', default=2)
+
+# Catalog Settings
+# Use cursor (keyset) pages with infinite scroll on product grids instead of numbered pages
+CATALOG_CURSOR_PAGINATION = env.bool('CATALOG_CURSOR_PAGINATION', default=False)
+
+# Dashboard Settings
+# Use cursor (keyset) next/prev links on order, product, customer and payment lists,
+# skipping the COUNT(*) of numbered pages
+DASHBOARD_CURSOR_PAGINATION = env.bool('DASHBOARD_CURSOR_PAGINATION', default=False)